@@ -1,14 +1,9 @@
 import logging
+import sys
 from datetime import datetime
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import OperationalError
 
-try:
-    from prefect import get_run_logger
-    PREFECT_AVAILABLE = True
-except ImportError:
-    PREFECT_AVAILABLE = False
-
 class ETLLogger:
     def __init__(self, host, user, password):
         self.host = host
@@ -28,8 +23,10 @@ class ETLLogger:
 
     def _get_logger(self):
         """Get appropriate logger based on context"""
-        if PREFECT_AVAILABLE:
+        # A flow run has already imported prefect; plain scripts never pay for it
+        if 'prefect' in sys.modules:
             try:
+                from prefect import get_run_logger
                 return get_run_logger()
             except Exception:
                 # Fall back to Python logger if Prefect context not available
@@ -0,0 +1,471 @@
+"""Synthetic and recorded API fixtures for offline benchmarking.
+
+Everything here is shaped like the payloads ``extract.py`` parses and the
+frames the ``fetch_*`` functions return, so the transform and load stages can
+be driven without network access or credentials.
+"""
+import json
+import os
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_client import HTTP2Adapter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+BRANDS = ['JBL', 'Honda', 'Fender', 'Tres Agaves', 'Apothic', 'Acme']
+OBJECTIVES = ['Awareness', 'Traffic', 'Engagement', 'Video Views', 'Reach', 'Conversion', 'Lead', 'LPV']
+AUDIENCES = ['Interest/Behavior', 'Retargeting', 'Lookalike', 'Statsocial', 'Broad']
+PLACEMENTS = ['Feed', 'Stories', 'Story', 'Reels']
+DESTINATIONS = ['JBL.com', 'Amazon', 'Best Buy', 'Target', 'Walmart']
+CREATORS = ['musicfan', 'studiolife', 'djnova', 'roadtrip_ray', 'chefmaya', 'skatekid', 'techtess']
+PUBLISHER_PLATFORMS = ['instagram', 'facebook', 'audience_network', 'messenger']
+
+
+# Ad-name corpora --------------------------------------------------------
+
+def synth_names(n, seed=0):
+    """Return ``n`` campaign/ad set/ad name triples plus a campaign start date.
+
+    Names follow the "Objective - Audience - Content" conventions the
+    ``extract_*`` helpers in ``transform.py`` parse, including the JBL 2021
+    special cases and a share of names that match nothing.
+    """
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    rows = []
+    for i in range(n):
+        brand = rng.choice(BRANDS)
+        objective = rng.choice(OBJECTIVES)
+        audience = rng.choice(AUDIENCES)
+        placement = rng.choice(PLACEMENTS)
+        creator = rng.choice(CREATORS)
+        campaign_start = start + timedelta(days=rng.randrange(0, 4 * 365))
+        campaign = f"{objective} - {brand} {campaign_start.year} Q{(campaign_start.month - 1) // 3 + 1}"
+        if rng.random() < 0.1:
+            campaign = f"{brand.lower()} always on {rng.randrange(1, 99)}"
+        ad_set = f"{brand} - {audience} - {placement} - {rng.choice(DESTINATIONS)}"
+        ad = f"{brand} @{creator} V{rng.randrange(1, 6)} - {placement}"
+        if rng.random() < 0.05:
+            ad += " - Copy"
+        rows.append((campaign, ad_set, ad, campaign_start))
+    return rows
+
+
+def _metric(rng, high):
+    return rng.randrange(0, high)
+
+
+# Raw extractor frames ---------------------------------------------------
+
+def synth_facebook_frame(n, seed=0, account_name='JBL (Harman) - Praytell'):
+    """Frame shaped like ``extract.fetch_facebook_report`` output."""
+    rng = random.Random(seed)
+    rows = []
+    for i, (campaign, ad_set, ad, campaign_start) in enumerate(synth_names(n, seed)):
+        day = (campaign_start + timedelta(days=rng.randrange(0, 60))).strftime('%Y-%m-%d')
+        rows.append({
+            'Ad Account Name': account_name,
+            'Campaign Name': campaign,
+            'Campaign ID': str(1000 + i // 500),
+            'Ad Set Name': ad_set,
+            'Ad Set ID': str(5000 + i // 50),
+            'Ad Name': ad,
+            'Date Start': day,
+            'Date Stop': day,
+            'Date': day,
+            'Start Date': campaign_start.strftime('%Y-%m-%dT%H:%M:%S-0400'),
+            'End Date': (campaign_start + timedelta(days=90)).strftime('%Y-%m-%dT%H:%M:%S-0400'),
+            'Budget': str(rng.randrange(1000, 100000)),
+            'Budget Remaining': str(rng.randrange(0, 1000)),
+            'Amount Spent': f"{rng.random() * 500:.2f}",
+            'Impressions': str(_metric(rng, 200000)),
+            'Reach': str(_metric(rng, 150000)),
+            'Link Clicks': str(_metric(rng, 2000)),
+            'Post Engagements': str(_metric(rng, 5000)),
+            'Post Shares': str(_metric(rng, 100)),
+            'Post Reactions': str(_metric(rng, 800)),
+            'Post Comments': str(_metric(rng, 60)),
+            'Post Saves': str(_metric(rng, 40)),
+            '3-second Video Plays': str(_metric(rng, 40000)),
+            'Status': None,
+            'Platform': rng.choice(PUBLISHER_PLATFORMS),
+            'Objective': rng.choice(['OUTCOME_AWARENESS', 'OUTCOME_TRAFFIC', 'OUTCOME_ENGAGEMENT']),
+        })
+    return pd.DataFrame(rows)
+
+
+def synth_tiktok_frame(n, seed=0, account_name='JBL - Praytell'):
+    """Frame shaped like ``extract.fetch_tiktok_report`` output."""
+    rng = random.Random(seed)
+    rows = []
+    for campaign, ad_set, ad, campaign_start in synth_names(n, seed):
+        rows.append({
+            'Ad Account Name': account_name,
+            'Campaign Name': campaign,
+            'Ad Group Name': ad_set,
+            'Ad Group Budget': float(rng.randrange(100, 10000)),
+            'Create Time': campaign_start.strftime('%Y-%m-%d %H:%M:%S'),
+            'Schedule Start Time': campaign_start.strftime('%Y-%m-%d %H:%M:%S'),
+            'Schedule End Time': (campaign_start + timedelta(days=90)).strftime('%Y-%m-%d %H:%M:%S'),
+            'Date': (campaign_start + timedelta(days=rng.randrange(0, 60))).strftime('%Y-%m-%d'),
+            'Ad Name': ad,
+            'Impressions': str(_metric(rng, 200000)),
+            'Reach': str(_metric(rng, 150000)),
+            'Clicks': str(_metric(rng, 2000)),
+            'CTR': f"{rng.random():.4f}",
+            'Video Views (2s)': str(_metric(rng, 40000)),
+            'Campaign Budget': '0.0',
+            'Shares': str(_metric(rng, 100)),
+            'Likes': str(_metric(rng, 800)),
+            'Comments': str(_metric(rng, 60)),
+            'Follows': str(_metric(rng, 30)),
+            'Profile Visits': str(_metric(rng, 200)),
+            'Spend': f"{rng.random() * 500:.2f}",
+            'Objective': rng.choice(['REACH', 'TRAFFIC', 'VIDEO_VIEWS', 'ENGAGEMENT']),
+        })
+    return pd.DataFrame(rows)
+
+
+def synth_linkedin_frame(n, seed=0, account_name='Acme - Praytell'):
+    """Frame shaped like ``extract.fetch_linkedin_report`` output."""
+    rng = random.Random(seed)
+    rows = []
+    for campaign, ad_set, ad, campaign_start in synth_names(n, seed):
+        end = None if rng.random() < 0.3 else (campaign_start + timedelta(days=90)).strftime('%Y-%m-%d')
+        rows.append({
+            'Ad Account Name': account_name,
+            'Campaign Group': campaign,
+            'Start Date': campaign_start.strftime('%Y-%m-%d'),
+            'End Date': end,
+            'objectiveType': rng.choice(['BRAND_AWARENESS', 'WEBSITE_VISIT', 'VIDEO_VIEW']),
+            'Campaign Name': ad_set,
+            'Campaign Status': 'ACTIVE',
+            'Ad Creative Name': rng.choice(['UGC Post', 'Sponsored Share', 'urn:li:share:123 Sponsored Share']),
+            'Impressions': _metric(rng, 200000),
+            'Clicks': _metric(rng, 2000),
+            'Follows': _metric(rng, 30),
+            'Reactions': _metric(rng, 800),
+            'Shares': _metric(rng, 100),
+            'Total Engagements': _metric(rng, 5000),
+            'Views': _metric(rng, 40000),
+            'Cost in USD': rng.random() * 500,
+            'Comments': _metric(rng, 60),
+            'Landing Page Clicks': _metric(rng, 500),
+            'Total Social Actions': _metric(rng, 1000),
+        })
+    return pd.DataFrame(rows)
+
+
+def synth_youtube_frame(n, seed=0, account_name='Praytell Agency'):
+    """Frame shaped like ``extract.fetch_youtube_ads_report`` output."""
+    rng = random.Random(seed)
+    rows = []
+    for campaign, ad_set, ad, campaign_start in synth_names(n, seed):
+        rows.append({
+            'Ad Account Name': account_name,
+            'Campaign Name': campaign,
+            'Ad Group Name': ad_set,
+            'Ad Name': ad,
+            'Date': (campaign_start + timedelta(days=rng.randrange(0, 60))).strftime('%Y-%m-%d'),
+            'Impressions': _metric(rng, 200000),
+            'Clicks': _metric(rng, 2000),
+            'Video Views': _metric(rng, 40000),
+            'Spend': rng.randrange(0, 500_000_000) / 1e6,
+        })
+    return pd.DataFrame(rows)
+
+
+RAW_FRAMES = {
+    'facebook': synth_facebook_frame,
+    'tiktok': synth_tiktok_frame,
+    'linkedin': synth_linkedin_frame,
+    'youtube': synth_youtube_frame,
+}
+
+
+# API payloads -----------------------------------------------------------
+
+def load_recorded(name):
+    """Return rows from a recorded payload in ``benchmarks/fixtures`` or None.
+
+    Recorded files hold a raw API response (``data``, ``data.list`` or
+    ``elements``). Their rows are cycled as templates when a larger corpus is
+    requested, so a handful of real rows can drive a 1M row run.
+    """
+    path = os.path.join(FIXTURE_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        payload = json.load(f)
+    if isinstance(payload.get('data'), dict):
+        return payload['data'].get('list', [])
+    return payload.get('data', payload.get('elements', []))
+
+
+def _cycle(rows, n):
+    return [dict(rows[i % len(rows)]) for i in range(n)]
+
+
+def facebook_insights_rows(n, seed=0):
+    recorded = load_recorded('facebook_insights')
+    if recorded:
+        return _cycle(recorded, n)
+    rng = random.Random(seed)
+    rows = []
+    for i, (campaign, ad_set, ad, campaign_start) in enumerate(synth_names(n, seed)):
+        day = (campaign_start + timedelta(days=rng.randrange(0, 60))).strftime('%Y-%m-%d')
+        rows.append({
+            'campaign_id': str(1000 + i // 500),
+            'objective': rng.choice(['OUTCOME_AWARENESS', 'OUTCOME_TRAFFIC', 'OUTCOME_ENGAGEMENT']),
+            'adset_id': str(5000 + i // 50),
+            'ad_name': ad,
+            'adset_name': ad_set,
+            'campaign_name': campaign,
+            'impressions': str(_metric(rng, 200000)),
+            'spend': f"{rng.random() * 500:.2f}",
+            'reach': str(_metric(rng, 150000)),
+            'ad_id': str(900000 + i),
+            'actions': [
+                {'action_type': 'link_click', 'value': str(_metric(rng, 2000))},
+                {'action_type': 'post_engagement', 'value': str(_metric(rng, 5000))},
+                {'action_type': 'post_reaction', 'value': str(_metric(rng, 800))},
+                {'action_type': 'comment', 'value': str(_metric(rng, 60))},
+                {'action_type': 'video_view', 'value': str(_metric(rng, 40000))},
+            ],
+            'date_start': day,
+            'date_stop': day,
+            'publisher_platform': rng.choice(PUBLISHER_PLATFORMS),
+        })
+    return rows
+
+
+def facebook_adset_rows(insight_rows):
+    seen = {}
+    for row in insight_rows:
+        seen.setdefault(row['adset_id'], {
+            'id': row['adset_id'],
+            'name': row['adset_name'],
+            'start_time': '2023-01-01T00:00:00-0500',
+            'end_time': '2023-04-01T00:00:00-0400',
+            'lifetime_budget': '100000',
+            'budget_remaining': '2500',
+        })
+    return list(seen.values())
+
+
+def tiktok_report_rows(n, seed=0):
+    recorded = load_recorded('tiktok_report')
+    if recorded:
+        return _cycle(recorded, n)
+    rng = random.Random(seed)
+    rows = []
+    for i, (campaign, ad_set, ad, campaign_start) in enumerate(synth_names(n, seed)):
+        rows.append({
+            'dimensions': {'ad_id': str(700000 + i)},
+            'metrics': {
+                'spend': f"{rng.random() * 500:.2f}",
+                'ad_name': ad,
+                'adgroup_name': ad_set,
+                'impressions': str(_metric(rng, 200000)),
+                'reach': str(_metric(rng, 150000)),
+                'clicks': str(_metric(rng, 2000)),
+                'ctr': f"{rng.random():.4f}",
+                'video_watched_2s': str(_metric(rng, 40000)),
+                'campaign_budget': '0.0',
+                'shares': str(_metric(rng, 100)),
+                'likes': str(_metric(rng, 800)),
+                'comments': str(_metric(rng, 60)),
+                'follows': str(_metric(rng, 30)),
+                'profile_visits': str(_metric(rng, 200)),
+            },
+        })
+    return rows
+
+
+def linkedin_analytics_rows(n, seed=0):
+    recorded = load_recorded('linkedin_analytics')
+    if recorded:
+        return _cycle(recorded, n)
+    rng = random.Random(seed)
+    return [
+        {
+            'pivotValues': [f"urn:li:sponsoredCreative:{300000 + i}"],
+            'impressions': _metric(rng, 200000) + 1,
+            'clicks': _metric(rng, 2000),
+            'follows': _metric(rng, 30),
+            'reactions': _metric(rng, 800),
+            'shares': _metric(rng, 100),
+            'totalEngagements': _metric(rng, 5000),
+            'videoViews': _metric(rng, 40000),
+            'costInUsd': rng.random() * 500,
+            'comments': _metric(rng, 60),
+            'landingPageClicks': _metric(rng, 500),
+            'otherEngagements': _metric(rng, 100),
+        }
+        for i in range(n)
+    ]
+
+
+class FixtureAPI:
+    """In-memory responder for the Graph, TikTok and LinkedIn endpoints.
+
+    ``rows`` is the number of ad-level rows every account reports and
+    ``accounts`` the number of accounts account discovery returns per
+    platform. Payloads are built once and serialised to bytes up front so
+    replay measures the extractors' own decoding and parsing, not fixture
+    generation. With ``paginate_graph`` the Graph endpoints honour ``limit``
+    and ``after`` and return cursor paging like the live API.
+    """
+
+    def __init__(self, rows, seed=0, page_size=1000, accounts=1, paginate_graph=False):
+        self.rows = rows
+        self.page_size = page_size
+        self.paginate_graph = paginate_graph
+        self.calls = 0
+
+        insights = facebook_insights_rows(rows, seed)
+        adsets = facebook_adset_rows(insights)
+        self.fb_rows = {'insights': insights, 'adsets': adsets}
+        self.fb_insights = self._encode({'data': insights})
+        self.fb_adsets = self._encode({'data': adsets})
+
+        names = [f"Bench Client {i} - Praytell" for i in range(accounts)]
+        self.fb_me = self._encode({'id': '1', 'name': 'Bench', 'adaccounts': {'data': [
+            {'id': f"act_{10 + i}", 'name': name} for i, name in enumerate(names)
+        ]}})
+        self.tt_advertisers = self._encode({'data': {'list': [
+            {'advertiser_id': str(20 + i), 'advertiser_name': name} for i, name in enumerate(names)
+        ]}})
+        self.li_accounts = self._encode({'elements': [
+            {'id': 30 + i, 'name': name} for i, name in enumerate(names)
+        ]})
+
+        report = tiktok_report_rows(rows, seed)
+        self.tt_campaigns = [
+            {'campaign_id': str(100 + i), 'campaign_name': name, 'objective': 'REACH'}
+            for i, name in enumerate(sorted({r[0] for r in synth_names(max(1, rows // page_size), seed)}))
+        ]
+        per_campaign = -(-rows // len(self.tt_campaigns))
+        self.tt_reports = {}
+        for i, campaign in enumerate(self.tt_campaigns):
+            chunk = report[i * per_campaign:(i + 1) * per_campaign]
+            self.tt_reports[campaign['campaign_id']] = [
+                chunk[p:p + page_size] for p in range(0, len(chunk), page_size)
+            ] or [[]]
+        self.tt_adgroups = {}
+        for campaign_id, pages in self.tt_reports.items():
+            names = {r['metrics']['adgroup_name'] for page in pages for r in page}
+            self.tt_adgroups[campaign_id] = self._encode({'data': {'list': [
+                {'adgroup_name': name, 'budget': 500.0, 'create_time': '2023-01-01 00:00:00',
+                 'schedule_start_time': '2023-01-01 00:00:00', 'schedule_end_time': '2023-04-01 00:00:00'}
+                for name in sorted(names)
+            ], 'page_info': {'has_more': False}}})
+
+        analytics = linkedin_analytics_rows(rows, seed)
+        self.li_campaign_ids = [str(400 + i) for i in range(max(1, rows // 100))]
+        per_li = -(-rows // len(self.li_campaign_ids))
+        self.li_analytics = {
+            cid: self._encode({'elements': analytics[i * per_li:(i + 1) * per_li]})
+            for i, cid in enumerate(self.li_campaign_ids)
+        }
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload).encode('utf-8')
+
+    def _graph_page(self, url, kind, query):
+        rows = self.fb_rows[kind]
+        limit = int(query.get('limit', [len(rows) or 1])[0])
+        offset = int(query.get('after', ['0'])[0])
+        page = rows[offset:offset + limit]
+        payload = {'data': page}
+        if offset + limit < len(rows):
+            after = str(offset + limit)
+            base = url.split('?')[0]
+            payload['paging'] = {'cursors': {'after': after}, 'next': f"{base}?limit={limit}&after={after}"}
+        return 200, self._encode(payload)
+
+    def respond(self, url):
+        """Return ``(status_code, body_bytes)`` for a request URL."""
+        self.calls += 1
+        parsed = urlparse(url)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+
+        if path.endswith('/me'):
+            return 200, self.fb_me
+        if path.endswith('/insights'):
+            if self.paginate_graph:
+                return self._graph_page(url, 'insights', query)
+            return 200, self.fb_insights
+        if path.endswith('/adsets'):
+            if self.paginate_graph:
+                return self._graph_page(url, 'adsets', query)
+            return 200, self.fb_adsets
+
+        if path.endswith('/oauth2/advertiser/get/'):
+            return 200, self.tt_advertisers
+
+        if path.endswith('/campaign/get/'):
+            return 200, self._encode({'data': {'list': self.tt_campaigns, 'page_info': {'has_more': False}}})
+        if path.endswith('/adgroup/get/'):
+            campaign_id = json.loads(query['filtering'][0])['campaign_ids'][0]
+            return 200, self.tt_adgroups.get(campaign_id, self._encode({'data': {'list': []}}))
+        if path.endswith('/reports/integrated/get/'):
+            filters = json.loads(query['filters'][0])
+            campaign_id = json.loads(filters[0]['filter_value'])[0]
+            pages = self.tt_reports.get(campaign_id, [[]])
+            page = int(query.get('page', ['1'])[0])
+            rows = pages[page - 1] if page <= len(pages) else []
+            return 200, self._encode({'data': {'list': rows, 'page_info': {'has_more': page < len(pages)}}})
+
+        if path.endswith('/rest/adAccounts'):
+            return 200, self.li_accounts
+        if path.endswith('/adCampaignGroupsV2'):
+            return 200, self._encode({'elements': [
+                {'name': 'Awareness - Acme 2023', 'id': 1, 'runSchedule': {'start': 1672531200000}}
+            ]})
+        if path.endswith('/adCampaignsV2'):
+            return 200, self._encode({'elements': [
+                {'name': f"Awareness - Interest/Behavior - Campaign {cid}", 'objectiveType': 'BRAND_AWARENESS',
+                 'status': 'ACTIVE', 'id': cid}
+                for cid in self.li_campaign_ids
+            ]})
+        if path.endswith('/adAnalyticsV2'):
+            campaign_id = query['campaigns'][0].split(':')[-1]
+            return 200, self.li_analytics.get(campaign_id, self._encode({'elements': []}))
+        if '/adCreativesV2/' in path:
+            return 200, b'{"reference": "urn:li:ugcPost:1"}'
+
+        return 404, self._encode({'error': f"No fixture for {path}"})
+
+
+@contextmanager
+def replay(api):
+    """Serve every ``requests`` call from ``api`` instead of the network.
+
+    Patching at the transport adapters covers module-level ``requests.get``,
+    ``requests.Session`` users and the HTTP/2 adapter in ``http_client``.
+    """
+    def send(adapter, request, **kwargs):
+        status, body = api.respond(request.url)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers['Content-Type'] = 'application/json'
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        return response
+
+    with mock.patch.object(HTTPAdapter, 'send', send), \
+            mock.patch.object(HTTP2Adapter, 'send', send):
+        yield api
@@ -0,0 +1,223 @@
+"""Local stand-in for the Graph, TikTok and LinkedIn APIs.
+
+Serves the endpoints ``extract.py`` and ``mapping.py`` call, backed by the
+synthetic payloads in ``benchmarks/fixtures.py``, with configurable latency,
+error rates and rate limiting so extractor concurrency can be tuned offline.
+
+    python -m benchmarks.mock_api --port 8765 --rows 5000 --latency-ms 80 \\
+        --error-rate 0.01 --throttle-rate 0.02 --rate-limit 50
+
+then point the pipeline at it with the printed environment variables.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import FixtureAPI
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` requests per second per platform."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = {}
+        self.updated = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        """Take a token for ``key``; return ``(allowed, usage_pct)``."""
+        if not self.rate:
+            return True, 0
+        with self.lock:
+            now = time.monotonic()
+            tokens = self.tokens.get(key, self.burst)
+            tokens = min(self.burst, tokens + (now - self.updated.get(key, now)) * self.rate)
+            self.updated[key] = now
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.tokens[key] = tokens
+            return allowed, int(100 * (1 - tokens / self.burst))
+
+
+class MockAPIConfig:
+    def __init__(self, rows=1000, accounts=3, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 throttle_rate=0.0, rate_limit=0, page_size=1000, seed=0):
+        self.rows = rows
+        self.accounts = accounts
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.page_size = page_size
+        self.seed = seed
+
+
+def platform_for_path(path):
+    if path.startswith('/open_api/'):
+        return 'tiktok'
+    # Match whole segments: Graph's '/v21.0/' also starts with '/v2'
+    if path.startswith('/v2/') or path.startswith('/rest/'):
+        return 'linkedin'
+    return 'facebook'
+
+
+def rate_limit_headers(platform, usage, rate_limit):
+    """Usage headers in the shape each platform sends them."""
+    if platform == 'facebook':
+        usage_json = json.dumps({'call_count': usage, 'total_cputime': usage // 2, 'total_time': usage // 2})
+        return {
+            'x-app-usage': usage_json,
+            'x-business-use-case-usage': json.dumps({'mock': [{
+                'type': 'ads_insights', 'call_count': usage, 'total_cputime': usage // 2,
+                'total_time': usage // 2, 'estimated_time_to_regain_access': 0,
+            }]}),
+        }
+    limit = max(1, int(rate_limit or 0))
+    return {
+        'X-RateLimit-Limit': str(limit),
+        'X-RateLimit-Remaining': str(max(0, limit - limit * usage // 100)),
+        'X-RateLimit-Reset': '1',
+    }
+
+
+def make_handler(api, config, limiter, stats):
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without this, kept-alive
+        # connections stall on Nagle/delayed-ACK for ~40ms per request
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            platform = platform_for_path(self.path)
+            with rng_lock:
+                delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+                roll = rng.random()
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            allowed, usage = limiter.acquire(platform)
+            headers = rate_limit_headers(platform, usage, config.rate_limit)
+            with stats['lock']:
+                stats['requests'] += 1
+
+            if not allowed or roll < config.throttle_rate:
+                with stats['lock']:
+                    stats['throttled'] += 1
+                headers['Retry-After'] = '1'
+                body = {'error': {'message': 'User request limit reached', 'code': 17}} \
+                    if platform == 'facebook' else {'code': 40100, 'message': 'Too many requests'}
+                self._send(429, json.dumps(body).encode('utf-8'), headers)
+                return
+            if roll < config.throttle_rate + config.error_rate:
+                with stats['lock']:
+                    stats['errors'] += 1
+                self._send(500, b'{"error": {"message": "Mock server error"}}', headers)
+                return
+
+            status, body = api.respond(f"http://mock{self.path}")
+            self._send(status, body, headers)
+
+    return Handler
+
+
+class MockAPIServer:
+    """Threaded mock API server that can run in the background of a benchmark."""
+
+    def __init__(self, config, host='127.0.0.1', port=0):
+        self.config = config
+        self.api = FixtureAPI(config.rows, seed=config.seed, page_size=config.page_size,
+                              accounts=config.accounts, paginate_graph=True)
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'lock': threading.Lock()}
+        limiter = RateLimiter(config.rate_limit)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.api, config, limiter, self.stats))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environ(self):
+        """Environment overrides that route the extractors to this server."""
+        return {
+            'FB_GRAPH_URL': f"{self.url}/v21.0",
+            'TIKTOK_API_URL': f"{self.url}/open_api",
+            'LINKEDIN_API_URL': self.url,
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the ad platform APIs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows', type=int, default=1000, help="Ad-level rows reported per account")
+    parser.add_argument('--accounts', type=int, default=3, help="Accounts returned by discovery per platform")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help="Requests per second per platform before 429s (0 = unlimited)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockAPIConfig(
+        rows=args.rows, accounts=args.accounts, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+        page_size=args.page_size, seed=args.seed,
+    )
+    server = MockAPIServer(config, host=args.host, port=args.port)
+    print(f"Mock API listening on {server.url}")
+    for name, value in server.environ().items():
+        print(f"export {name}={value}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats = server.stats
+        print(f"\nServed {stats['requests']} requests ({stats['throttled']} throttled, {stats['errors']} errors)")
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Throughput of the Drive ingestion readers in ``readers.py``.
+
+    python -m benchmarks.readers
+    python -m benchmarks.readers --rows 1m --excel-rows 50k --repeat 5
+
+Builds a synthetic export shaped like the Drive files (text, counts, spend,
+dates, blanks) in memory, then times every installed CSV and Excel backend
+on it and reports the median wall time, rows/s and the speedup over the
+pandas reader. Each backend's frame is checked against the pandas one, so a
+backend that parses differently shows up as ``MISMATCH``.
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import readers
+from benchmarks.run_benchmarks import parse_size
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Date': pd.Series(pd.date_range('2023-01-01', periods=400)).dt.strftime('%d-%m-%Y')
+        .sample(rows, replace=True, random_state=seed).values,
+        'Platform': rng.choice(['LinkedIn', 'Instagram', 'Facebook', 'Twitter'], rows),
+        'Content': rng.choice(['New drop', 'Behind the scenes', 'Giveaway', None], rows),
+        'Spent': rng.random(rows).round(2) * 100,
+    })
+    for i in range(12):
+        df[f'Metric {i}'] = rng.integers(0, 100_000, rows)
+    df.loc[rng.random(rows) < 0.1, 'Metric 0'] = None
+    return df
+
+
+def time_backend(read, payload, repeat):
+    times, df = [], None
+    for _ in range(repeat):
+        buf = io.BytesIO(payload)
+        start = time.perf_counter()
+        df = read(buf)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), df
+
+
+def run(label, backends, reference, payload, rows, repeat):
+    baseline = None
+    expected = None
+    for name in [reference] + [name for name in backends if name != reference]:
+        backend = backends[name]
+        if not backend.available:
+            print(f"{label + '/' + name:<20} {'-':>9} {'-':>11}  not installed")
+            continue
+        seconds, df = time_backend(backend.read, payload, repeat)
+        if name == reference:
+            baseline, expected = seconds, df
+            status = 'reference'
+        else:
+            try:
+                pd.testing.assert_frame_equal(expected, df)
+                status = f"{baseline / seconds:.2f}x"
+            except AssertionError:
+                status = 'MISMATCH'
+        print(f"{label + '/' + name:<20} {seconds:>9.3f} {rows / seconds:>11,.0f}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the CSV and Excel reader backends")
+    parser.add_argument('--rows', default='200k', help="CSV rows, e.g. 200k or 1m")
+    parser.add_argument('--excel-rows', default='20k', help="Excel rows (writing the workbook is slow)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'excel'], choices=['csv', 'excel'])
+    args = parser.parse_args()
+
+    print(f"{'case':<20} {'median s':>9} {'rows/s':>11}  vs pandas")
+    if 'csv' in args.formats:
+        rows = parse_size(args.rows)
+        payload = make_frame(rows).to_csv(index=False).encode()
+        run('csv', readers.CSV_BACKENDS, 'pandas', payload, rows, args.repeat)
+    if 'excel' in args.formats:
+        rows = parse_size(args.excel_rows)
+        buf = io.BytesIO()
+        make_frame(rows).to_excel(buf, index=False)
+        run('excel', readers.EXCEL_BACKENDS, 'openpyxl', buf.getvalue(), rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
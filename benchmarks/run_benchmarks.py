@@ -0,0 +1,249 @@
+"""Offline benchmark suite for the paid media pipeline.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --sizes 10k 100k
+    python -m benchmarks.run_benchmarks --sizes 1m --stages transform
+    python -m benchmarks.run_benchmarks --update-baseline
+
+Each (stage, platform, size) case reports throughput in rows/s and the peak
+memory traced while the stage ran, then compares against
+``benchmarks/baseline.json``.
+"""
+import argparse
+import json
+import os
+import platform as host_platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from benchmarks.fixtures import RAW_FRAMES, FixtureAPI, replay
+from load import DATE_COLUMNS, DTYPES, EXPECTED_COLUMNS
+from transform import preprocess_insta, preprocess_tiktok, preprocess_linkedin, preprocess_youtube
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+TRANSFORMS = {
+    'facebook': preprocess_insta,
+    'tiktok': preprocess_tiktok,
+    'linkedin': preprocess_linkedin,
+    'youtube': preprocess_youtube,
+}
+
+# YouTube goes through the Google Ads gRPC client, which cannot be replayed
+# at the HTTP layer, so it is only benchmarked from the transform stage on.
+EXTRACT_PLATFORMS = ['facebook', 'tiktok', 'linkedin']
+
+# Cases returning fewer rows than this share of the requested size are
+# reported as failed (transforms legitimately drop some all-zero rows)
+MIN_ROW_FRACTION = 0.5
+
+def parse_size(value):
+    value = value.lower().replace('_', '')
+    for suffix, factor in (('k', 1_000), ('m', 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def measure(func, *args, memory=True):
+    """Run ``func`` and return ``(result, seconds, peak_mb)``.
+
+    Timing and memory are taken in separate runs because tracemalloc slows
+    allocation-heavy pandas code enough to distort throughput.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+
+    peak_mb = None
+    if memory:
+        del result
+        tracemalloc.start()
+        try:
+            result = func(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, peak_mb
+
+
+# Stages -----------------------------------------------------------------
+
+def run_extract(platform, rows):
+    import extract
+
+    os.environ.setdefault('FB_ACCESS_TOKEN', 'bench')
+    os.environ.setdefault('FB_APP_ID', 'bench')
+    os.environ.setdefault('FB_APP_SECRET', 'bench')
+    os.environ.setdefault('TIKTOK_ACCESS_TOKEN', 'bench')
+    os.environ.setdefault('TIKTOK_APP_ID', 'bench')
+    os.environ.setdefault('TIKTOK_SECRET', 'bench')
+    os.environ.setdefault('LINKEDIN_ACCESS_TOKEN', 'bench')
+    # Replayed responses cost nothing, so measure parsing rather than the
+    # client-side rate limiter (read when each platform's client is created)
+    for name in EXTRACT_PLATFORMS:
+        os.environ.setdefault(f'{name.upper()}_RATE_LIMIT', '1000000')
+        os.environ.setdefault(f'{name.upper()}_MAX_RATE', '1000000')
+
+    api = FixtureAPI(rows)
+
+    def fetch():
+        with replay(api):
+            if platform == 'facebook':
+                return extract.fetch_facebook_report({'facebook': [('act_1', 'Bench - Praytell')]})
+            if platform == 'tiktok':
+                return extract.fetch_tiktok_report({'tiktok': [('1', 'Bench - Praytell')]})
+            return extract.fetch_linkedin_report({'linkedin': [('1', 'Bench - Praytell')]})
+
+    return fetch
+
+
+def run_transform(platform, raw):
+    preprocess = TRANSFORMS[platform]
+
+    def transform():
+        # preprocess_* may rename columns in place, so each run gets a copy
+        return preprocess(raw.copy())
+
+    return transform
+
+
+def run_load(processed, db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    def load():
+        df = processed
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
+        df = df[[col for col in df.columns if col in EXPECTED_COLUMNS]]
+        df = df.astype({col: 'int64' for col in df.columns if pd.api.types.is_integer_dtype(df[col])})
+        df.to_sql('Bench_Paid_Data', engine, index=False, if_exists='append', dtype=DTYPES)
+        return len(df)
+
+    return load
+
+
+# Reporting --------------------------------------------------------------
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(path, results):
+    payload = {
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'machine': host_platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(key, current, baseline, tolerance):
+    """Return a status string for ``current`` against the stored baseline."""
+    base = baseline.get(key)
+    if not base:
+        return 'new', False
+    notes = []
+    regressed = False
+    ratio = current['rows_per_s'] / base['rows_per_s'] if base.get('rows_per_s') else None
+    if ratio is not None:
+        notes.append(f"{ratio:.2f}x speed")
+        regressed |= ratio < 1 - tolerance
+    if current.get('peak_mb') is not None and base.get('peak_mb'):
+        mem_ratio = current['peak_mb'] / base['peak_mb']
+        notes.append(f"{mem_ratio:.2f}x mem")
+        regressed |= mem_ratio > 1 + tolerance
+    status = ', '.join(notes)
+    return (f"REGRESSION ({status})" if regressed else status), regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput and memory benchmarks")
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k'],
+                        help="Corpus sizes, e.g. 10k 100k 1m")
+    parser.add_argument('--stages', nargs='+', default=['extract', 'transform', 'load'],
+                        choices=['extract', 'transform', 'load'])
+    parser.add_argument('--platforms', nargs='+', default=list(TRANSFORMS), choices=list(TRANSFORMS))
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Write this run's results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Allowed fractional slowdown/memory growth before flagging a regression")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes]
+    baseline = load_baseline(args.baseline)
+    results = {}
+    any_regression = False
+
+    print(f"{'case':<32} {'rows':>9} {'seconds':>9} {'rows/s':>11} {'peak MB':>9}  vs baseline")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for platform in args.platforms:
+                raw = RAW_FRAMES[platform](size)
+                processed = None
+                cases = []
+                if 'extract' in args.stages and platform in EXTRACT_PLATFORMS:
+                    cases.append(('extract', run_extract(platform, size)))
+                if 'transform' in args.stages or 'load' in args.stages:
+                    cases.append(('transform', run_transform(platform, raw)))
+                if 'load' in args.stages:
+                    cases.append(('load', None))
+
+                for stage, func in cases:
+                    if stage == 'load':
+                        if processed is None or processed.empty:
+                            continue
+                        func = run_load(processed.copy(), os.path.join(tmp, f"{platform}_{size}.db"))
+                    result, seconds, peak_mb = measure(func, memory=not args.no_memory)
+                    if stage == 'transform':
+                        processed = result
+                    if stage == 'transform' and 'transform' not in args.stages:
+                        continue
+
+                    key = f"{stage}/{platform}/{size}"
+                    rows = result if isinstance(result, int) else (0 if result is None else len(result))
+                    if rows < size * MIN_ROW_FRACTION:
+                        # preprocess_* swallow their errors and return None, and
+                        # a failed extract comes back as an empty frame
+                        print(f"{key:<32} {rows:>9}  failed: stage returned {rows} of {size} rows")
+                        continue
+                    current = {
+                        'rows': rows,
+                        'seconds': round(seconds, 4),
+                        'rows_per_s': round(rows / seconds, 1) if seconds else None,
+                        'peak_mb': round(peak_mb, 2) if peak_mb is not None else None,
+                    }
+                    results[key] = current
+                    status, regressed = compare(key, current, baseline, args.tolerance)
+                    any_regression |= regressed
+                    peak = f"{peak_mb:9.1f}" if peak_mb is not None else f"{'-':>9}"
+                    print(f"{key:<32} {rows:>9} {seconds:>9.3f} {current['rows_per_s']:>11,.0f} {peak}  {status}")
+
+    if args.update_baseline:
+        merged = dict(baseline)
+        merged.update(results)
+        save_baseline(args.baseline, merged)
+        print(f"Baseline written to {args.baseline}")
+
+    if any_regression and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Cold-start times for the pipeline's entry points.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 10
+
+Each case runs in a fresh interpreter, as a Cloud Run cold start or a CLI
+``--help`` would, and reports the median wall time. It also lists the heavy
+SDKs the import left in ``sys.modules``. None of the cases should need
+credentials, network access or a database.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    'import extract': ['-c', 'import extract'],
+    'import mapping': ['-c', 'import mapping'],
+    'import drive_monitor': ['-c', 'import drive_monitor'],
+    'import load': ['-c', 'import load'],
+    'import util.historical_fetch': ['-c', 'import util.historical_fetch'],
+    'load.py --help': ['load.py', '--help'],
+    'run_historical.py --help': ['run_historical.py', '--help'],
+}
+
+HEAVY_MODULES = ['facebook_business', 'google.ads.googleads', 'googleapiclient', 'google_auth_oauthlib', 'prefect']
+
+PROBE = "import sys; {stmt}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+
+
+def run(args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}")
+    return elapsed, proc.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time cold imports of the pipeline modules")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<30} {'median s':>9} {'min s':>7}  heavy SDKs loaded")
+    for name, case in CASES.items():
+        try:
+            times = [run(case)[0] for _ in range(args.repeat)]
+            heavy = ''
+            if case[0] == '-c':
+                heavy = run(['-c', PROBE.format(stmt=case[1], heavy=HEAVY_MODULES)])[1].strip()
+        except RuntimeError as e:
+            print(f"{name:<30} failed: {e}")
+            continue
+        print(f"{name:<30} {statistics.median(times):>9.2f} {min(times):>7.2f}  {heavy or '-'}")
+
+
+if __name__ == '__main__':
+    main()
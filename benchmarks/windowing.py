@@ -0,0 +1,111 @@
+"""Requests a backfill makes with fixed and adaptive windows (``windowing.py``).
+
+    python -m benchmarks.windowing
+    python -m benchmarks.windowing --platform tiktok --accounts 200 --days 365
+
+Simulates accounts whose daily row counts are spread log-uniformly from 2
+to 4 pages a day (with weekly seasonality and day-to-day noise) and walks each one's range with
+fixed ``--chunk-days`` windows and with ``AdaptiveWindows``, first with no
+history (the first window probes) and then seeded by the first pass, as a
+second backfill would be. Calls are also broken down into small accounts
+(under a page a week) and the rest. A request costs one call per page of the
+platform's page size. A window holding more than ``--timeout-pages`` pages
+times out: the adaptive walk splits it and retries, while a fixed window
+would fail the backfill. Its pages are still counted, and the window is
+reported under ``failed``.
+"""
+import argparse
+import contextlib
+import io
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import requests
+
+from windowing import PROFILES, AdaptiveWindows
+
+
+class MemoryStats:
+    """The get/set interface of windowing.WindowStats, kept in a dict."""
+
+    def __init__(self):
+        self.rates = {}
+
+    def get(self, platform, account):
+        return self.rates.get((platform, account))
+
+    def set(self, platform, account, rows_per_day):
+        self.rates[(platform, account)] = rows_per_day
+
+
+def make_accounts(count, days, max_rows_per_day, seed=0):
+    """Daily row counts per account, with log-uniform means from 2 to ``max_rows_per_day``."""
+    rng = np.random.default_rng(seed)
+    weekly = np.array([1.0, 1.1, 1.1, 1.0, 0.9, 0.7, 0.6])
+    accounts = {}
+    for i in range(count):
+        mean = 10 ** rng.uniform(np.log10(2), np.log10(max_rows_per_day))
+        daily = mean * weekly[np.arange(days) % 7] * rng.lognormal(0, 0.3, days)
+        accounts[f"act_{i}"] = daily.round().astype(int)
+    return accounts
+
+
+def walk(platform, account, daily, start, chunk_days, timeout_rows, adaptive, stats):
+    """Return (calls, failed windows) for one account's range."""
+    page_size = PROFILES[platform].page_size
+    windows = AdaptiveWindows(platform, account, start, start + timedelta(days=len(daily) - 1), chunk_days,
+                              adaptive=adaptive, stats=stats)
+    calls = failed = 0
+    for window_start, window_end in windows:
+        rows = int(daily[(window_start - start).days:(window_end - start).days + 1].sum())
+        if rows > timeout_rows:
+            calls += 1
+            if windows.split(requests.Timeout("simulated timeout")):
+                continue
+            failed += 1
+        calls += max(1, math.ceil(rows / page_size))
+        windows.record(rows)
+    return calls, failed
+
+
+def run(platform, accounts, chunk_days, timeout_rows):
+    start = datetime(2024, 1, 1)
+    stats = MemoryStats()
+    cases = [(f"fixed {chunk_days}d", False, None), ("fixed 1d", False, None),
+             ("adaptive, no history", True, stats), ("adaptive, history", True, stats)]
+    small = {account for account, daily in accounts.items() if daily.mean() * 7 < PROFILES[platform].page_size}
+    print(f"{'case':<22} {'calls':>9} {'small':>8} {'large':>8} {'failed':>7}  vs fixed {chunk_days}d")
+    baseline = None
+    for label, adaptive, case_stats in cases:
+        days = 1 if label == "fixed 1d" else chunk_days
+        calls = {True: 0, False: 0}
+        failed = 0
+        for account, daily in accounts.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                # Split messages
+                c, f = walk(platform, account, daily, start, days, timeout_rows, adaptive,
+                            case_stats or MemoryStats())
+            calls[account in small] += c
+            failed += f
+        total = calls[True] + calls[False]
+        baseline = baseline or total
+        print(f"{label:<22} {total:>9,} {calls[True]:>8,} {calls[False]:>8,} {failed:>7}  {baseline / total:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count backfill requests with fixed and adaptive windows")
+    parser.add_argument('--platform', default='facebook', choices=sorted(PROFILES))
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--chunk-days', type=int, default=7)
+    parser.add_argument('--timeout-pages', type=int, default=10,
+                        help="Pages above which one request times out")
+    args = parser.parse_args()
+    page_size = PROFILES[args.platform].page_size
+    run(args.platform, make_accounts(args.accounts, args.days, 4 * page_size), args.chunk_days,
+        args.timeout_pages * page_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""In-process catalog of the databases, tables, columns and partitions on the server.
+
+Existence checks used to go to the server every time: ``SHOW DATABASES``
+per Drive file, ``CREATE DATABASE IF NOT EXISTS`` and a table listing per
+client, table reflection, a partition listing per table. The catalog reads
+all of it from ``information_schema`` in one query the first time it is
+asked, answers every later check from memory, and is updated in place when
+this process creates a database, table, column or partition. Objects other
+processes create meanwhile are not seen until ``invalidate()``; the DDL run
+on a miss is idempotent (``IF NOT EXISTS``), so that is harmless.
+
+One catalog is kept per server, shared by the engines of all its databases.
+Databases other than MySQL (SQLite in the benchmarks) are read with the
+SQLAlchemy inspector instead.
+"""
+import os
+import threading
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, text
+
+load_dotenv()
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+
+# Server-internal schemas: listed as databases, but their tables are never read
+SYSTEM_SCHEMAS = ('information_schema', 'mysql', 'performance_schema', 'sys')
+
+CATALOG_QUERY = f"""
+    SELECT 'database' AS kind, SCHEMA_NAME AS table_schema, NULL AS table_name, NULL AS name, 0 AS ordinal
+    FROM information_schema.SCHEMATA
+    UNION ALL
+    SELECT 'column', TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA NOT IN ({', '.join(f"'{s}'" for s in SYSTEM_SCHEMAS)})
+    UNION ALL
+    SELECT 'partition', TABLE_SCHEMA, TABLE_NAME, PARTITION_NAME, PARTITION_ORDINAL_POSITION
+    FROM information_schema.PARTITIONS
+    WHERE PARTITION_NAME IS NOT NULL
+      AND TABLE_SCHEMA NOT IN ({', '.join(f"'{s}'" for s in SYSTEM_SCHEMAS)})
+    ORDER BY kind, table_schema, table_name, ordinal
+"""
+
+
+class Catalog:
+    """Databases -> tables -> columns (and partitions) of one server."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = threading.RLock()
+        self.schemas = None
+        self.partitions = None
+
+    def _load(self):
+        schemas, partitions = {}, {}
+        if self.engine.dialect.name == 'mysql':
+            with self.engine.connect() as conn:
+                for kind, schema, table, name, _ in conn.execute(text(CATALOG_QUERY)):
+                    if kind == 'database':
+                        schemas.setdefault(schema, {})
+                    elif kind == 'column':
+                        schemas.setdefault(schema, {}).setdefault(table, []).append(name)
+                    else:
+                        partitions.setdefault((schema, table), []).append(name)
+        else:
+            inspector = inspect(self.engine)
+            for schema in inspector.get_schema_names():
+                schemas[schema] = {
+                    table: [column['name'] for column in inspector.get_columns(table, schema=schema)]
+                    for table in inspector.get_table_names(schema=schema)
+                }
+        print(f"Catalog loaded: {len(schemas)} databases, "
+              f"{sum(len(tables) for tables in schemas.values())} tables")
+        return schemas, partitions
+
+    def _schemas(self):
+        with self.lock:
+            if self.schemas is None:
+                self.schemas, self.partitions = self._load()
+            return self.schemas
+
+    def invalidate(self):
+        """Forget everything; the next check reloads from the server."""
+        with self.lock:
+            self.schemas = self.partitions = None
+
+    def databases(self):
+        return list(self._schemas())
+
+    def has_database(self, db):
+        return db in self._schemas()
+
+    def tables(self, db):
+        return list(self._schemas().get(db, {}))
+
+    def has_table(self, db, table_name):
+        return table_name in self._schemas().get(db, {})
+
+    def columns(self, db, table_name):
+        """Column names of ``db``.``table_name`` in table order, or None if it does not exist."""
+        columns = self._schemas().get(db, {}).get(table_name)
+        return list(columns) if columns is not None else None
+
+    def get_partitions(self, db, table_name):
+        """Partition names of ``db``.``table_name`` in order; empty if it is not partitioned."""
+        self._schemas()
+        return list(self.partitions.get((db, table_name), []))
+
+    def create_database(self, db):
+        """CREATE DATABASE ``db`` unless the catalog already has it."""
+        with self.lock:
+            if self.has_database(db):
+                return
+            with self.engine.begin() as conn:
+                conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{db}`"))
+            self.schemas[db] = {}
+
+    def add_table(self, db, table_name, columns):
+        with self.lock:
+            self._schemas().setdefault(db, {})[table_name] = list(columns)
+
+    def add_columns(self, db, table_name, columns):
+        with self.lock:
+            existing = self._schemas().setdefault(db, {}).setdefault(table_name, [])
+            existing.extend(column for column in columns if column not in existing)
+
+    def set_partitions(self, db, table_name, partitions):
+        with self.lock:
+            self._schemas()
+            self.partitions[(db, table_name)] = list(partitions)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def server_key(engine):
+    """Identifies ``engine``'s server: its URL without the database (the file, for SQLite)."""
+    url = engine.url
+    if engine.dialect.name != 'sqlite':
+        # Every database's engine on one server shares its catalog
+        url = url.set(database=None)
+    return url.render_as_string(hide_password=False)
+
+
+def get_catalog(engine=None):
+    """Catalog of ``engine``'s server (the DB_HOST server when None), created once per process."""
+    if engine is None:
+        engine = create_engine(f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}")
+    key = server_key(engine)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            if engine.dialect.name != 'sqlite' and engine.url.database:
+                engine = create_engine(engine.url.set(database=None))
+            catalog = _catalogs[key] = Catalog(engine)
+        return catalog
+
+
+def schema_of(engine, schema=None):
+    """The database ``schema`` refers to on ``engine``: itself, else the engine's own database."""
+    if schema:
+        return schema
+    # A SQLite URL's database is the file; its own tables live in 'main'
+    return 'main' if engine.dialect.name == 'sqlite' else engine.url.database or None
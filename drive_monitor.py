@@ -2,20 +2,17 @@ import pickle
 import os
 import io
 import time
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.oauth2.credentials import Credentials
-from sqlalchemy import create_engine, types, inspect, text
+from sqlalchemy import create_engine, types, text
 from urllib.parse import quote_plus
 import pandas as pd
-from google.auth.transport.requests import Request
-from mapping import *
+from mapping import get_client_name
+from catalog import get_catalog, schema_of
 import json
 from datetime import datetime
 import numpy as np
 import logging
 from app_logging import ETLLogger
+import readers
 from dotenv import load_dotenv
 
 logging.basicConfig(level=logging.INFO)
@@ -33,7 +30,7 @@ def calculate_total_engagements(df):
     """
     Calculate total engagements based on platform with robust error handling.
     """
-    platform = df['platform'].str.lower()
+    platform = df['platform'].astype(object).str.lower()
     linkedin_cols = ['organic likes', 'organic comments', 'total shares', 'poll votes']
     result = np.zeros(len(df))
     
@@ -80,97 +77,161 @@ def get_date_info(date_input):
     }
 
 # Processing different types of google sheets into the database
-# df1 is the new spreadsheet name for the data copied from the spreadsheet
+# Emplifi exports are read straight into the typed frame below
+
+# Emplifi export columns in output order: (target, source columns tried in
+# order, dtype). Sources match the export's headers case-insensitively;
+# anything not listed here is never read.
+EMPLIFI_COLUMNS = [
+    ('Platform', ['platform'], 'string'),
+    ('Content type', ['content type'], 'string'),
+    ('Media Type', ['media type'], 'string'),
+    ('Post Copy', ['content', 'post copy'], 'string'),
+    ('Permalink', ['view on platform', 'permalink'], 'string'),
+    ('Interactions', ['organic interactions'], 'Int64'),
+    ('Sentiment', ['sentiment'], 'string'),
+    ('Positive Comments', ['positive comments'], 'Int64'),
+    ('Negative Comments', ['negative comments'], 'Int64'),
+    ('Neutral Comments', ['neutral comments'], 'Int64'),
+    ('Total Reactions', ['total reactions'], 'Int64'),
+    ('Likes', ['organic likes'], 'Int64'),
+    ('Comments', ['organic comments'], 'Int64'),
+    ('Total Comments', ['total comments'], 'Int64'),
+    ('Shares', ['total shares'], 'Int64'),
+    ('Saves', ['saves'], 'Int64'),
+    ('Engagements', ['engagements'], 'Int64'),
+    ('Like Reactions', ['reactions - like'], 'Int64'),
+    ('Love Reactions', ['reactions - love'], 'Int64'),
+    ('Haha Reactions', ['reactions - haha'], 'Int64'),
+    ('Wow Reactions', ['reactions - wow'], 'Int64'),
+    ('Sad Reactions', ['reactions - sad'], 'Int64'),
+    ('Angry Reactions', ['reactions - angry'], 'Int64'),
+    ('Impressions', ['organic impressions'], 'Int64'),
+    ('Total Likes', ['total likes'], 'Int64'),
+    ('Total Story Likes', ['total story likes'], 'Int64'),
+    ('Total Story Comments', ['total story comments'], 'Int64'),
+    ('Total Story Shares', ['total story shares'], 'Int64'),
+    ('Post Clicks', ['post clicks'], 'Int64'),
+    ('Photo Views', ['photo views'], 'Int64'),
+    ('Link Clicks', ['link clicks'], 'Int64'),
+    ('Video Play', ['video play'], 'Int64'),
+    ('Video Views', ['video view count'], 'Int64'),
+    ('10-Second Views - Organic', ['10-second views - organic'], 'Int64'),
+    ('30-Second Views - Organic', ['30-second views - organic'], 'Int64'),
+    ('Completed Video Views', ['completed video views'], 'Int64'),
+    ('Exits', ['exits'], 'Int64'),
+    ('Taps Back', ['taps back'], 'Int64'),
+    ('Taps Forward', ['taps forward'], 'Int64'),
+    ('Label', ['labels'], 'string'),
+    ('Profile Followers', ['profile followers'], 'Int64'),
+]
+# Angry Orchard tables call organic interactions 'Organic Interactions', everyone else 'Total Interactions'
+EMPLIFI_INTERACTIONS = {'ao': 'Organic Interactions', 'default': 'Total Interactions'}
+# G-P exports add poll votes, which also feed 'total engagements'
+EMPLIFI_GP_COLUMNS = [('Poll Votes', ['poll votes'], 'Int64')]
+EMPLIFI_DATE_COLUMN = 'date'
+
+
+def is_emplifi_export(file_name):
+    """True for the Drive files that go through preprocess_emplifi."""
+    name = file_name.lower()
+    if 'g-p' in name:
+        return True
+    return ('ao' in name or 'angry' in name) and 'historical' not in name and 'export' in name
+
+
+def emplifi_spec(filename, columns):
+    """Resolve the column spec for ``filename`` against the lower-cased ``columns`` of an export.
+
+    Returns ``[(target, source or None, dtype)]``; source is None when the
+    export has none of the target's source columns.
+    """
+    name = filename.lower()
+    spec = list(EMPLIFI_COLUMNS)
+    if 'g-p' in name:
+        spec += EMPLIFI_GP_COLUMNS
+    interactions = EMPLIFI_INTERACTIONS['ao' if 'ao' in filename or 'angry' in filename else 'default']
+    resolved = []
+    for target, sources, dtype in spec:
+        source = next((col for col in sources if col in columns), None)
+        resolved.append((interactions if target == 'Interactions' else target, source, dtype))
+    return resolved
+
+
+def read_emplifi(source, filename):
+    """Parse an Emplifi CSV export directly into the frame preprocess_emplifi returns.
+
+    Only the columns in the spec are read; text columns are parsed straight
+    into 'string'. Count columns are left to the C parser's own int64/float64
+    conversion and cast to Int64 once afterwards: pandas<2 builds nullable
+    integers from strings, several times slower.
+    """
+    header = readers.read_csv_columns(source)
+    source.seek(0)
+    by_lower = {col.lower(): col for col in header}
+    spec = emplifi_spec(filename, by_lower)
+    usecols = {by_lower[src] for _, src, _ in spec if src}
+    if EMPLIFI_DATE_COLUMN in by_lower:
+        usecols.add(by_lower[EMPLIFI_DATE_COLUMN])
+    dtype = {by_lower[src]: dt for _, src, dt in spec if src and dt == 'string'}
+    if EMPLIFI_DATE_COLUMN in by_lower:
+        # get_date_info expects the export's own date strings
+        dtype[by_lower[EMPLIFI_DATE_COLUMN]] = str
+    df = readers.read_csv(source, usecols=list(usecols), dtype=dtype)
+    return preprocess_emplifi(df, filename)
+
+
+def _emplifi_column(df, src, dtype):
+    if src is None:
+        return pd.Series(pd.NA, index=df.index, dtype=dtype)
+    return df[src].astype(dtype, copy=False)
+
 
 def preprocess_emplifi(df, filename):
-    df1 = pd.DataFrame()
+    """Build the Emplifi table rows from an export frame, one typed column per spec entry."""
     df.columns = df.columns.str.lower()
-    print(df.columns)
-    print(df['date'].iloc[1])
-    df1['# of Posts'] = pd.Series([1] * len(df), index=df.index, dtype="Int64")
-  
-    df1['Published Date']=pd.to_datetime(df['date'], errors='coerce').dt.date
-    #errors=coerce means that it will store data in the incorrect format as null
-
-    df1['Platform'] = df['platform'].astype('string')
-    df1['Content type'] = df['content type'].astype('string')
-    df1['Media Type'] = df['media type'].astype('string')
-    
-    # Handle Post Copy conditionally
-    if 'content' in df.columns:
-        df1['Post Copy'] = df['content'].astype('string')
-    else:
-        df1['Post Copy'] = df['post copy'].astype('string')
-    
-    # Handle Permalink conditionally
-    if 'view on platform' in df.columns:
-        df1['Permalink'] = df['view on platform'].astype('string')
-    else:
-        df1['Permalink'] = df['permalink'].astype('string')
-    
-    if 'ao' in filename or 'angry' in filename:
-        df1['Organic Interactions']= df['organic interactions'].astype('Int64')
-    else:
-        df1['Total Interactions'] = df['organic interactions'].astype('Int64')
-    df1['Sentiment'] = df['sentiment'].astype('string')
-    df1['Positive Comments'] = df['positive comments'].astype('Int64')
-    df1['Negative Comments'] = df['negative comments'].astype('Int64')
-    df1['Neutral Comments'] = df['neutral comments'].astype('Int64')
-    df1['Total Reactions'] = df['total reactions'].astype('Int64')
-    df1['Likes'] = df['organic likes'].astype('Int64')
-    df1['Comments'] = df['organic comments'].astype('Int64')
-    df1['Total Comments'] = df['total comments'].astype('Int64')
-    df1['Shares'] = df['total shares'].astype('Int64')
-    df1['Saves'] = df['saves'].astype('Int64')
-
-    # Handle Engagements
-    if 'engagements' in df.columns:
-        df1['Engagements'] = df['engagements'].astype('Int64')
-    else:
-        df1['Engagements'] = pd.NA
-
-    # Reactions and other interaction columns
-    df1['Like Reactions'] = df['reactions - like'].astype('Int64')
-    df1['Love Reactions'] = df['reactions - love'].astype('Int64')
-    df1['Haha Reactions'] = df['reactions - haha'].astype('Int64')
-    df1['Wow Reactions'] = df['reactions - wow'].astype('Int64')
-    df1['Sad Reactions'] = df['reactions - sad'].astype('Int64')
-    df1['Angry Reactions'] = df['reactions - angry'].astype('Int64')
-    df1['Impressions'] = df['organic impressions'].astype('Int64')
-    df1['Total Likes'] = df['total likes'].astype('Int64')
-    df1['Total Story Likes'] = df['total story likes'].astype('Int64')
-    df1['Total Story Comments'] = df['total story comments'].astype('Int64')
-    df1['Total Story Shares'] = df['total story shares'].astype('Int64')
-    df1['Post Clicks'] = df['post clicks'].astype('Int64')
-    df1['Photo Views'] = df['photo views'].astype('Int64')
-    df1['Link Clicks'] = df['link clicks'].astype('Int64')
-    df1['Video Play'] = df['video play'].astype('Int64')
-    df1['Video Views'] = df['video view count'].astype('Int64')
-    df1['10-Second Views - Organic'] = df['10-second views - organic'].astype('Int64')
-    df1['30-Second Views - Organic'] = df['30-second views - organic'].astype('Int64')
-    df1['Completed Video Views'] = df['completed video views'].astype('Int64')
-    df1['Exits'] = df['exits'].astype('Int64')
-    df1['Taps Back'] = df['taps back'].astype('Int64')
-    df1['Taps Forward'] = df['taps forward'].astype('Int64')
-    df1['Label'] = df['labels'].astype('string')
-    df1['Profile Followers'] = df['profile followers'].astype('Int64')
-    
-    # Apply date information functions
-    df1['Month'] = df['date'].apply(lambda x: get_date_info(x)['formatted_month'] if pd.notnull(x) else pd.NA)
-    df1['Quarter'] = df['date'].apply(lambda x: get_date_info(x)['quarter'] if pd.notnull(x) else pd.NA)
-  
+    spec = emplifi_spec(filename, df.columns)
+    missing = [target for target, src, _ in spec if src is None]
+    if missing:
+        print(f"Emplifi export {filename} has no column for: {', '.join(missing)}")
+
+    dates = df[EMPLIFI_DATE_COLUMN]
+    # get_date_info once per distinct date rather than twice per row
+    info = {value: get_date_info(value) for value in dates.dropna().unique()}
+    months = {value: date_info['formatted_month'] for value, date_info in info.items()}
+    quarters = {value: date_info['quarter'] for value, date_info in info.items()}
+    columns = {
+        '# of Posts': pd.Series(1, index=df.index, dtype="Int64"),
+        #errors=coerce means that it will store data in the incorrect format as null
+        'Published Date': pd.to_datetime(dates, errors='coerce').dt.date,
+    }
+    extra = [target for target, _, _ in EMPLIFI_GP_COLUMNS]
+    for target, src, dtype in spec:
+        if target not in extra:
+            columns[target] = _emplifi_column(df, src, dtype)
+    columns['Month'] = dates.map(months)
+    columns['Quarter'] = dates.map(quarters)
+    for target, src, dtype in spec:
+        if target in extra:
+            columns[target] = _emplifi_column(df, src, dtype)
+    df1 = pd.DataFrame(columns)
+
     # Calculate total engagements
     if 'g-p' in filename.lower():
-        print("file is ,",filename)
-
-        df1['Poll Votes'] = df['poll votes'].astype('Int64')
+        # calculate_total_engagements works on the export's own column names
+        raw = df1[[target for target, src, _ in spec if src]]
+        raw.columns = [src for _, src, _ in spec if src]
+        df1['total engagements'] = calculate_total_engagements(raw)
 
-        df1['total engagements'] = calculate_total_engagements(df)
-    
     return df1
 
 def Create_Service(client_secret_env_var_name, token_env_var_name, api_name, api_version, scopes):
     """Create a Google API service using OAuth credentials from env or disk."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
     creds = None
     token_file = f"token_{api_name}_{api_version}.json"
 
@@ -226,20 +287,19 @@ def add_columns_to_mysql_table(engine, table_name, df):
         'float32': 'FLOAT'
     }
     
+    # Existing columns come from the server catalog rather than SHOW COLUMNS
+    catalog, db = get_catalog(engine), schema_of(engine)
+    existing = [column.lower() for column in catalog.columns(db, table_name) or []]
+
     # Connection to execute ALTER TABLE commands
     with engine.connect() as connection:
-        
-        query_1 = f"SHOW COLUMNS FROM `{table_name}`"
-        result = connection.execute(text(query_1))
-        df1 = pd.DataFrame(result.fetchall(), columns=result.keys())
-        df1.columns = df1.columns.str.lower()
         df.columns = df.columns.str.lower()
         
         
         for column in df.columns:
             try:
                 # Infer the appropriate MySQL data type
-                if column not in df1['field'].values:
+                if column not in existing:
                     
                     mysql_type = dtype_mapping.get(str(df[column].dtype), 'VARCHAR(255)')
                     print(mysql_type)
@@ -254,6 +314,7 @@ def add_columns_to_mysql_table(engine, table_name, df):
 
                     # Execute the ALTER TABLE command
                     connection.execute(alter_query)
+                    catalog.add_columns(db, table_name, [column])
 
                     
 
@@ -290,13 +351,16 @@ PROCESSED_FILES_JSON = "processed_files.json"
 processed_files = load_processed_files()
 
 def process_file(file_id, file_name):
+    from googleapiclient.http import MediaIoBaseDownload
     try:
+        service = get_service()
         # Retrieve file metadata and determine MIME type
         file = service.files().get(fileId=file_id, fields='mimeType, name').execute()
         mime_type = file.get('mimeType')
 
         # Choose download method based on file type
-        if mime_type == 'application/vnd.google-apps.spreadsheet':
+        exported_csv = mime_type == 'application/vnd.google-apps.spreadsheet'
+        if exported_csv:
             request = service.files().export_media(fileId=file_id, mimeType='text/csv')
         elif mime_type == 'application/vnd.google-apps.document':
             request = service.files().export_media(fileId=file_id, mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
@@ -316,19 +380,21 @@ def process_file(file_id, file_name):
         # Process CSV and Excel files
         if file_name.endswith('.csv') or file_name.endswith('.xlsx'):
             fh.seek(0)
-            if file_name.endswith('.csv'):
-                df = pd.read_csv(fh,index_col=False)
+            table_name = file_name.replace('.csv', '').replace('.xlsx', '')
+            emplifi = is_emplifi_export(file_name)
+            # Google Sheets were exported as CSV above, whatever their name says
+            if exported_csv or file_name.endswith('.csv'):
+                # Emplifi CSVs are parsed straight into their typed columns
+                df = read_emplifi(fh, table_name) if emplifi else readers.read_csv(fh)
             else:
-                df = pd.read_excel(fh,index_col=False)
-                print(df.head(10))
-                print(df.columns)
+                df = readers.read_excel(fh)
+                if emplifi:
+                    df = preprocess_emplifi(df, table_name)
             
-            table_name = file_name.replace('.csv', '').replace('.xlsx', '')
             print("file_name is .,",table_name)
             if 'g-p' in file_name.lower():
                 db_url_specific = f"{DB_URL_PREFIX}/g_p"
                 db_engine_specific = create_engine(db_url_specific)
-                df = preprocess_emplifi(df, table_name)                
                 df.to_sql('G-P Historical Data1', db_engine_specific, index=False, if_exists='append')
                 print(f"Data from {file_name} uploaded to MySQL table {table_name}.")
                 
@@ -346,7 +412,6 @@ def process_file(file_id, file_name):
                                 result = connection.execute(text(query1))
                                 df1 = pd.DataFrame(result.fetchall(), columns=result.keys())
 
-                            df = preprocess_emplifi(df, table_name)     
                             print("Preprocessing Done")
                             df = pd.concat([df1, df], axis=0,ignore_index = True)           
                             df.to_sql('AO Historical Data1', db_engine_specific, index=False, if_exists='replace',dtype=dtype_dict)
@@ -356,12 +421,12 @@ def process_file(file_id, file_name):
             # Check if table exists
                 try:
                 # Get available databases and client name
-                    dbs = get_available_db()
+                    catalog = get_catalog()
                     db = get_client_name(table_name)
                     table_name = f"{db} Historical Data"
                     
                     # Check if database exists
-                    if db in dbs.values:
+                    if catalog.has_database(db):
                         print(f"Client Name of File {file_name} found in database list")
                     else:
                         print(f"Client Name of File {file_name} not found in database list. Creating database {db}")
@@ -391,9 +456,8 @@ def process_file(file_id, file_name):
                     table_name = "Historical Data"
                     table_exists = False
                     # Check if table file_name is .,
-                    inspector = inspect(db_engine_specific)
-                    print("tables are like: ",inspector.get_table_names())
-                    for i in inspector.get_table_names():
+                    print("tables are like: ",catalog.tables(db))
+                    for i in catalog.tables(db):
                         if table_name in i:
                             print("Yes There's a table named",i, "matched with", table_name)
                             table_exists = True
@@ -406,6 +470,7 @@ def process_file(file_id, file_name):
                     if not table_exists:
                         print("No table named", table_name, "exists in the database")
                         df.to_sql(name=f"{db} Historical Data", con=db_engine_specific, if_exists='replace', dtype=dtype_dict,index=False)
+                        catalog.add_table(db, f"{db} Historical Data", df.columns)
                         print(f"Table named {db} historical Data successfully inserted")
                         table_exists = False
 
@@ -425,7 +490,7 @@ def process_file(file_id, file_name):
 def monitor_drive_folder(run_id=None, logger: ETLLogger = None):
     files_ingested = []
     while True:
-        response = service.files().list(q=query).execute()
+        response = get_service().files().list(q=query).execute()
         files = response.get('files', [])
         print(pd.DataFrame(files))
         
@@ -453,13 +518,20 @@ def monitor_drive_folder(run_id=None, logger: ETLLogger = None):
 API_NAME = 'drive'
 API_VERSION = 'v3'
 SCOPES = ['https://www.googleapis.com/auth/drive']
-service = Create_Service(
-    "google_drive_client_secret",
-    "google_drive_token",
-    API_NAME,
-    API_VERSION,
-    SCOPES,
-)
+_service = None
+
+def get_service():
+    """Drive service, authorised on first use rather than at import."""
+    global _service
+    if _service is None:
+        _service = Create_Service(
+            "google_drive_client_secret",
+            "google_drive_token",
+            API_NAME,
+            API_VERSION,
+            SCOPES,
+        )
+    return _service
 
 folder_id = "1YCPgHFsVIvhlzq932eaFYm_Nn_0iFbkA"
 query = f"'{folder_id}' in parents and trashed = false"
@@ -0,0 +1,380 @@
+"""Dry-run plans for the nightly load and for backfills (``--explain``).
+
+    python run_historical.py --start 2021-01-01 --end 2024-12-31 --output sql --explain
+    python load.py --explain --map-file map.json
+
+A plan lists what a run would fetch: its work units, the accounts in them,
+the date windows each account is asked for and the pages each window is
+expected to return. From those it estimates requests, rows and duration.
+No data endpoint is called. Windows and rows come from the rates earlier
+runs left in ``extract_window_stats`` (see windowing.py), and the time per
+request from the daily runs logged in ``etl_logs.api_calls``.
+
+Requests per fetch follow the extractors in extract.py:
+
+    facebook  one insights request per page of each window, plus the ad set listing in the daily run
+    tiktok    the campaign listing, then per campaign the ad group listing and
+              one report request per page of each window
+    linkedin  the campaign group and campaign listings (one group counted), then one
+              analytics request per campaign; the daily run's creative lookups are not counted
+    youtube   one search per page of each window
+
+``api_calls`` holds one duration per client, platform and daily run, so a
+platform's seconds per request are the time its daily runs logged over the
+requests those runs are expected to make. An account with no recorded rate
+counts one page per ``--chunk-days`` window, and an account with no
+recorded campaign count counts one campaign. Both are listed, as the plan
+is only a lower bound for them.
+"""
+import math
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+
+from fetch_plan import AccountFetchPlan
+from ledger import ledger_url
+from platforms import CHUNK_DAYS, PLATFORMS
+from windowing import ADAPTIVE_WINDOWS, PROFILES, WINDOW_STATS_URL, AdaptiveWindows
+
+load_dotenv()
+
+EXPLAIN_TELEMETRY_URL = os.getenv("EXPLAIN_TELEMETRY_URL", "etl_logs")
+EXPLAIN_HISTORY_DAYS = int(os.getenv("EXPLAIN_HISTORY_DAYS", "30"))
+# Seconds per request assumed for a platform without api_calls history
+DEFAULT_SECONDS_PER_REQUEST = float(os.getenv("EXPLAIN_SECONDS_PER_REQUEST", "1.0"))
+# Accounts listed by name in each section of a plan
+LISTED_ACCOUNTS = 10
+
+
+class PlanStats:
+    """Window stats as read when planning; a plan never writes them."""
+
+    def __init__(self, rates=None, campaign_counts=None):
+        self.rates = rates or {}
+        self.campaign_counts = campaign_counts or {}
+
+    def get(self, platform, account):
+        return self.rates.get((platform, str(account)))
+
+    def campaigns(self, platform, account):
+        return self.campaign_counts.get((platform, str(account)))
+
+    def set(self, *args, **kwargs):
+        pass
+
+
+def read_plan_stats(url=WINDOW_STATS_URL):
+    """PlanStats from the window stats store at ``url``, read without creating or altering anything.
+
+    A missing sqlite file or ``extract_window_stats`` table means no stats,
+    as on a first run.
+    """
+    url = ledger_url(url)
+    try:
+        parsed = make_url(url)
+        if (parsed.get_backend_name() == 'sqlite' and parsed.database not in (None, '', ':memory:')
+                and not os.path.exists(parsed.database)):
+            return PlanStats()
+        engine = create_engine(url)
+        try:
+            with engine.connect() as conn:
+                if not inspect(conn).has_table('extract_window_stats'):
+                    return PlanStats()
+                columns = {column['name'] for column in inspect(conn).get_columns('extract_window_stats')}
+                campaigns = 'campaigns' if 'campaigns' in columns else 'NULL'
+                rows = conn.execute(text(f"SELECT platform, account, rows_per_day, {campaigns} "
+                                         "FROM extract_window_stats")).all()
+        finally:
+            engine.dispose()
+    except Exception as e:
+        print(f"Window stats unavailable ({e}); planning windows from chunk_days")
+        return PlanStats()
+    return PlanStats({(key, name): rate for key, name, rate, _ in rows if rate is not None},
+                     {(key, name): count for key, name, _, count in rows if count is not None})
+
+
+class FetchEstimate:
+    """Windows, requests and rows expected from one fetch of ``account`` over ``start``..``end``."""
+
+    def __init__(self, platform, account, start, end, chunk_days, stats, daily=False):
+        self.platform = platform
+        self.account = str(account)
+        self.rows_per_day = stats.get(platform, self.account)
+        self.campaigns = stats.campaigns(platform, self.account)
+        self.windows = 0
+        self.pages = 0
+        if platform in PROFILES:
+            page_size = PROFILES[platform].page_size
+            # The rate is not updated between windows, so they are the ones the run would start with
+            for window_start, window_end in AdaptiveWindows(platform, account, start, end, chunk_days, stats=stats):
+                self.windows += 1
+                rows = (self.rows_per_day or 0) * ((window_end - window_start).days + 1)
+                self.pages += max(1, math.ceil(rows / page_size))
+        self.no_rate = platform in PROFILES and self.rows_per_day is None
+        self.no_campaigns = platform in ('tiktok', 'linkedin') and self.campaigns is None
+        campaigns = 1 if self.campaigns is None else self.campaigns
+        days = (end - start).days + 1
+        self.rows = None if self.rows_per_day is None else self.rows_per_day * days
+        if platform == 'tiktok':
+            self.requests = max(1, math.ceil(campaigns / 1000)) + campaigns * (1 + self.pages)
+            self.windows *= campaigns
+            self.rows = None if self.rows is None else self.rows * campaigns
+        elif platform == 'linkedin':
+            self.requests = 2 + campaigns
+        else:
+            self.requests = self.pages + (1 if daily and platform == 'facebook' else 0)
+
+
+def daily_range(platform, day):
+    """First and last day the daily run asks ``platform`` for, ending on ``day``."""
+    days = CHUNK_DAYS if platform == 'tiktok' else 1
+    return day - timedelta(days=days - 1), day
+
+
+def daily_estimate(platform, account, day, stats):
+    start, end = daily_range(platform, day)
+    return FetchEstimate(platform, account, start, end, (end - start).days + 1, stats, daily=True)
+
+
+def _accounts(platforms, platform):
+    accounts = platforms.get(platform)
+    return list(dict.fromkeys(map(tuple, accounts))) if isinstance(accounts, list) else []
+
+
+def stream_durations(engine, until=None, days=EXPLAIN_HISTORY_DAYS):
+    """Average seconds per run day of each ``(client, platform)`` stream in ``api_calls``.
+
+    As in sharding.client_durations, only successful calls logged in the
+    ``days`` days before ``until`` (default: the start of today) count.
+    """
+    until = until or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT client, endpoint, SUM(duration_seconds) / COUNT(DISTINCT DATE(created_at))
+            FROM api_calls
+            WHERE created_at >= :since AND created_at < :until AND client IS NOT NULL AND success
+            GROUP BY client, endpoint
+        """), {'since': until - timedelta(days=days), 'until': until})
+        # load.transformed_batches logs each stream under '<platform>_endpoint'
+        return {(client, endpoint[:-len('_endpoint')]): float(seconds or 0)
+                for client, endpoint, seconds in rows if endpoint and endpoint.endswith('_endpoint')}
+
+
+def telemetry_engine():
+    """Engine for the database holding ``api_calls`` (EXPLAIN_TELEMETRY_URL)."""
+    return create_engine(ledger_url(EXPLAIN_TELEMETRY_URL))
+
+
+def read_durations():
+    """``stream_durations`` from ``telemetry_engine()``, empty if they cannot be read."""
+    try:
+        return stream_durations(telemetry_engine())
+    except Exception as e:
+        print(f"Could not read api_calls ({e}); assuming {DEFAULT_SECONDS_PER_REQUEST:g}s per request")
+        return {}
+
+
+def seconds_per_request(mapping, stats, durations):
+    """Seconds per request of each platform: its logged daily time over the requests of those daily runs."""
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    seconds, requests, counted = {}, {}, set()
+    for (client, platform), logged in durations.items():
+        accounts = _accounts(mapping.get(client, {}), platform)
+        if platform not in PLATFORMS or not accounts:
+            continue
+        seconds[platform] = seconds.get(platform, 0.0) + logged
+        for account_id, _ in accounts:
+            # A daily run fetches an account shared by several clients once
+            if (platform, str(account_id)) not in counted:
+                counted.add((platform, str(account_id)))
+                requests[platform] = requests.get(platform, 0) + daily_estimate(platform, account_id, day,
+                                                                                stats).requests
+    return {platform: seconds[platform] / requests[platform] for platform in seconds if requests.get(platform)}
+
+
+def _count(value, partial=False):
+    if value is None:
+        return "?"
+    return f"{value:,.0f}{'+' if partial else ''}"
+
+
+def _duration(seconds):
+    minutes = round(seconds / 60)
+    if minutes < 1:
+        return f"{seconds:.0f}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+
+def _listed(names):
+    names = sorted(names)
+    more = f" (+{len(names) - LISTED_ACCOUNTS} more)" if len(names) > LISTED_ACCOUNTS else ""
+    return ", ".join(names[:LISTED_ACCOUNTS]) + more
+
+
+def print_plan(reads, estimates, units, mapping, stats, shared=True, workers=None):
+    """Print a plan.
+
+    ``reads`` has one ``(client, platform, account_id, account_name, key)``
+    entry per account a unit reads, ``estimates`` the FetchEstimate of each
+    fetch key and ``units`` the work units per platform. With ``shared``
+    each key is fetched once however many units read it (AccountFetchPlan).
+    ``workers`` is the backfill's concurrency, from which the wall clock
+    time is estimated. Returns the estimated API seconds.
+    """
+    fetches = AccountFetchPlan((platform, account_id, key[2]) for _, platform, account_id, _, key in reads)
+    per_request = seconds_per_request(mapping, stats, read_durations())
+
+    totals = {platform: {'accounts': set(), 'fetches': 0, 'windows': 0, 'requests': 0, 'rows': None,
+                         'partial': False}
+              for platform in PLATFORMS}
+    by_account = {}
+    for key, fetch in fetches.fetches.items():
+        estimate = estimates[key]
+        platform = key[0]
+        times = 1 if shared else fetch.owners
+        total = totals[platform]
+        total['accounts'].add(key[1])
+        total['fetches'] += times
+        total['windows'] += estimate.windows * times
+        total['requests'] += estimate.requests * times
+        if estimate.rows is None:
+            total['partial'] = True
+        else:
+            total['rows'] = (total['rows'] or 0) + estimate.rows * times
+        account = by_account.setdefault(key[:2], {'requests': 0, 'windows': 0, 'no_rate': False,
+                                                  'no_campaigns': False})
+        account['requests'] += estimate.requests * times
+        account['windows'] += estimate.windows * times
+        account['no_rate'] |= estimate.no_rate
+        account['no_campaigns'] |= estimate.no_campaigns
+
+    print(f"{'platform':<10} {'accounts':>8} {'units':>7} {'fetches':>8} {'windows':>8} {'requests':>9} "
+          f"{'rows':>12} {'s/request':>10} {'API time':>9}")
+    api_seconds = {}
+    for platform, total in totals.items():
+        if not total['fetches']:
+            continue
+        seconds = per_request.get(platform, DEFAULT_SECONDS_PER_REQUEST)
+        api_seconds[platform] = total['requests'] * seconds
+        known = '' if platform in per_request else '*'
+        print(f"{platform:<10} {len(total['accounts']):>8,} {units.get(platform, 0):>7,} {total['fetches']:>8,} "
+              f"{total['windows']:>8,} {total['requests']:>9,} {_count(total['rows'], total['partial']):>12} "
+              f"{seconds:>9.2f}{known or ' '} {_duration(api_seconds[platform]):>9}")
+    if not api_seconds:
+        print("Nothing to fetch")
+        return 0.0
+    requests = {platform: total['requests'] for platform, total in totals.items()}
+    rows = [total['rows'] for total in totals.values() if total['rows'] is not None]
+    partial = any(total['partial'] for total in totals.values())
+    print(f"{'total':<10} {'':>8} {sum(units.values()):>7,} {sum(t['fetches'] for t in totals.values()):>8,} "
+          f"{sum(t['windows'] for t in totals.values()):>8,} {sum(requests.values()):>9,} "
+          f"{_count(sum(rows) if rows else None, partial):>12} {'':>10} {_duration(sum(api_seconds.values())):>9}")
+    if set(api_seconds) - set(per_request):
+        print(f"* no api_calls history in the last {EXPLAIN_HISTORY_DAYS} days; "
+              f"{DEFAULT_SECONDS_PER_REQUEST:g}s per request assumed (EXPLAIN_SECONDS_PER_REQUEST)")
+    if partial:
+        print("Rows marked + or ? leave out accounts with no recorded rate; LinkedIn keeps none")
+
+    owners = {}
+    for client, platform, account_id, account_name, _ in reads:
+        owners.setdefault((platform, str(account_id)), {}).setdefault(client, set()).add(account_name)
+    duplicated = {account: names for account, names in owners.items()
+                  if sum(len(accounts) for accounts in names.values()) > 1}
+    if duplicated:
+        extra = sum(estimates[key].requests * (fetch.owners - 1) for key, fetch in fetches.fetches.items()
+                    if key[:2] in duplicated)
+        if shared:
+            print(f"\nAccounts listed more than once, fetched once and shared ({extra:,} requests saved):")
+        else:
+            print(f"\nAccounts listed more than once, fetched once per listing ({extra:,} extra requests):")
+        for (platform, account_id), names in sorted(duplicated.items()):
+            listings = "; ".join(f"{client} as {', '.join(sorted(map(repr, accounts)))}"
+                                 for client, accounts in sorted(names.items()))
+            print(f"  {platform} {account_id}: {listings}")
+
+    no_rate = [f"{platform} {account_id}" for (platform, account_id), account in by_account.items()
+               if account['no_rate']]
+    if no_rate:
+        print(f"\nNo recorded rate, one page per window counted ({len(no_rate)}): {_listed(no_rate)}")
+    no_campaigns = [f"{platform} {account_id}" for (platform, account_id), account in by_account.items()
+                    if account['no_campaigns']]
+    if no_campaigns:
+        print(f"No recorded campaign count, one campaign counted ({len(no_campaigns)}): {_listed(no_campaigns)}")
+
+    heaviest = sorted(by_account.items(), key=lambda item: -item[1]['requests'])[:LISTED_ACCOUNTS]
+    print("\nMost requests:")
+    for (platform, account_id), account in heaviest:
+        seconds = account['requests'] * per_request.get(platform, DEFAULT_SECONDS_PER_REQUEST)
+        windows = f"{account['windows']:,} window{'' if account['windows'] == 1 else 's'}"
+        print(f"  {platform} {account_id}: {account['requests']:,} requests in {windows}, ~{_duration(seconds)}")
+
+    total_seconds = sum(api_seconds.values())
+    if workers is None:
+        return total_seconds
+    # A backfill is held back by its workers, a platform's concurrency limit or its request rate
+    bounds = {f"{workers} workers": total_seconds / workers}
+    for platform, seconds in api_seconds.items():
+        concurrency = min(PLATFORMS[platform].concurrency, workers)
+        bounds[f"{platform} at {concurrency} units at a time ({platform.upper()}_BACKFILL_CONCURRENCY)"] = \
+            seconds / concurrency
+        limit = PLATFORMS[platform].rate_limit
+        if limit:
+            bounds[f"{platform} at {limit['rate']:g} requests/s"] = requests[platform] / limit['rate']
+    binding = max(bounds, key=bounds.get)
+    print(f"\nEstimated duration: ~{_duration(bounds[binding])} wall clock for ~{_duration(total_seconds)} "
+          f"of API time, bound by {binding}")
+    return total_seconds
+
+
+def explain_backfill(clients, units, chunk_days, workers=None, shared=True, from_staging=False):
+    """Print the plan of a backfill of ``clients`` made of ``units`` (util.historical_fetch.plan_units).
+
+    ``workers`` is None when the units go to the work queue, which also
+    fetches shared accounts once per listing (``shared`` False).
+    """
+    print(f"Plan: {len(units):,} units for {len(clients)} client{'' if len(clients) == 1 else 's'}; "
+          + (f"adaptive windows, {chunk_days} days for an account with no history" if ADAPTIVE_WINDOWS
+             else f"fixed {chunk_days}-day windows"))
+    if from_staging:
+        print("Units replay staged raw data; no API requests")
+        return
+    stats = read_plan_stats()
+    reads, estimates, per_platform = [], {}, {}
+    for client, platform, _, platforms, chunk_start, chunk_end in units:
+        per_platform[platform] = per_platform.get(platform, 0) + 1
+        for account_id, account_name in _accounts(platforms, platform):
+            key = (platform, str(account_id), (chunk_start, chunk_end))
+            if key not in estimates:
+                estimates[key] = FetchEstimate(platform, account_id, chunk_start, chunk_end, chunk_days, stats)
+            reads.append((client, platform, account_id, account_name, key))
+    seconds = print_plan(reads, estimates, per_platform, clients, stats, shared, workers)
+    if seconds and workers is None:
+        print(f"\nEstimated duration: ~{_duration(seconds)} of API time, split between the queue workers")
+
+
+def explain_daily(mapping, shared=True, day=None):
+    """Print the plan of one daily run (``load.main()``) over ``mapping``, loading ``day`` (default: yesterday)."""
+    day = day or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    stats = read_plan_stats()
+    reads, estimates, per_platform = [], {}, {}
+    for client, platforms in mapping.items():
+        for platform in PLATFORMS:
+            accounts = _accounts(platforms, platform)
+            if accounts:
+                # load.main() streams one client and platform at a time
+                per_platform[platform] = per_platform.get(platform, 0) + 1
+            for account_id, account_name in accounts:
+                key = (platform, str(account_id), None)
+                if key not in estimates:
+                    estimates[key] = daily_estimate(platform, account_id, day, stats)
+                reads.append((client, platform, account_id, account_name, key))
+    print(f"Plan: daily run for {day:%Y-%m-%d}, {len(mapping)} clients "
+          f"(units are client and platform streams)")
+    seconds = print_plan(reads, estimates, per_platform, mapping, stats, shared)
+    if seconds:
+        print(f"\nEstimated duration: ~{_duration(seconds)} of API time, "
+              + ("one stream after another" if shared else "split between the queue workers"))
@@ -0,0 +1,103 @@
+"""Account-level extraction planning.
+
+The mapping can list one platform account under several (client, account
+name) entries. ``AccountFetchPlan`` makes sure each such account is
+extracted once per date window: the first owner to ask fetches it, owners
+asking while that fetch is in flight wait for it, and every owner then gets
+the raw batches with 'Ad Account Name' set to its own name. Accounts with a
+single owner are streamed straight through, as before.
+
+A shared account's batches are held in memory until its last owner has read
+them, so only shared accounts cost memory.
+"""
+import threading
+
+
+class _SharedFetch:
+    def __init__(self):
+        self.owners = 0
+        self.remaining = 0
+        self.started = False
+        self.done = threading.Event()
+        self.batches = None
+        self.error = None
+
+
+class AccountFetchPlan:
+    """Single-flight fetches for the (platform, account_id, window) keys that will be read.
+
+    ``keys`` has one entry per expected read, so an account listed for two
+    clients appears twice.
+    """
+
+    def __init__(self, keys):
+        self.lock = threading.Lock()
+        self.fetches = {}
+        for key in keys:
+            entry = self.fetches.setdefault(self._key(*key), _SharedFetch())
+            entry.owners += 1
+            entry.remaining += 1
+
+    @classmethod
+    def from_mapping(cls, mapping, window=None):
+        """Plan for one daily run over ``mapping`` (``{client: {platform: [(id, name), ...]}}``)."""
+        return cls((platform, account_id, window)
+                   for platforms in mapping.values()
+                   for platform, accounts in platforms.items() if isinstance(accounts, list)
+                   for account_id, _ in dict.fromkeys(map(tuple, accounts)))
+
+    @staticmethod
+    def _key(platform, account_id, window):
+        return platform, str(account_id), window
+
+    def is_shared(self, platform, account_id, window=None):
+        fetch = self.fetches.get(self._key(platform, account_id, window))
+        return fetch is not None and fetch.owners > 1
+
+    def iter_batches(self, platform, accounts, fetch, window=None):
+        """Yield raw batches for ``accounts`` (``[(id, name), ...]``) in order.
+
+        ``fetch(platforms)`` extracts the accounts in a ``{platform: accounts}``
+        dict. Runs of unshared accounts go to one ``fetch`` call; shared
+        accounts are fetched once per plan and replayed to each owner.
+        """
+        run = []
+        for account_id, account_name in dict.fromkeys(map(tuple, accounts)):
+            if not self.is_shared(platform, account_id, window):
+                run.append((account_id, account_name))
+                continue
+            if run:
+                yield from fetch({platform: run})
+                run = []
+            yield from self._shared(self._key(platform, account_id, window), account_name,
+                                    lambda: fetch({platform: [(account_id, account_name)]}))
+        if run:
+            yield from fetch({platform: run})
+
+    def _shared(self, key, account_name, fetch):
+        entry = self.fetches[key]
+        with self.lock:
+            leader = not entry.started
+            entry.started = True
+        try:
+            if leader:
+                print(f"Fetching shared {key[0]} account {key[1]} once for {entry.owners} owners")
+                try:
+                    entry.batches = list(fetch())
+                except Exception as e:
+                    entry.error = e
+                finally:
+                    entry.done.set()
+            else:
+                entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            for batch in entry.batches:
+                # A copy per owner: preprocess_* renames columns in place
+                yield batch.assign(**{'Ad Account Name': account_name}) if 'Ad Account Name' in batch.columns \
+                    else batch.copy()
+        finally:
+            with self.lock:
+                entry.remaining -= 1
+                if entry.remaining <= 0:
+                    self.fetches.pop(key, None)
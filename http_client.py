@@ -0,0 +1,347 @@
+"""Shared rate-limited HTTP client for the platform APIs.
+
+Every extractor and account-discovery call goes through ``get_client(platform)``,
+which returns one client per platform shared across threads. Each client
+holds a token bucket that adapts to the usage headers the platform returns
+(``x-business-use-case-usage`` / ``x-app-usage`` / ``x-ad-account-usage`` on
+the Graph API, ``X-RateLimit-*`` elsewhere) and retries 429/5xx responses with
+jittered exponential backoff.
+
+Connections are pooled and kept alive in one ``requests.Session`` per host,
+shared by every client. Pool sizes follow ``HTTP_POOL_SIZE`` (or
+``configure_transport``) so they can match the extraction concurrency. When
+``httpx`` with HTTP/2 support is installed, hosts in ``HTTP2_HOSTS`` are
+served over multiplexed HTTP/2 connections instead.
+"""
+import importlib.util
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# httpx (and h2, which it needs for http2=True) is only imported once an
+# HTTP/2 session is actually created
+HTTP2_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('httpx', 'h2'))
+
+logger = logging.getLogger('etl_pipeline.http')
+
+# Requests per second each platform starts at, the ceiling it may probe up to
+# and the burst it may spend at once. The bucket slows down as usage headers
+# climb or the platform throttles, and speeds up again while usage stays low or
+# the platform reports none. Override with e.g. TIKTOK_RATE_LIMIT=20 and
+# TIKTOK_MAX_RATE=200.
+PLATFORM_LIMITS = {
+    'facebook': {'rate': 5.0, 'max_rate': 50.0, 'burst': 10},
+    'tiktok': {'rate': 10.0, 'max_rate': 100.0, 'burst': 20},
+    'linkedin': {'rate': 5.0, 'max_rate': 100.0, 'burst': 10},
+    'default': {'rate': 5.0, 'max_rate': 50.0, 'burst': 10},
+}
+
+DEFAULT_TIMEOUT = (10, 60)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2", "1") != "0"
+HTTP2_HOSTS = {'graph.facebook.com', 'business-api.tiktok.com', 'api.linkedin.com'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+TIKTOK_THROTTLE_CODES = {40100, 40133}
+_TIKTOK_CODE = re.compile(rb'\s*\{\s*"code"\s*:\s*(\d+)')
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate can be tuned at runtime."""
+
+    def __init__(self, rate, burst, max_rate=None):
+        self.min_rate = rate * 0.05
+        self.max_rate = max(rate, max_rate or rate)
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for ``seconds`` (e.g. after a 429)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+    def adapt(self, usage_pct):
+        """Slow down as reported quota usage climbs, probe upwards while it is low."""
+        with self.lock:
+            if usage_pct >= 90:
+                self.rate = max(self.min_rate, self.rate * 0.5)
+            elif usage_pct >= 75:
+                self.rate = max(self.min_rate, self.rate * 0.8)
+            elif usage_pct < 50:
+                self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+def parse_usage(headers):
+    """Return ``(usage_pct, pause_seconds)`` from platform rate-limit headers.
+
+    ``usage_pct`` is the highest quota percentage reported, or None when the
+    response carries no usage headers.
+    """
+    usage = []
+    pause = 0.0
+
+    for name in ('x-app-usage', 'x-ad-account-usage', 'x-business-use-case-usage'):
+        raw = headers.get(name)
+        if not raw:
+            continue
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            continue
+        entries = [payload] if name != 'x-business-use-case-usage' else \
+            [entry for entries in payload.values() for entry in entries]
+        for entry in entries:
+            for key in ('call_count', 'total_cputime', 'total_time', 'acc_id_util_pct'):
+                if key in entry:
+                    usage.append(float(entry[key]))
+            # Graph reports the lock-out in minutes
+            pause = max(pause, float(entry.get('estimated_time_to_regain_access', 0) or 0) * 60)
+            if float(entry.get('acc_id_util_pct', 0) or 0) >= 100:
+                pause = max(pause, float(entry.get('reset_time_duration', 0) or 0))
+
+    limit = headers.get('X-RateLimit-Limit')
+    remaining = headers.get('X-RateLimit-Remaining')
+    if limit and remaining is not None:
+        try:
+            limit, remaining = float(limit), float(remaining)
+            if limit > 0:
+                usage.append(100 * (1 - remaining / limit))
+            if remaining <= 0:
+                reset = float(headers.get('X-RateLimit-Reset', 1))
+                # Some APIs send the reset as an epoch timestamp, not seconds
+                now = time.time()
+                pause = max(pause, reset - now if reset > now else reset)
+        except ValueError:
+            pass
+
+    return (max(usage) if usage else None), pause
+
+
+def retry_after(headers):
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class HTTP2Adapter(BaseAdapter):
+    """``requests`` adapter that sends requests over a pooled httpx HTTP/2 client.
+
+    Responses and errors are translated back to ``requests`` types so callers
+    cannot tell which transport served them.
+    """
+
+    def __init__(self, pool_size):
+        super().__init__()
+        import httpx
+        self.httpx = httpx
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.client = httpx.Client(http2=True, limits=limits)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        try:
+            r = self.client.request(
+                request.method, request.url, headers=dict(request.headers), content=request.body,
+                timeout=self.httpx.Timeout(read, connect=connect),
+            )
+        except self.httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except self.httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = r.status_code
+        response.reason = r.reason_phrase
+        response.headers = CaseInsensitiveDict(r.headers)
+        response._content = r.content
+        response.encoding = r.encoding
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+class Transport:
+    """Keep-alive sessions shared by every client, one per host."""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, http2=HTTP2_ENABLED):
+        self.pool_size = pool_size
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _mount(self, session, host):
+        if self.http2 and host in HTTP2_HOSTS:
+            session.mount('https://', HTTP2Adapter(self.pool_size))
+        else:
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+
+    def session_for(self, url):
+        """Return the pooled session for ``url``'s host."""
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    self._mount(session, urlsplit(url).hostname)
+                    self._sessions[host] = session
+        return session
+
+    def configure(self, pool_size=None, http2=None):
+        """Resize the pools (e.g. to the number of extraction workers)."""
+        with self._lock:
+            if pool_size is not None:
+                self.pool_size = pool_size
+            if http2 is not None:
+                self.http2 = http2 and HTTP2_AVAILABLE
+            for host, session in self._sessions.items():
+                for adapter in session.adapters.values():
+                    adapter.close()
+                self._mount(session, urlsplit(f"//{host}").hostname)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+transport = Transport()
+
+
+def configure_transport(pool_size=None, http2=None):
+    """Size the shared connection pools to the extraction concurrency."""
+    transport.configure(pool_size=pool_size, http2=http2)
+
+
+class RateLimitedClient:
+    """HTTP client for one platform: shared token bucket and retries over the shared transport."""
+
+    def __init__(self, platform, rate=None, burst=None, max_retries=5, backoff_base=1.0, backoff_cap=60.0,
+                 timeout=DEFAULT_TIMEOUT):
+        limits = PLATFORM_LIMITS.get(platform, PLATFORM_LIMITS['default'])
+        rate = rate or float(os.getenv(f"{platform.upper()}_RATE_LIMIT", limits['rate']))
+        max_rate = float(os.getenv(f"{platform.upper()}_MAX_RATE", limits['max_rate']))
+        self.platform = platform
+        self.bucket = TokenBucket(rate, burst or limits['burst'], max_rate)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+
+    def _is_throttled(self, response):
+        if response.status_code == 429:
+            return True
+        # TikTok reports rate limiting as HTTP 200 with an error code in the body
+        if self.platform == 'tiktok':
+            match = _TIKTOK_CODE.match(response.content[:64])
+            return bool(match) and int(match.group(1)) in TIKTOK_THROTTLE_CODES
+        return False
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, url, timeout=None, max_retries=None, **kwargs):
+        """Send a request, retrying throttled, 5xx and network failures.
+
+        Returns the last response once retries are exhausted, so callers keep
+        using ``raise_for_status()`` as before; network errors are re-raised.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        session = transport.session_for(url)
+        for attempt in range(max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"{self.platform} request failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            usage, pause = parse_usage(response.headers)
+            if usage is not None:
+                self.bucket.adapt(usage)
+            elif response.status_code < 400:
+                # No usage reported: keep probing upwards until throttled
+                self.bucket.adapt(0)
+            if pause:
+                self.bucket.pause(min(pause, self.backoff_cap))
+
+            throttled = self._is_throttled(response)
+            if not throttled and response.status_code not in RETRY_STATUSES:
+                return response
+            if attempt == max_retries:
+                return response
+
+            requested = retry_after(response.headers)
+            delay = min(requested or self.backoff(attempt), self.backoff_cap)
+            if requested and requested > delay:
+                logger.warning(f"{self.platform} asked to retry after {requested:.0f}s; "
+                               f"waiting {delay:.1f}s (backoff_cap)")
+            if throttled:
+                self.bucket.adapt(100)
+                self.bucket.pause(delay)
+            logger.warning(f"{self.platform} returned {response.status_code}"
+                           f"{' (throttled)' if throttled else ''}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(platform):
+    """Return the process-wide client for ``platform``."""
+    client = _clients.get(platform)
+    if client is None:
+        with _clients_lock:
+            client = _clients.setdefault(platform, RateLimitedClient(platform))
+    return client
@@ -0,0 +1,95 @@
+"""Ledger of backfill work units.
+
+Each (client, platform, account, date chunk, output) unit gets one row in
+``backfill_units`` recording whether it finished, how many rows it wrote and
+under which run. Backfills mark units as they go, so ``--resume`` can skip
+everything already written. The ledger is a local SQLite file by default;
+``--ledger etl_logs`` keeps it next to the other pipeline logs in MySQL.
+"""
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+LEDGER_URL = os.getenv("BACKFILL_LEDGER_URL", "sqlite:///backfill_ledger.db")
+
+
+def ledger_url(name):
+    """SQLAlchemy URL for ``name``: 'etl_logs' for the MySQL log database, or any URL as-is."""
+    if name == 'etl_logs':
+        return f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/etl_logs"
+    return name
+
+
+def unit_key(client, platform, account, chunk_start, chunk_end, output):
+    raw = f"{client}|{platform}|{account}|{chunk_start:%Y-%m-%d}|{chunk_end:%Y-%m-%d}|{output}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class WorkUnitLedger:
+    def __init__(self, url=LEDGER_URL):
+        connect_args = {'check_same_thread': False} if url.startswith('sqlite') else {}
+        self.engine = create_engine(url, connect_args=connect_args)
+        # SQLite allows one writer at a time; serialising here avoids "database is locked"
+        self.lock = threading.Lock()
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS backfill_units (
+                    unit_key CHAR(40) PRIMARY KEY,
+                    run_id VARCHAR(255),
+                    client VARCHAR(255),
+                    platform VARCHAR(50),
+                    account VARCHAR(255),
+                    chunk_start DATE,
+                    chunk_end DATE,
+                    output VARCHAR(20),
+                    status VARCHAR(20),
+                    rows_written INT,
+                    error_message TEXT,
+                    updated_at DATETIME
+                )
+            """))
+
+    def done_keys(self):
+        """Keys of every unit recorded as done."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT unit_key FROM backfill_units WHERE status = 'done'"))
+            return {row[0] for row in rows}
+
+    def last_run_id(self):
+        """Run ID of the most recently updated unit, if any."""
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT run_id FROM backfill_units ORDER BY updated_at DESC LIMIT 1")).first()
+        return row[0] if row else None
+
+    def _record(self, key, run_id, unit, status, rows=None, error_message=None):
+        client, platform, account, chunk_start, chunk_end, output = unit
+        params = {
+            'unit_key': key, 'run_id': run_id, 'client': client, 'platform': platform,
+            'account': account, 'chunk_start': chunk_start.date(), 'chunk_end': chunk_end.date(),
+            'output': output, 'status': status, 'rows_written': rows,
+            'error_message': error_message, 'updated_at': datetime.now(),
+        }
+        with self.lock, self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM backfill_units WHERE unit_key = :unit_key"), params)
+            conn.execute(text("""
+                INSERT INTO backfill_units (unit_key, run_id, client, platform, account, chunk_start,
+                                            chunk_end, output, status, rows_written, error_message, updated_at)
+                VALUES (:unit_key, :run_id, :client, :platform, :account, :chunk_start,
+                        :chunk_end, :output, :status, :rows_written, :error_message, :updated_at)
+            """), params)
+
+    def start(self, key, run_id, unit):
+        self._record(key, run_id, unit, 'running')
+
+    def finish(self, key, run_id, unit, rows):
+        self._record(key, run_id, unit, 'done', rows)
+
+    def fail(self, key, run_id, unit, error):
+        self._record(key, run_id, unit, 'failed', error_message=str(error)[:2000])
@@ -1,189 +1,302 @@
 from dotenv import load_dotenv
+import json
 import os
 import pandas as pd
+import threading
 import time
-from mapping import *
-from drive_monitor import *
-from extract import fetch_facebook_report, fetch_tiktok_report, fetch_linkedin_report,fetch_youtube_ads_report
-from transform import preprocess_insta, preprocess_tiktok, preprocess_linkedin, preprocess_youtube
+from mapping import get_db_name, get_industry_for_client
+from drive_monitor import monitor_drive_folder
+from platforms import PLATFORMS, discover_mapping
+from fetch_plan import AccountFetchPlan
+from transform import METRIC_COLUMNS, memory_report
 from urllib.parse import quote_plus
-from sqlalchemy import text, Table, Column, MetaData, create_engine, types, inspect
-from sqlalchemy.types import String, Integer, Float, Date
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import create_engine, types
 from datetime import datetime, timedelta
-from mapping import get_industry_for_client
-import pymysql
 from app_logging import ETLLogger
+import staging
+import parallel_transform
+import rollups
+import sharding
+from tables import create_table_if_not_exists, maintain_partitions, paid_data_table
+from catalog import get_catalog
+from work_queue import WorkItem, WorkQueue
+from explain import explain_daily, telemetry_engine
 
 
 load_dotenv(dotenv_path="keys.env")
 user = os.getenv("DB_USER")
 password = os.getenv("DB_PASSWORD")
 host = os.getenv("DB_HOST")
-CHUNK_DAYS = int(os.getenv("CHUNK_DAYS", "1"))
 
-logger = ETLLogger(host=host, user=user, password=password)
-
-def main():
+_logger = None
+
+def get_logger():
+    """ETLLogger for this process, connected to etl_logs on first use rather than at import."""
+    global _logger
+    if _logger is None:
+        _logger = ETLLogger(host=host, user=user, password=password)
+    return _logger
+
+# Paid_Data columns in table order; batches from every platform are aligned to this
+EXPECTED_COLUMNS = [
+    'Ad Account Name', 'Campaign Name', 'Ad Set Name', 'Start Date', 'End Date', 'Date',
+    'Ad Name', 'Spent', 'Impressions', 'Reach', 'Clicks', 'Post Engagements', 'Post Shares',
+    'Post Reactions', 'Post Comments', 'Post Saves', '3-second Video Plays', 'Eng Minus Views',
+    'Platform', 'Round', 'Audience', 'Influencer', 'Objective1', 'Objective', 'Placement',
+    'Destination', 'Follows'
+]
+DATE_COLUMNS = ['Start Date', 'End Date', 'Date']
+# Frames arrive with metrics downcast to int8/int16/float32 (transform.compact_dtypes),
+# so tables pandas creates itself must not infer their column types from one batch
+INTEGER_COLUMNS = [col for col in METRIC_COLUMNS if col != 'Spent']
+DTYPES = {col: types.Date for col in DATE_COLUMNS}
+DTYPES.update({col: types.Integer for col in INTEGER_COLUMNS})
+DTYPES['Spent'] = types.Float
+
+_engines = {}
+# Tables ready for writes, by (database, table), for this process
+_tables = {}
+# Held while a table is set up, so concurrent writers create it once
+_tables_lock = threading.Lock()
+
+def get_engine(db=""):
+    """Return a pooled engine for ``db`` (the server itself when empty), reused across batches."""
+    engine = _engines.get(db)
+    if engine is None:
+        engine = _engines[db] = create_engine(f"mysql+pymysql://{user}:{password}@{host}/{db}")
+    return engine
+
+def get_table(db, table_name, exclude=(), rollup=None):
+    """Return `db`.`table_name` for writes through the server engine.
+
+    The database, the table (Paid_Data layout minus ``exclude``) and its
+    ``rollup`` table are created, and the table's upcoming monthly partitions
+    added, the first time they are needed. Existence and columns come from
+    the server catalog, so none of this costs a round-trip once it exists.
+    """
+    key = (db, table_name)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            ensure_database_exists(get_engine(), db)
+            create_table_if_not_exists(get_engine(), table_name, exclude, schema=db)
+            maintain_partitions(get_engine(), table_name, db)
+            table = _tables[key] = paid_data_table(table_name, get_catalog(get_engine()).columns(db, table_name),
+                                                   schema=db)
+        if rollup is not None:
+            rollup.get_table(get_engine(), table_name, db)
+    return table
+
+def industry_db_name(client_name):
+    industry = get_industry_for_client(client_name)
+    return f"{industry.lower().replace(' ', '_')}_industry_db"
+
+def prepare_batch(df):
+    """Convert the date columns of a transformed batch and keep only Paid_Data columns."""
+    df = df.assign(**{
+        col: pd.to_datetime(df[col], errors='coerce').dt.date
+        for col in DATE_COLUMNS if col in df.columns
+    })
+    return df[[col for col in df.columns if col in EXPECTED_COLUMNS]]
+
+def to_records(df):
+    """Rows of ``df`` as dicts of plain Python values, NaN/NaT as None, for Core inserts."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def write_batch(conn, table, df, records, rollup):
+    """Insert ``records`` (prepared from ``df``) into ``table`` and add ``df`` to its rollup, on ``conn``.
+
+    Record keys that are not columns of ``table`` are ignored, so one set of
+    records serves tables with fewer columns.
+    """
+    conn.execute(table.insert(), records)
+    rollup.update(get_engine(), table.name, df, conn=conn, schema=table.schema)
+
+def transformed_batches(label, platform, client, batches, preprocess, stage_run_id=None, stage_raw=True,
+                        raise_errors=False):
+    """Fetch and preprocess one platform batch by batch, logging the API call once it is exhausted.
+
+    Only the time spent fetching and transforming counts towards the logged
+    duration; the caller's writes happen while the generator is suspended.
+    With ``stage_run_id`` set, raw (if ``stage_raw``) and transformed batches
+    are also written to the Parquet staging area under that run. A failed
+    fetch is logged and ends the stream, or is re-raised with ``raise_errors``.
+    """
+    start = time.time()
+    elapsed = 0.0
+    payload_size = 0
+    try:
+        print(f"Calling {label} API for {client}...")
+        def raw_batches():
+            for batch in batches:
+                if stage_run_id and stage_raw:
+                    # Before preprocessing, which renames some columns in place
+                    staging.write_batch(batch, client, platform, 'raw', stage_run_id)
+                yield batch
+
+        # Large backfills and staging replays move to the process pool
+        for processed in parallel_transform.iter_preprocess(preprocess, raw_batches()):
+            if processed is None or processed.empty or processed.isna().all().all():
+                continue
+            if stage_run_id:
+                staging.write_batch(processed, client, platform, 'transformed', stage_run_id)
+            payload_size += processed.memory_usage(deep=True).sum()
+            elapsed += time.time() - start
+            yield processed
+            start = time.time()
+        print(f"{label} API success.")
+        duration = round(elapsed + time.time() - start, 2)
+        get_logger().log_api_call(label, client, f"{platform}_endpoint", 200, True, duration, payload_size)
+    except Exception as e:
+        duration = round(elapsed + time.time() - start, 2)
+        get_logger().log_api_call(label, client, f"{platform}_endpoint", 500, False, duration, 0, str(e))
+        if raise_errors:
+            raise
+
+class PaidDataWriter:
+    """Append transformed batches to a client's Paid_Data table and its industry's industry_data.
+
+    Each batch is converted to insert records once and written to both
+    tables, and both daily rollups, in one transaction on one server
+    connection. The databases and tables are created with the first
+    non-empty batch, so clients without data get neither. With ``conn``
+    every batch joins that connection's transaction instead.
+    """
+
+    def __init__(self, client, conn=None):
+        self.client = client
+        self.conn = conn
+        self.table_name = f"{client}_Paid_Data"
+        self.tables = None
+        self.rows = 0
+
+    def write(self, df):
+        df = prepare_batch(df)
+        if df.empty:
+            return
+
+        if self.tables is None:
+            self.tables = [
+                (get_table(get_db_name(self.client), self.table_name, rollup=rollups.CLIENT_DAILY),
+                 rollups.CLIENT_DAILY),
+                (get_table(industry_db_name(self.client), "industry_data", ['Follows'], rollups.INDUSTRY_DAILY),
+                 rollups.INDUSTRY_DAILY),
+            ]
+
+        records = to_records(df)
+        if self.conn is not None:
+            for table, rollup in self.tables:
+                write_batch(self.conn, table, df, records, rollup)
+        else:
+            with get_engine().begin() as conn:
+                for table, rollup in self.tables:
+                    write_batch(conn, table, df, records, rollup)
+        self.rows += len(df)
+
+def shard_weights(engine, run_id):
+    """Per-client API seconds from etl_logs (``engine``) for weighting shards.
+
+    Every shard has to compute the same weights, so the history ends at the
+    date in ``run_id`` rather than at each process's today, and a shard that
+    cannot read it fails instead of falling back to weights the others do
+    not use. Without a date in ``run_id`` all clients weigh the same.
+    """
+    until = sharding.history_until(run_id)
+    if until is None:
+        print(f"Run ID {run_id} has no date; weighting clients equally across shards")
+        return {}
+    return sharding.client_durations(engine, until)
+
+def daily_work_items(mapping, data_date):
+    """One work-queue item per client and platform with accounts, loading ``data_date``."""
+    return [WorkItem('daily', client, platform.key, {platform.key: platforms[platform.key]}, data_date, data_date)
+            for client, platforms in mapping.items()
+            for platform in PLATFORMS.values() if platforms.get(platform.key)]
+
+def load_client(logger, run_id, client, streams, stage_run_id=None, stage_raw=True):
+    """Transform and write one client's ``(platform, raw batches)`` streams, and log the rows written.
+
+    ``stage_run_id`` and ``stage_raw`` are passed on to ``transformed_batches``.
+    """
+    # Each batch is written as soon as it is transformed, so memory
+    # stays at one batch however many accounts or days are fetched
+    writer = PaidDataWriter(client)
+    for platform, batches in streams:
+        for df in transformed_batches(platform.label, platform.key, client, batches, platform.preprocess,
+                                      stage_run_id=stage_run_id, stage_raw=stage_raw):
+            writer.write(df)
+
+    print(memory_report())
+    if writer.rows:
+        logger.log_rows_appended(run_id, client, writer.table_name, writer.rows)
+    else:
+        print(f"No data available to save for {client}")
+
+def main(from_staging=False, start_date=None, end_date=None, shard_index=0, shard_count=1, run_id=None,
+         enqueue=False, queue=None):
+    """Run the nightly ETL.
+
+    With ``from_staging`` the APIs are not called: raw batches staged by an
+    earlier run (optionally limited to ``start_date``..``end_date``) are
+    transformed and loaded again. With ``shard_count`` > 1 only the clients
+    of shard ``shard_index`` are processed (see sharding.py), logged under
+    ``run_id``, and only shard 0 ingests the Drive folder. With ``enqueue``
+    the clients are put on the work queue (``queue``, see work_queue.py) for
+    queue_worker.py processes to load instead.
+    """
     print("ETL pipeline starting...")
-    run_id = f"load-job-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    logger = get_logger()
+    run_id = run_id or f"load-job-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
     start_time = datetime.now()
     success = True
     error_message = None
+    # Existence checks below are answered from one catalog query for the run
+    get_catalog(get_engine()).invalidate()
 
     try:
-        load_dotenv()
-        fb_access_token = os.getenv("FB_ACCESS_TOKEN")
-        tiktok_access_token = os.getenv("TIKTOK_ACCESS_TOKEN")
-        tiktok_app_id = os.getenv("TIKTOK_APP_ID")
-        tiktok_secret = os.getenv("TIKTOK_SECRET")
-        linkedin_access_token = os.getenv("LINKEDIN_ACCESS_TOKEN")
-        ga_developer_token = os.getenv("GOOGLE_ADS_DEVELOPER_TOKEN")
-        ga_client_id = os.getenv("GOOGLE_ADS_CLIENT_ID")
-        ga_client_secret = os.getenv("GOOGLE_ADS_CLIENT_SECRET")
-        ga_refresh_token = os.getenv("GOOGLE_ADS_REFRESH_TOKEN")
-
-        print("Generating mapping...")
-        mapping = generate_mapping(fb_access_token, tiktok_access_token, tiktok_app_id, tiktok_secret, linkedin_access_token,ga_developer_token, ga_client_id, ga_client_secret, ga_refresh_token)
-        print("Mapping generated successfully.")
-
-        for i, j in mapping.items():
-            non_empty_platforms = [platform for platform, accounts in j.items() if accounts]
-            platforms_str = ' and '.join(non_empty_platforms)
-
-            if non_empty_platforms:
-                print(f"Fetching data for advertiser {i}'s {platforms_str} account(s)...")
-            else:
-                print(f"No active accounts found for advertiser {i}.")
-                continue
-
-            # Initialize dataframes for each platform
-            facebook_data = None
-            tiktok_data = None
-            linkedin_data = None
-            youtube_data = None 
-
-            # Wrap each API fetch in timing and logging
-            if 'facebook' in non_empty_platforms:
-                start = time.time()
-                try:
-                    print(f"Calling Facebook API for {i}...")
-                    facebook_data = fetch_facebook_report(j)
-                    print("Facebook API success.")
-                    facebook_data = preprocess_insta(facebook_data)
-                    duration = round(time.time() - start, 2)
-                    payload_size = facebook_data.memory_usage(deep=True).sum() if facebook_data is not None else 0
-                    logger.log_api_call("Facebook", i, "facebook_endpoint", 200, True, duration, payload_size)
-                except Exception as e:
-                    duration = round(time.time() - start, 2)
-                    logger.log_api_call("Facebook", i, "facebook_endpoint", 500, False, duration, 0, str(e))
-
-            if 'tiktok' in non_empty_platforms:
-                start = time.time()
-                try:
-                    print(f"Calling TikTok API for {i}...")
-                    end_date = datetime.now() - timedelta(days=1)
-                    start_date = end_date - timedelta(days=CHUNK_DAYS - 1)
-                    tiktok_data = fetch_tiktok_report(j, start_date=start_date, end_date=end_date, chunk_days=CHUNK_DAYS)
-                    print("TikTok API success.")
-                   # print(tiktok_data.head())
-                    tiktok_data = preprocess_tiktok(tiktok_data)
-                   # print(tiktok_data.head())
-                    duration = round(time.time() - start, 2)
-                    payload_size = tiktok_data.memory_usage(deep=True).sum() if tiktok_data is not None else 0
-                    logger.log_api_call("TikTok", i, "tiktok_endpoint", 200, True, duration, payload_size)
-                except Exception as e:
-                    duration = round(time.time() - start, 2)
-                    logger.log_api_call("TikTok", i, "tiktok_endpoint", 500, False, duration, 0, str(e))
-
-            if 'linkedin' in non_empty_platforms:
-                start = time.time()
-                try:
-                    print(f"Calling LinkedIn API for {i}...")
-                    linkedin_data = fetch_linkedin_report(j)
-                    print("LinkedIn API success.")
-                    linkedin_data = preprocess_linkedin(linkedin_data)
-                    duration = round(time.time() - start, 2)
-                    payload_size = linkedin_data.memory_usage(deep=True).sum() if linkedin_data is not None else 0
-                    logger.log_api_call("LinkedIn", i, "linkedin_endpoint", 200, True, duration, payload_size)
-                except Exception as e:
-                    duration = round(time.time() - start, 2)
-                    logger.log_api_call("LinkedIn", i, "linkedin_endpoint", 500, False, duration, 0, str(e))
-
-            if 'youtube' in non_empty_platforms:
-                start = time.time()
-                try:
-                    print(f"Calling YouTube API for {i}...")
-                    youtube_data = fetch_youtube_ads_report(j)
-                    print("YouTube API success.")
-                    youtube_data = preprocess_youtube(youtube_data)
-                    duration = round(time.time() - start, 2)
-                    payload_size = youtube_data.memory_usage(deep=True).sum() if youtube_data is not None else 0
-                    logger.log_api_call("YouTube", i, "youtube_endpoint", 200, True, duration, payload_size)
-                except Exception as e:
-                    duration = round(time.time() - start, 2)
-                    logger.log_api_call("YouTube", i, "youtube_endpoint", 500, False, duration, 0, str(e))
-
-            dfs_to_concat = [df for df in [facebook_data, tiktok_data, linkedin_data, youtube_data]
-                 if df is not None and not df.empty and not df.isna().all().all()]
-
-            if not dfs_to_concat:
-                print(f"No data available to save for {i}")
-                continue
-            # Only runs if there's something to upload
-            data_frames = pd.concat(dfs_to_concat, axis=0)
-            # Clean and convert datetime fields
-            for col in ['Start Date', 'End Date', 'Date']:
-                if col in data_frames.columns:
-                    data_frames[col] = pd.to_datetime(data_frames[col], errors='coerce').dt.date
-                    #data_frames[col] = data_frames[col].dt.date  # optional: use if table expects DATE only
-
-            file_name = f"{i}"
-            db = get_db_name(file_name)
-
-            date_columns = ['Start Date', 'End Date', 'Date']
-            integer_cols = ['Post Saves', 'Reach', 'Follows']
-            dtype_dict = {col: types.Date for col in date_columns}
-            dtype_dict.update({col: types.Integer for col in integer_cols})
-
-            base_engine = create_engine(f"mysql+pymysql://{user}:{password}@{host}/")
-            ensure_database_exists(base_engine, db)
-
-            db_engine_specific = create_engine(f"mysql+pymysql://{user}:{password}@{host}/{db}")
-            create_table_if_not_exists(db_engine_specific, f"{file_name}_Paid_Data")
-
-            expected_columns = {
-                'Ad Account Name', 'Campaign Name', 'Ad Set Name', 'Start Date', 'End Date', 'Date',
-                'Ad Name', 'Spent', 'Impressions', 'Reach', 'Clicks', 'Post Engagements', 'Post Shares',
-                'Post Reactions', 'Post Comments', 'Post Saves', '3-second Video Plays', 'Eng Minus Views',
-                'Platform', 'Round', 'Audience', 'Influencer', 'Objective1', 'Objective', 'Placement',
-                'Destination', 'Follows'
-            }
-
-            data_frames = data_frames[[col for col in data_frames.columns if col in expected_columns]]
-
-            if not data_frames.empty:
-                data_frames.to_sql(
-                    f"{file_name}_Paid_Data",
-                    db_engine_specific,
-                    index=False,
-                    if_exists='append',
-                    dtype=dtype_dict,
-                )
-                route_data_to_industry_databases(data_frames, i)
-                logger.log_rows_appended(
-                    run_id,
-                    i,
-                    f"{file_name}_Paid_Data",
-                    len(data_frames),
-                )
-                #data_frames.to_csv(f"{file_name}_Paid_Data.csv", index=False)
-            else:
-                print(f"⚠ No data to insert for table {file_name}_Paid_Data")
-
-        drive_files = monitor_drive_folder(run_id, logger)
-        if drive_files:
-            print(f"Ingested {len(drive_files)} file(s) from Drive.")
+        if from_staging:
+            print(f"Reprocessing staged data from {staging.STAGING_DIR}...")
+            # Staged data is kept per client and platform, not per account
+            mapping = {client: {platform: [] for platform in platforms}
+                       for client, platforms in staging.staged_clients('raw').items()}
+        else:
+            print("Generating mapping...")
+            mapping = discover_mapping()
+            print("Mapping generated successfully.")
+        if shard_count > 1:
+            mapping = sharding.select_shard(mapping, shard_index, shard_count, shard_weights(logger.engine, run_id))
+        if from_staging:
+            for i, j in mapping.items():
+                print(f"Reprocessing staged {' and '.join(j)} data for advertiser {i}...")
+                streams = [(platform, staging.iter_staged('raw', i, platform.key, start_date, end_date))
+                           for platform in PLATFORMS.values() if platform.key in j]
+                load_client(logger, run_id, i, streams, stage_run_id=run_id, stage_raw=False)
+        elif enqueue:
+            data_date = (datetime.now() - timedelta(days=1)).date()
+            added = (queue or WorkQueue()).enqueue(run_id, daily_work_items(mapping, data_date))
+            print(f"Queued {added} work items under run {run_id}; drain with: python queue_worker.py --run-id {run_id}")
+        else:
+            # Accounts listed under several clients are fetched once and shared
+            fetches = AccountFetchPlan.from_mapping(mapping)
+
+            for i, j in mapping.items():
+                non_empty_platforms = [platform for platform, accounts in j.items() if accounts]
+                platforms_str = ' and '.join(non_empty_platforms)
+
+                if non_empty_platforms:
+                    print(f"Fetching data for advertiser {i}'s {platforms_str} account(s)...")
+                else:
+                    print(f"No active accounts found for advertiser {i}.")
+                    continue
+
+                streams = [(platform, fetches.iter_batches(platform.key, j[platform.key], platform.extract_daily))
+                           for platform in PLATFORMS.values() if platform.key in non_empty_platforms]
+                load_client(logger, run_id, i, streams, stage_run_id=run_id if staging.STAGING_ENABLED else None)
+
+        if not from_staging and shard_index == 0:
+            drive_files = monitor_drive_folder(run_id, logger)
+            if drive_files:
+                print(f"Ingested {len(drive_files)} file(s) from Drive.")
 
     except Exception as e:
         success = False
@@ -193,73 +306,74 @@ def main():
         end_time = datetime.now()
         logger.log_pipeline_run(run_id, start_time, end_time, success, error_message, gcp_job_url="https://console.cloud.google.com/run/")
 
-def create_table_if_not_exists(engine, table_name):
-    inspector = inspect(engine)
-    if table_name in inspector.get_table_names():
-        return
-
-    metadata = MetaData()
-    Table(
-        table_name, metadata,
-        Column('Ad Account Name', String(255)),
-        Column('Campaign Name', String(255)),
-        Column('Ad Set Name', String(255)),
-        Column('Start Date', Date),
-        Column('End Date', Date),
-        Column('Date', Date),
-        Column('Ad Name', String(255)),
-        Column('Spent', Float),
-        Column('Impressions', Integer),
-        Column('Reach', Integer),
-        Column('Clicks', Integer),
-        Column('Post Engagements', Integer),
-        Column('Post Shares', Integer),
-        Column('Post Saves', Integer),
-        Column('Post Reactions', Integer),
-        Column('Post Comments', Integer),
-        Column('3-second Video Plays', Integer),
-        Column('Eng Minus Views', Integer),
-        Column('Platform', String(100)),
-        Column('Round', String(100)),
-        Column('Audience', String(255)),
-        Column('Influencer', String(255)),
-        Column('Objective1', String(255)),
-        Column('Objective', String(255)),
-        Column('Placement', String(255)),
-        Column('Destination', String(255)),
-        Column('Follows', Integer),
-    )
-    metadata.create_all(engine)
-    print(f"Table '{table_name}' created.")
+def explain_run(map_file=None, shard_index=0, shard_count=1, enqueue=False, run_id=None):
+    """Print the plan of what ``main()`` would fetch (see explain.py), without loading anything.
+
+    The accounts come from ``map_file`` when given, else from account
+    discovery as in ``main()``. No data endpoint is called either way.
+    """
+    if map_file:
+        with open(map_file, 'r') as f:
+            mapping = json.load(f)
+    else:
+        print("Generating mapping...")
+        mapping = discover_mapping()
+    if shard_count > 1:
+        try:
+            weights = shard_weights(telemetry_engine(), run_id)
+        except Exception as e:
+            print(f"Shard {shard_index} would fail: could not read client durations ({e})")
+            return
+        mapping = sharding.select_shard(mapping, shard_index, shard_count, weights)
+    # Queue workers fetch each client's accounts themselves, shared or not
+    explain_daily(mapping, shared=not enqueue)
 
 def ensure_database_exists(base_engine, db_name):
-    with base_engine.connect() as conn:
-        conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{db_name}`"))
+    get_catalog(base_engine).create_database(db_name)
 
 def route_data_to_industry_databases(df, client_name):
-    industry = get_industry_for_client(client_name)
-    industry_slug = industry.lower().replace(" ", "_")
-    industry_db_name = f"{industry_slug}_industry_db"
-
-    server_uri = f"mysql+pymysql://{user}:{password}@{host}"
-    server_engine = create_engine(server_uri)
+    """Append ``df`` to the client's industry_data table on its own.
 
-    try:
-        with server_engine.connect() as conn:
-            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {industry_db_name}"))
-    except OperationalError as e:
-        print(f"Error creating databases: {e}")
-        return
-
-    #client_engine = create_engine(f"{server_uri}/{client_name}")
-    industry_engine = create_engine(f"{server_uri}/{industry_db_name}")
-
-    try:
-        df = df.drop(columns=["Follows"], errors='ignore')
-       #df.to_sql("client_data", con=client_engine, if_exists="append", index=False)
-        df.to_sql("industry_data", con=industry_engine, if_exists="append", index=False)
-    except Exception as e:
-        print(f"Error writing data to databases: {e}")
+    PaidDataWriter already writes each batch here together with the client
+    table; this is for callers that only have industry data to add.
+    """
+    df = prepare_batch(df)
+    table = get_table(industry_db_name(client_name), "industry_data", ['Follows'], rollups.INDUSTRY_DAILY)
+    with get_engine().begin() as conn:
+        write_batch(conn, table, df, to_records(df), rollups.INDUSTRY_DAILY)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the paid media ETL")
+    parser.add_argument("--from-staging", action="store_true",
+                        help="Transform and load raw data staged by earlier runs instead of calling the APIs")
+    parser.add_argument("--start", help="First staged date to reprocess, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last staged date to reprocess, YYYY-MM-DD")
+    shard_index, shard_count = sharding.shard_from_env()
+    parser.add_argument("--shard-index", type=int, default=shard_index,
+                        help="This process's shard, 0-based (default: CLOUD_RUN_TASK_INDEX)")
+    parser.add_argument("--shard-count", type=int, default=shard_count,
+                        help="Number of shards the clients are split across (default: CLOUD_RUN_TASK_COUNT)")
+    parser.add_argument("--run-id", default=sharding.shared_run_id(),
+                        help="Run ID shared by all shards (default: from CLOUD_RUN_EXECUTION)")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="Put the clients on the work queue for queue_worker.py processes instead of loading them")
+    parser.add_argument("--queue", help="'etl_logs' or an SQLAlchemy URL for the work queue (default: WORK_QUEUE_URL)")
+    parser.add_argument("--explain", action="store_true",
+                        help="Print the accounts, requests and expected duration of the run without calling data endpoints")
+    parser.add_argument("--map-file", help="With --explain, plan from this mapping instead of discovering accounts")
+    args = parser.parse_args()
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+    if args.enqueue and args.from_staging:
+        parser.error("--enqueue cannot be combined with --from-staging")
+    if args.explain and args.from_staging:
+        parser.error("--explain plans API requests; --from-staging makes none")
+    if args.map_file and not args.explain:
+        parser.error("--map-file is only used with --explain")
+    if args.explain:
+        explain_run(args.map_file, args.shard_index, args.shard_count, args.enqueue, args.run_id)
+    else:
+        main(from_staging=args.from_staging, start_date=args.start, end_date=args.end,
+             shard_index=args.shard_index, shard_count=args.shard_count, run_id=args.run_id,
+             enqueue=args.enqueue, queue=WorkQueue(args.queue) if args.enqueue else None)
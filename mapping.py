@@ -3,12 +3,16 @@ import requests
 import re
 import pandas as pd
 from sqlalchemy.exc import SQLAlchemyError
-from extract import *
+from extract import FB_GRAPH_URL, TIKTOK_API_URL, LINKEDIN_API_URL, get_google_ads_service
+from http_client import get_client
+from catalog import get_catalog
 from urllib.parse import quote_plus
 from sqlalchemy import create_engine,text,types
 from sqlalchemy.types import Integer
 from dotenv import load_dotenv
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables for database credentials
 load_dotenv()
@@ -17,11 +21,22 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 
 MAP_PATH = os.path.join(os.path.dirname(__file__), 'map.json')
+# Google Ads customers probed at once during YouTube discovery
+GOOGLE_ADS_DISCOVERY_WORKERS = int(os.getenv("GOOGLE_ADS_DISCOVERY_WORKERS", "8"))
+
+_client_map = (None, {})
+
+def load_client_map():
+    """Contents of map.json, re-read only when the file has changed."""
+    global _client_map
+    mtime = os.path.getmtime(MAP_PATH)
+    if _client_map[0] != mtime:
+        with open(MAP_PATH, 'r') as f:
+            _client_map = (mtime, json.load(f))
+    return _client_map[1]
 
 def get_industry_for_client(client_name):
-    with open(MAP_PATH, 'r') as f:
-        client_map = json.load(f)
-    client_data = client_map.get(client_name)
+    client_data = load_client_map().get(client_name)
     return client_data.get('industry') if client_data else "Unknown"
 
 def normalize_account_name(name):
@@ -83,15 +98,8 @@ def get_db_name(name):
 
 # This function retrieves the list of databases from the MySQL server.
 def get_available_db():
-    """Return a DataFrame listing databases available on the MySQL server."""
-    db_url = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}"
-    engine = create_engine(db_url)
-    query = "show databases;"  # Replace with your actual table name
-    # Execute the query
-    with engine.connect() as connection:
-        result = connection.execute(text(query))
-        df = pd.DataFrame(result.fetchall(), columns=result.keys())
-        return df
+    """Return a DataFrame listing databases available on the MySQL server, from the server catalog."""
+    return pd.DataFrame({'Database': get_catalog().databases()})
 
 #cleaning the client name
 def get_client_name(name):
@@ -103,37 +111,43 @@ def get_client_name(name):
 
 # get accounts
 def get_facebook_accounts(fb_access_token):
-    """Get Facebook ad accounts."""
+    """Get Facebook ad accounts, following the edge's paging cursors."""
     try:
-        url = 'https://graph.facebook.com/v21.0/me'
+        url = f"{FB_GRAPH_URL}/me/adaccounts"
         params = {
-            'fields': 'id,name,adaccounts.limit(1000){name,id}',
+            'fields': 'name,id',
+            'limit': 1000,
             'access_token': fb_access_token
         }
 
-        response = requests.get(url, params=params)
-        data = response.json()
-
-        if 'adaccounts' in data and 'data' in data['adaccounts']:
-            accounts = {str(item['id']): item['name'] for item in data['adaccounts']['data']}
+        accounts = {}
+        while url:
+            data = get_client('facebook').get(url, params=params).json()
+            if 'data' not in data:
+                break
+            accounts.update({str(item['id']): item['name'] for item in data['data']})
+            # paging.next already carries the query string and cursor
+            url = data.get('paging', {}).get('next')
+            params = None
+
+        if accounts:
             print(f"Retrieved {len(accounts)} Facebook ad accounts")
-            return accounts
         else:
             print("No Facebook ad accounts found in the response")
-            return {}
+        return accounts
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching Facebook ad accounts: {str(e)}")
         return {}
 
 def get_tiktok_accounts(tiktok_access_token, tiktok_app_id, tiktok_secret):
-    """Get TikTok advertisers."""
-    url = "https://business-api.tiktok.com/open_api/v1.3/oauth2/advertiser/get/"
+    """Get TikTok advertisers (the endpoint returns them all in one response)."""
+    url = f"{TIKTOK_API_URL}/v1.3/oauth2/advertiser/get/"
     headers = {"Access-Token": tiktok_access_token}
     params = {"app_id": tiktok_app_id, "secret": tiktok_secret}
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = get_client('tiktok').get(url, headers=headers, params=params)
         data = response.json()
         advertisers = {
             str(item['advertiser_id']): item['advertiser_name']
@@ -146,8 +160,8 @@ def get_tiktok_accounts(tiktok_access_token, tiktok_app_id, tiktok_secret):
         return {}
 
 def get_linkedin_accounts(linkedin_access_token):
-    """Get LinkedIn ad accounts."""
-    url = "https://api.linkedin.com/rest/adAccounts?q=search&search=(type:(values:List(BUSINESS,ENTERPRISE)),status:(values:List(ACTIVE)))"
+    """Get LinkedIn ad accounts, following nextPageToken cursors."""
+    url = f"{LINKEDIN_API_URL}/rest/adAccounts?q=search&search=(type:(values:List(BUSINESS,ENTERPRISE)),status:(values:List(ACTIVE)))&pageSize=1000"
     headers = {
         "Authorization": f"Bearer {linkedin_access_token}",
         "Linkedin-Version": "202410",
@@ -156,13 +170,18 @@ def get_linkedin_accounts(linkedin_access_token):
     }
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        accounts = {
-            str(element['id']): element['name']
-            for element in data.get('elements', [])
-        }
+        accounts = {}
+        page_url = url
+        while page_url:
+            response = get_client('linkedin').get(page_url, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            accounts.update({
+                str(element['id']): element['name']
+                for element in data.get('elements', [])
+            })
+            token = data.get('metadata', {}).get('nextPageToken')
+            page_url = f"{url}&pageToken={quote_plus(token)}" if token else None
         print(f"Retrieved {len(accounts)} LinkedIn ad accounts")
         return accounts
     except Exception as e:
@@ -171,6 +190,7 @@ def get_linkedin_accounts(linkedin_access_token):
 
 def get_youtube_accounts(ga_developer_token, ga_client_id, ga_client_secret, ga_refresh_token):
     """Fetch Google Ads VIDEO campaign accounts as a proxy for YouTube advertisers."""
+    from google.ads.googleads.errors import GoogleAdsException
     load_dotenv()
 
     config = {
@@ -182,28 +202,31 @@ def get_youtube_accounts(ga_developer_token, ga_client_id, ga_client_secret, ga_
     }
 
     try:
-        client = GoogleAdsClient.load_from_dict(config)
-        customer_service = client.get_service("CustomerService")
+        customer_service = get_google_ads_service(config, "CustomerService")
+        ga_service = get_google_ads_service(config)
 
         # Get all accessible accounts
         accessible_customers = customer_service.list_accessible_customers()
         customer_ids = [res.replace("customers/", "") for res in accessible_customers.resource_names]
 
-        accounts = {}
-        for customer_id in customer_ids:
+        def probe(customer_id):
             try:
-                ga_service = client.get_service("GoogleAdsService")
                 query = """SELECT customer.descriptive_name, campaign.advertising_channel_type FROM campaign LIMIT 1"""
                 response = ga_service.search(customer_id=customer_id, query=query)
 
                 for row in response:
-                    accounts[customer_id] = row.customer.descriptive_name
-                    break
+                    return row.customer.descriptive_name
 
             except GoogleAdsException as e:
                 print(f"❌ Skipped {customer_id}: {e}")
             except Exception as e:
                 print(f"❗ Unexpected error for {customer_id}: {e}")
+            return None
+
+        # One search per customer; the gRPC service is shared by the pool's threads
+        with ThreadPoolExecutor(max_workers=GOOGLE_ADS_DISCOVERY_WORKERS) as pool:
+            names = pool.map(probe, customer_ids)
+        accounts = {customer_id: name for customer_id, name in zip(customer_ids, names) if name is not None}
         print(f"Retrieved {len(accounts)} YouTube ad accounts")
         return accounts
 
@@ -217,68 +240,51 @@ def get_youtube_accounts(ga_developer_token, ga_client_id, ga_client_secret, ga_
 # It ensures that the mapping is consistent and can be used for further processing or analysis.
 
 def generate_mapping(fb_access_token, tiktok_access_token, tiktok_app_id, tiktok_secret, linkedin_access_token,ga_developer_token, ga_client_id, ga_client_secret, ga_refresh_token):
-    fb_accounts = get_facebook_accounts(fb_access_token)
-    tiktok_accounts = get_tiktok_accounts(tiktok_access_token, tiktok_app_id, tiktok_secret)
-    linkedin_accounts = get_linkedin_accounts(linkedin_access_token)
-    youtube_accounts = get_youtube_accounts(ga_developer_token, ga_client_id, ga_client_secret, ga_refresh_token)
+    return build_mapping(discover_concurrently({
+        'facebook': lambda: get_facebook_accounts(fb_access_token),
+        'tiktok': lambda: get_tiktok_accounts(tiktok_access_token, tiktok_app_id, tiktok_secret),
+        'linkedin': lambda: get_linkedin_accounts(linkedin_access_token),
+        'youtube': lambda: get_youtube_accounts(ga_developer_token, ga_client_id, ga_client_secret, ga_refresh_token),
+    }))
 
-    normalized_mapping = {}
+def discover_concurrently(discoverers):
+    """Run ``{platform: discover}`` callables at once and return ``{platform: accounts}``.
 
-    # Facebook
-    for account_id, name in fb_accounts.items():
-        normalized_name = normalize_account_name(name)
-        normalized_mapping.setdefault(normalized_name, {
-            'display_name': name,
-            'facebook': [],
-            'tiktok': [],
-            'linkedin': [],
-            'youtube': []
-        })['facebook'].append((str(account_id), name))
-
-    # TikTok
-    for account_id, name in tiktok_accounts.items():
-        normalized_name = normalize_account_name(name)
-        normalized_mapping.setdefault(normalized_name, {
-            'display_name': name,
-            'facebook': [],
-            'tiktok': [],
-            'linkedin': [],
-            'youtube': []
-        })['tiktok'].append((str(account_id), name))
-
-    # LinkedIn
-    for account_id, name in linkedin_accounts.items():
-        normalized_name = normalize_account_name(name)
-        normalized_mapping.setdefault(normalized_name, {
-            'display_name': name,
-            'facebook': [],
-            'tiktok': [],
-            'linkedin': [],
-            'youtube': []
-        })['linkedin'].append((str(account_id), name))
-
-    # YouTube
-    for account_id, name in youtube_accounts.items():
-        normalized_name = normalize_account_name(name)
+    Discovery then takes as long as the slowest platform rather than the sum.
+    """
+    start = time.perf_counter()
+
+    def timed(platform, discover):
+        accounts = discover()
+        print(f"{platform} discovery: {len(accounts)} accounts in {time.perf_counter() - start:.1f}s")
+        return accounts
+
+    with ThreadPoolExecutor(max_workers=len(discoverers) or 1) as pool:
+        futures = {platform: pool.submit(timed, platform, discover) for platform, discover in discoverers.items()}
+        accounts = {platform: future.result() for platform, future in futures.items()}
+    print(f"Account discovery finished in {time.perf_counter() - start:.1f}s")
+    return accounts
+
+def build_mapping(accounts_by_platform):
+    """Group ``{platform: {account_id: name}}`` by normalised client name.
 
-        normalized_mapping.setdefault(normalized_name, {
-            'display_name': name,
-            'facebook': [],
-            'tiktok': [],
-            'linkedin': [],
-            'youtube': []
-        })['youtube'].append((str(account_id), name))
+    Every client gets a list for each platform in ``accounts_by_platform``,
+    empty if it has no accounts there.
+    """
+    normalized_mapping = {}
+    for platform, accounts in accounts_by_platform.items():
+        for account_id, name in accounts.items():
+            normalized_name = normalize_account_name(name)
+            normalized_mapping.setdefault(normalized_name, {
+                'display_name': name,
+                **{key: [] for key in accounts_by_platform}
+            })[platform].append((str(account_id), name))
 
     # Final tidy mapping
     final_mapping = {}
     for data in normalized_mapping.values():
         display_name = data['display_name']
-        final_mapping[display_name] = {
-            'facebook': data['facebook'],
-            'tiktok': data['tiktok'],
-            'linkedin': data['linkedin'],
-            'youtube': data['youtube']
-        }
+        final_mapping[display_name] = {key: data[key] for key in accounts_by_platform}
 
     return final_mapping
 
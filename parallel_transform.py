@@ -0,0 +1,136 @@
+"""Process-pool executor for the preprocess_* functions.
+
+Small daily runs transform batches inline. Once a stream has produced more
+than ``PARALLEL_TRANSFORM_ROWS`` rows (a multi-month backfill, or a replay
+from staging), further batches are sent to a shared ``ProcessPoolExecutor``
+as Arrow IPC buffers rather than pickled DataFrames. Results come back in
+input order, so output is the same as the inline path.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+from dotenv import load_dotenv
+
+import staging
+import transform
+from transform import concat_frames
+
+load_dotenv()
+
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_TRANSFORM_ROWS = int(os.getenv("PARALLEL_TRANSFORM_ROWS", "100000"))
+TRANSFORM_CHUNK_ROWS = int(os.getenv("TRANSFORM_CHUNK_ROWS", "20000"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared worker pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=TRANSFORM_WORKERS)
+            atexit.register(_pool.shutdown)
+    return _pool
+
+
+def _to_ipc(df):
+    sink = pa.BufferOutputStream()
+    table = staging.to_arrow(df)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _from_ipc(buffer, categorical):
+    return staging.to_pandas(pa.ipc.open_stream(buffer).read_all(), categorical)
+
+
+def _run_chunk(name, buffer):
+    """Worker side: decode a raw chunk, preprocess it and encode the result."""
+    start = time.perf_counter()
+    processed = getattr(transform, name)(_from_ipc(buffer, categorical=False))
+    payload = None if processed is None else _to_ipc(processed)
+    return payload, time.perf_counter() - start
+
+
+def split_chunks(df, chunk_rows=TRANSFORM_CHUNK_ROWS):
+    """Cut ``df`` into contiguous row ranges of about ``chunk_rows`` rows.
+
+    Cuts fall on 'Ad Account Name' boundaries where possible, so the
+    account-level checks in preprocess_* see whole accounts.
+    """
+    if len(df) <= chunk_rows:
+        return [df]
+    cuts = [0]
+    if 'Ad Account Name' in df.columns:
+        accounts = df['Ad Account Name'].astype(str).to_numpy()
+        changes = (np.flatnonzero(accounts[1:] != accounts[:-1]) + 1).tolist()
+    else:
+        changes = []
+    for i in changes + [len(df)]:
+        while i - cuts[-1] > chunk_rows:
+            cuts.append(cuts[-1] + chunk_rows)
+        if i - cuts[-1] >= chunk_rows // 2 or i == len(df):
+            cuts.append(i)
+    return [df.iloc[a:b] for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def iter_preprocess(preprocess, batches, threshold=PARALLEL_TRANSFORM_ROWS, workers=TRANSFORM_WORKERS):
+    """Yield ``preprocess(batch)`` for every batch, in order.
+
+    Batches run inline until ``threshold`` rows have been seen; after that
+    they are fanned out to the process pool with up to ``2 * workers`` in
+    flight. A timing line is printed when the pool was used.
+    """
+    seen = 0
+    pending = deque()
+    pool_rows = 0
+    worker_seconds = 0.0
+    start = None
+
+    def collect_next():
+        nonlocal worker_seconds
+        payload, seconds = pending.popleft().result()
+        worker_seconds += seconds
+        return None if payload is None else _from_ipc(payload, categorical=True)
+
+    for batch in batches:
+        seen += len(batch)
+        if workers <= 1 or seen <= threshold:
+            while pending:
+                yield collect_next()
+            yield preprocess(batch)
+            continue
+
+        if start is None:
+            start = time.perf_counter()
+        pool_rows += len(batch)
+        for chunk in split_chunks(batch):
+            pending.append(get_pool().submit(_run_chunk, preprocess.__name__, _to_ipc(chunk)))
+        while len(pending) > 2 * workers:
+            yield collect_next()
+
+    while pending:
+        yield collect_next()
+
+    if start is not None:
+        wall = time.perf_counter() - start
+        print(f"Parallel transform ({preprocess.__name__}): {pool_rows} rows on {workers} workers "
+              f"in {wall:.1f}s, {pool_rows / wall:,.0f} rows/s, speedup {worker_seconds / wall:.1f}x")
+
+
+def parallel_preprocess(preprocess, df, threshold=PARALLEL_TRANSFORM_ROWS, workers=TRANSFORM_WORKERS):
+    """Preprocess one large frame across the pool; small frames run inline."""
+    if df is None or len(df) <= threshold or workers <= 1:
+        return preprocess(df)
+    chunks = split_chunks(df)
+    results = [r for r in iter_preprocess(preprocess, chunks, threshold=0, workers=workers) if r is not None]
+    return concat_frames(results) if results else None
@@ -0,0 +1,122 @@
+"""Registry of the ad platforms the pipeline pulls from.
+
+Every platform declares the same pieces: how its accounts are discovered,
+how yesterday's data and an arbitrary date range are extracted (both as
+iterators of DataFrame batches), which ``preprocess_*`` cleans it and how
+it is paced. ``load.main()``, account discovery and the backfill runner
+loop over ``PLATFORMS``, so adding a platform means adding one entry here.
+"""
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from extract import (iter_facebook_report, iter_tiktok_report, iter_linkedin_report, iter_youtube_ads_report,
+                     iter_facebook_report_range, iter_linkedin_report_range, iter_youtube_ads_report_range)
+from http_client import PLATFORM_LIMITS
+from mapping import (build_mapping, discover_concurrently, get_facebook_accounts, get_tiktok_accounts, get_linkedin_accounts,
+                     get_youtube_accounts)
+from transform import preprocess_insta, preprocess_tiktok, preprocess_linkedin, preprocess_youtube
+
+load_dotenv()
+
+# Days of TikTok data the daily run re-reads, ending yesterday
+CHUNK_DAYS = int(os.getenv("CHUNK_DAYS", "1"))
+
+
+class Platform:
+    """One ad platform behind the interface the orchestrators use.
+
+    ``discover()`` returns ``{account_id: account_name}``.
+    ``extract_daily(platforms)`` and
+    ``extract_range(platforms, start_date, end_date, chunk_days)`` yield raw
+    batches for the accounts listed under this platform's key in
+    ``platforms``, and ``preprocess`` turns a raw batch into Paid_Data rows.
+    """
+
+    def __init__(self, key, label, discover, extract_daily, extract_range, preprocess, paced=True):
+        self.key = key
+        self.label = label
+        self.discover = discover
+        self.extract_daily = extract_daily
+        self.extract_range = extract_range
+        self.preprocess = preprocess
+        self.paced = paced
+        # Units of this platform a backfill may run at once
+        self.concurrency = int(os.getenv(f"{key.upper()}_BACKFILL_CONCURRENCY", "2"))
+
+    @property
+    def rate_limit(self):
+        """Token-bucket profile http_client applies to this platform, or None if it is not paced there."""
+        if not self.paced:
+            return None
+        return PLATFORM_LIMITS.get(self.key, PLATFORM_LIMITS['default'])
+
+    def __repr__(self):
+        return f"Platform({self.key!r})"
+
+
+def _tiktok_daily(platforms):
+    end = datetime.now() - timedelta(days=1)
+    start = end - timedelta(days=CHUNK_DAYS - 1)
+    return iter_tiktok_report(platforms, start_date=start, end_date=end, chunk_days=CHUNK_DAYS)
+
+
+def _tiktok_range(platforms, start_date, end_date, chunk_days=7):
+    return iter_tiktok_report(platforms, start_date=start_date, end_date=end_date, chunk_days=chunk_days)
+
+
+def _linkedin_range(platforms, start_date, end_date, chunk_days=7):
+    # adAnalyticsV2 takes the whole range in one call per campaign
+    return iter_linkedin_report_range(platforms, start_date, end_date)
+
+
+PLATFORMS = {p.key: p for p in [
+    Platform(
+        'facebook', 'Facebook',
+        discover=lambda: get_facebook_accounts(os.getenv("FB_ACCESS_TOKEN")),
+        extract_daily=iter_facebook_report,
+        extract_range=iter_facebook_report_range,
+        preprocess=preprocess_insta,
+    ),
+    Platform(
+        'tiktok', 'TikTok',
+        discover=lambda: get_tiktok_accounts(os.getenv("TIKTOK_ACCESS_TOKEN"), os.getenv("TIKTOK_APP_ID"),
+                                             os.getenv("TIKTOK_SECRET")),
+        extract_daily=_tiktok_daily,
+        extract_range=_tiktok_range,
+        preprocess=preprocess_tiktok,
+    ),
+    Platform(
+        'linkedin', 'LinkedIn',
+        discover=lambda: get_linkedin_accounts(os.getenv("LINKEDIN_ACCESS_TOKEN")),
+        extract_daily=iter_linkedin_report,
+        extract_range=_linkedin_range,
+        preprocess=preprocess_linkedin,
+    ),
+    Platform(
+        'youtube', 'YouTube',
+        discover=lambda: get_youtube_accounts(os.getenv("GOOGLE_ADS_DEVELOPER_TOKEN"),
+                                              os.getenv("GOOGLE_ADS_CLIENT_ID"),
+                                              os.getenv("GOOGLE_ADS_CLIENT_SECRET"),
+                                              os.getenv("GOOGLE_ADS_REFRESH_TOKEN")),
+        extract_daily=iter_youtube_ads_report,
+        extract_range=iter_youtube_ads_report_range,
+        preprocess=preprocess_youtube,
+        # Google Ads goes through its own gRPC client, not http_client
+        paced=False,
+    ),
+]}
+
+
+def get_platform(key):
+    """Return the registered platform for ``key``."""
+    try:
+        return PLATFORMS[key]
+    except KeyError:
+        raise ValueError(f"Unknown platform {key}") from None
+
+
+def discover_mapping():
+    """Discover every platform's accounts, all platforms at once, and group them by client as in map.json."""
+    return build_mapping(discover_concurrently({key: platform.discover for key, platform in PLATFORMS.items()}))
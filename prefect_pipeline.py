@@ -0,0 +1,146 @@
+"""Prefect flow for the nightly ETL.
+
+``etl_pipeline`` runs the same steps as ``load.main()`` as Prefect tasks:
+
+    discover         accounts on every platform, grouped by client
+    load_unit        one mapped task per (client, platform): extract,
+                     transform and load yesterday's data
+    ingest_drive     new files in the Drive folder
+
+Each ``load_unit`` writes in one transaction, so a failed unit leaves no
+rows behind and its retry starts clean. A unit that succeeded is cached on
+(client, platform, date): re-running the flow for the same day, after a
+crash or to retry failures, skips it. Units are tagged ``platform-<key>``,
+so Prefect's tag concurrency limits cap how many run against one platform:
+
+    prefect concurrency-limit create platform-facebook 4
+
+ETLLogger sends its messages to the Prefect run logger inside tasks, and
+``print`` output is captured too.
+
+    python prefect_pipeline.py            # run once, locally
+    python prefect_pipeline.py --serve    # serve the etl_pipeline deployment
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from prefect import flow, task, unmapped
+from prefect.runtime import task_run
+
+from catalog import get_catalog
+from drive_monitor import monitor_drive_folder
+from fetch_plan import AccountFetchPlan
+from load import PaidDataWriter, get_engine, get_logger, transformed_batches
+from platforms import PLATFORMS, discover_mapping
+
+load_dotenv()
+
+TASK_RETRIES = int(os.getenv("PREFECT_TASK_RETRIES", "2"))
+TASK_RETRY_DELAY = int(os.getenv("PREFECT_TASK_RETRY_DELAY", "300"))
+# How long a completed unit stays cached; the key already includes the date
+CACHE_DAYS = int(os.getenv("PREFECT_CACHE_DAYS", "7"))
+
+
+def platform_tag(key):
+    return f"platform-{key}"
+
+
+def unit_cache_key(context, parameters):
+    """One cache entry per (client, platform, data date)."""
+    return f"paid-data/{parameters['client']}/{parameters['platform_key']}/{parameters['data_date']}"
+
+
+@task(retries=TASK_RETRIES, retry_delay_seconds=TASK_RETRY_DELAY, log_prints=True)
+def discover():
+    return discover_mapping()
+
+
+@task(retries=TASK_RETRIES, retry_delay_seconds=TASK_RETRY_DELAY, log_prints=True,
+      cache_key_fn=unit_cache_key, cache_expiration=timedelta(days=CACHE_DAYS), persist_result=True)
+def load_unit(client, platform_key, accounts, data_date, run_id, fetches):
+    """Extract, transform and load one client's accounts on one platform; return the rows written."""
+    platform = PLATFORMS[platform_key]
+    if task_run.run_count > 1:
+        # The shared fetches this unit took part in were handed out on its
+        # first attempt, so a retry fetches its accounts itself
+        batches = platform.extract_daily({platform_key: accounts})
+    else:
+        batches = fetches.iter_batches(platform_key, accounts, platform.extract_daily)
+    with get_engine().begin() as conn:
+        writer = PaidDataWriter(client, conn)
+        for df in transformed_batches(platform.label, platform_key, client, batches, platform.preprocess,
+                                      raise_errors=True):
+            writer.write(df)
+    if writer.rows:
+        get_logger().log_rows_appended(run_id, client, writer.table_name, writer.rows)
+    return writer.rows
+
+
+@task(retries=TASK_RETRIES, retry_delay_seconds=TASK_RETRY_DELAY, log_prints=True)
+def ingest_drive(run_id):
+    return len(monitor_drive_folder(run_id, get_logger()) or [])
+
+
+@flow(name="etl_pipeline", log_prints=True)
+def etl_pipeline():
+    """Load yesterday's paid media data for every client, then ingest new Drive files."""
+    logger = get_logger()
+    run_id = f"prefect-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    start_time = datetime.now()
+    error_message = None
+    get_catalog(get_engine()).invalidate()
+    try:
+        mapping = discover()
+        # Accounts listed under several clients are fetched once and shared
+        fetches = AccountFetchPlan.from_mapping(mapping)
+        data_date = (datetime.now() - timedelta(days=1)).date().isoformat()
+
+        units, futures = [], []
+        for key in PLATFORMS:
+            clients = [(client, platforms[key]) for client, platforms in mapping.items() if platforms.get(key)]
+            if not clients:
+                continue
+            units += [(client, key) for client, _ in clients]
+            futures += load_unit.with_options(tags=[platform_tag(key)]).map(
+                client=[client for client, _ in clients], platform_key=unmapped(key),
+                accounts=[accounts for _, accounts in clients], data_date=unmapped(data_date),
+                run_id=unmapped(run_id), fetches=unmapped(fetches))
+
+        failed = []
+        for (client, key), future in zip(units, futures):
+            result = future.result(raise_on_failure=False)
+            if isinstance(result, BaseException):
+                failed.append(f"{client}/{key}: {result}")
+            else:
+                print(f"{client} / {key}: {result} rows")
+
+        drive_files = ingest_drive(run_id)
+        if drive_files:
+            print(f"Ingested {drive_files} file(s) from Drive.")
+        if failed:
+            error_message = f"{len(failed)} of {len(units)} units failed: " + "; ".join(failed)
+    except Exception as e:
+        error_message = str(e)
+        raise
+    finally:
+        logger.log_pipeline_run(run_id, start_time, datetime.now(), error_message is None, error_message)
+    if error_message:
+        # Fails the flow run; re-running it skips the units that succeeded
+        raise RuntimeError(error_message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run or serve the etl_pipeline Prefect flow")
+    parser.add_argument('--serve', action='store_true', help="Serve the etl_pipeline deployment instead of running once")
+    parser.add_argument('--cron', help="Schedule for the served deployment, e.g. '0 6 * * *'")
+    args = parser.parse_args()
+    if args.serve:
+        etl_pipeline.serve(name="etl_pipeline", cron=args.cron)
+    else:
+        etl_pipeline()
+
+
+if __name__ == '__main__':
+    main()
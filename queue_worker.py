@@ -0,0 +1,133 @@
+"""Worker that drains the ETL work queue (see work_queue.py).
+
+    python load.py --enqueue --run-id load-20240101           # queue the nightly load
+    python queue_worker.py --run-id load-20240101             # in as many processes as wanted
+    python queue_worker.py --status --run-id load-20240101
+    python queue_worker.py --retry-failed --run-id load-20240101
+
+A worker claims one item at a time and runs it the way the command that
+queued it would have: 'daily' items like ``load.main()`` (client table,
+industry table and rollups in one transaction), 'backfill' items like a
+``run_historical.py`` unit. It stops once the run has nothing queued or
+leased left, or keeps polling with ``--forever``. Accounts that several
+clients share are fetched once per client here, not once per run.
+"""
+import argparse
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from load import PaidDataWriter, get_engine, get_logger, transformed_batches
+from platforms import get_platform
+from util.historical_fetch import BackfillOutput, run_unit
+from work_queue import WORK_QUEUE_URL, Lease, LeaseLost, WorkQueue
+
+load_dotenv()
+
+WORK_POLL_SECONDS = int(os.getenv("WORK_POLL_SECONDS", "30"))
+
+
+def _window(item):
+    return tuple(datetime.combine(day, datetime.min.time()) for day in (item.window_start, item.window_end))
+
+
+def run_daily(queue, item):
+    """Load one client's accounts on one platform for the item's day; return the rows written."""
+    platform = get_platform(item.platform)
+    if item.window_end == (datetime.now() - timedelta(days=1)).date():
+        batches = platform.extract_daily(item.accounts)
+    else:
+        # Queued on an earlier day: ask for that day explicitly
+        batches = platform.extract_range(item.accounts, *_window(item))
+    with get_engine().begin() as conn:
+        writer = PaidDataWriter(item.client, conn)
+        for df in transformed_batches(platform.label, item.platform, item.client, batches, platform.preprocess,
+                                      raise_errors=True):
+            writer.write(df)
+        queue.complete(item, writer.rows, conn)
+    if writer.rows:
+        get_logger().log_rows_appended(item.run_id, item.client, writer.table_name, writer.rows)
+    return writer.rows
+
+
+def run_backfill_item(queue, item, outputs):
+    """Run one backfill unit; ``outputs`` keeps this worker's BackfillOutput per (run, client, output)."""
+    options = item.options
+    key = (item.run_id, item.client, options['output'])
+    if key not in outputs:
+        outputs[key] = BackfillOutput(item.client, options['output'], item.run_id, stage=options['stage'],
+                                      fresh=False)
+    return run_unit(item.client, item.platform, item.accounts, *_window(item), outputs[key], options['chunk_days'],
+                    from_staging=options['from_staging'],
+                    stage_raw=options['stage'] and not options['from_staging'],
+                    before_commit=lambda conn, rows: queue.complete(item, rows, conn))
+
+
+def run_worker(queue, run_id=None, worker=None, forever=False, poll_seconds=WORK_POLL_SECONDS):
+    """Claim and run items until the queue is drained; return (items done, items failed)."""
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    outputs = {}
+    done = failed = 0
+    print(f"Worker {worker} draining {'run ' + run_id if run_id else 'every run'}")
+    while True:
+        item = queue.claim(worker, run_id)
+        if item is None:
+            counts = queue.counts(run_id)
+            if not forever and not counts.get('queued') and not counts.get('leased'):
+                break
+            # Items leased to other workers come back if those workers die
+            time.sleep(poll_seconds)
+            continue
+        print(f"{worker}: {item} (attempt {item.attempts})")
+        try:
+            with Lease(queue, item):
+                if item.kind == 'daily':
+                    rows = run_daily(queue, item)
+                else:
+                    rows = run_backfill_item(queue, item, outputs)
+        except LeaseLost as e:
+            # Another worker has it now; nothing of this attempt was kept
+            print(f"{worker}: {e}")
+            continue
+        except Exception as e:
+            status = queue.fail(item, e)
+            if status == 'failed':
+                failed += 1
+            print(f"{worker}: {item} failed ({e}); {'queued again' if status == 'queued' else 'giving up'}")
+            continue
+        done += 1
+        print(f"{worker}: {item}: {rows} rows")
+    print(f"Worker {worker} finished: {done} items done, {failed} failed")
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run items from the ETL work queue")
+    parser.add_argument("--run-id", help="Only run this run's items (default: any run's)")
+    parser.add_argument("--queue", default=WORK_QUEUE_URL, help="'etl_logs' or an SQLAlchemy URL for the work queue")
+    parser.add_argument("--forever", action="store_true", help="Keep polling for new items once the queue is empty")
+    parser.add_argument("--poll-seconds", type=int, default=WORK_POLL_SECONDS,
+                        help="Wait between claims while the queue is empty or held by other workers")
+    parser.add_argument("--status", action="store_true", help="Print the run's item counts and failures, then exit")
+    parser.add_argument("--retry-failed", action="store_true", help="Queue the run's failed items again, then exit")
+    args = parser.parse_args()
+    if (args.status or args.retry_failed) and not args.run_id:
+        parser.error("--status and --retry-failed need --run-id")
+
+    queue = WorkQueue(args.queue)
+    if args.retry_failed:
+        print(f"Queued {queue.retry_failed(args.run_id)} failed items of run {args.run_id} again")
+    elif args.status:
+        counts = queue.counts(args.run_id)
+        print(", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "No items")
+        for label, error in queue.failures(args.run_id):
+            print(f"  {label}: {error}")
+    else:
+        run_worker(queue, args.run_id, forever=args.forever, poll_seconds=args.poll_seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""CSV and Excel readers for Drive ingestion.
+
+Each format has a preferred backend and a pandas fallback:
+
+    CSV    pyarrow (multithreaded, all cores)   -> pandas C parser
+    Excel  calamine (Rust, ``python-calamine``) -> pandas/openpyxl
+
+``CSV_READER`` and ``EXCEL_READER`` pick the preferred backend (set either
+to ``pandas``/``openpyxl`` to turn it off). A backend that is not installed
+is skipped, and a file the preferred backend cannot parse (ragged rows,
+duplicate headers, a column whose type changes past the first block, bad
+UTF-8) is re-read with the fallback, so the frames match what pandas gives
+as closely as each parser allows. pyarrow does parse ISO dates into
+datetimes where pandas keeps strings; ask for ``str`` in ``dtype`` to keep a
+column as text.
+"""
+import importlib.util
+import os
+from datetime import date, datetime, time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+CALAMINE_AVAILABLE = importlib.util.find_spec('python_calamine') is not None
+
+CSV_READER = os.getenv("CSV_READER", "pyarrow")
+EXCEL_READER = os.getenv("EXCEL_READER", "calamine")
+
+
+class Backend:
+    """One parser: ``read(source, **options)`` returns a DataFrame."""
+
+    def __init__(self, name, read, available=True):
+        self.name = name
+        self.read = read
+        self.available = available
+
+    def __repr__(self):
+        return f"Backend({self.name!r})"
+
+
+# CSV -------------------------------------------------------------------
+
+def _pyarrow_csv(source, usecols=None, dtype=None):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    dtype = dtype or {}
+    table = pacsv.read_csv(
+        source,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(usecols) if usecols is not None else None,
+            column_types={col: pa.string() for col in dtype},
+            # As pandas: empty and 'NA'-like cells are missing in text columns too
+            strings_can_be_null=True,
+        ),
+    )
+    if len(set(table.column_names)) != len(table.column_names):
+        # pandas would rename duplicates to 'name.1'; let it
+        raise ValueError("duplicate column names")
+    # Columns with no values at all come back as float NaN from pandas
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    df = table.to_pandas(date_as_object=False)
+    cast = {col: dt for col, dt in dtype.items() if dt not in (str, object, 'str', 'object')}
+    return df.astype(cast) if cast else df
+
+
+def _pandas_csv(source, usecols=None, dtype=None):
+    return pd.read_csv(source, index_col=False, usecols=usecols, dtype=dtype)
+
+
+def _pyarrow_csv_columns(source):
+    import pyarrow.csv as pacsv
+
+    names = pacsv.open_csv(source).schema.names
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate column names")
+    return list(names)
+
+
+def _pandas_csv_columns(source):
+    return list(pd.read_csv(source, nrows=0, index_col=False).columns)
+
+
+CSV_BACKENDS = {b.name: b for b in [
+    Backend('pyarrow', _pyarrow_csv, PYARROW_AVAILABLE),
+    Backend('pandas', _pandas_csv),
+]}
+
+CSV_COLUMN_BACKENDS = {b.name: b for b in [
+    Backend('pyarrow', _pyarrow_csv_columns, PYARROW_AVAILABLE),
+    Backend('pandas', _pandas_csv_columns),
+]}
+
+
+# Excel -----------------------------------------------------------------
+
+def _calamine_cell(value):
+    # As openpyxl: empty cells are missing, whole numbers are int and dates
+    # are datetimes (so the column becomes datetime64)
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time())
+    return value
+
+
+def _calamine_excel(source):
+    from python_calamine import CalamineWorkbook
+
+    rows = CalamineWorkbook.from_filelike(source).get_sheet_by_index(0).to_python(skip_empty_area=False)
+    if not rows:
+        return pd.DataFrame()
+    header, data = rows[0], rows[1:]
+    if any(name == '' for name in header) or len(set(header)) != len(header):
+        # pandas names these 'Unnamed: n' / 'name.1'; let it
+        raise ValueError("blank or duplicate column names")
+    return pd.DataFrame([[_calamine_cell(value) for value in row] for row in data],
+                        columns=[str(name) for name in header]).infer_objects()
+
+
+def _openpyxl_excel(source):
+    return pd.read_excel(source, index_col=False)
+
+
+EXCEL_BACKENDS = {b.name: b for b in [
+    Backend('calamine', _calamine_excel, CALAMINE_AVAILABLE),
+    Backend('openpyxl', _openpyxl_excel),
+]}
+
+
+def _read(backends, preferred, fallback, source, **options):
+    if preferred not in backends:
+        raise ValueError(f"Unknown reader {preferred}; expected one of {', '.join(backends)}")
+    for name in dict.fromkeys([preferred, fallback]):
+        backend = backends[name]
+        if not backend.available:
+            continue
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        try:
+            return backend.read(source, **options)
+        except Exception as e:
+            if name == fallback:
+                raise
+            print(f"{name} reader could not parse the file ({e}); falling back to {fallback}")
+
+
+def read_csv(source, usecols=None, dtype=None, backend=None):
+    """Read a CSV file or buffer; ``dtype`` maps column names to pandas dtypes."""
+    return _read(CSV_BACKENDS, backend or CSV_READER, 'pandas', source, usecols=usecols, dtype=dtype)
+
+
+def read_csv_columns(source, backend=None):
+    """Column names of a CSV file or buffer, as read_csv would name them."""
+    return _read(CSV_COLUMN_BACKENDS, backend or CSV_READER, 'pandas', source)
+
+
+def read_excel(source, backend=None):
+    """Read the first sheet of an Excel file or buffer."""
+    return _read(EXCEL_BACKENDS, backend or EXCEL_READER, 'openpyxl', source)
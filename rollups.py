@@ -0,0 +1,158 @@
+"""Daily rollup tables kept up to date as batches are loaded.
+
+Next to every ``{client}_Paid_Data`` table sits ``{client}_Paid_Data_Daily``
+with one row per Date x Platform x Campaign Name x Objective, and next to
+every ``industry_data`` table sits ``industry_data_Daily`` with one row per
+Date x Platform. Writers add each batch's sums to them with an upsert, so
+dashboards read the rollups instead of grouping the raw tables.
+
+Missing key values are stored as '' (and 1000-01-01 for Date) because the
+keys form the primary key. ``python rollups.py CLIENT ...`` rebuilds a
+client's rollup from its Paid_Data table, e.g. after a manual fix.
+"""
+import threading
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import BigInteger, Column, Date, Float, MetaData, String, Table, func, literal, select
+
+from catalog import get_catalog, schema_of
+from transform import METRIC_COLUMNS
+
+MISSING_DATE = date(1000, 1, 1)
+KEY_LENGTHS = {'Platform': 100}
+ROW_COUNT = 'Rows'
+
+
+class Rollup:
+    """Sums of ``metrics`` per ``keys`` over a base table, in ``{base}_Daily``."""
+
+    def __init__(self, keys, metrics):
+        self.keys = keys
+        self.metrics = metrics
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def table_name(self, base):
+        return f"{base}_Daily"
+
+    def get_table(self, engine, base, schema=None):
+        """Return the rollup table for ``base``, creating it once per process.
+
+        The table lives in ``engine``'s database, or in ``schema`` when given.
+        """
+        cache_key = (str(engine.url), schema, base)
+        with self._lock:
+            table = self._tables.get(cache_key)
+            if table is None:
+                name = self.table_name(base)
+                metadata = MetaData()
+                table = Table(
+                    name, metadata,
+                    *[Column(key, Date if key == 'Date' else String(KEY_LENGTHS.get(key, 255)), primary_key=True)
+                      for key in self.keys],
+                    *[Column(m, Float if m == 'Spent' else BigInteger, nullable=False, default=0)
+                      for m in self.metrics],
+                    Column(ROW_COUNT, BigInteger, nullable=False, default=0),
+                    schema=schema,
+                )
+                catalog, db = get_catalog(engine), schema_of(engine, schema)
+                if not catalog.has_table(db, name):
+                    metadata.create_all(engine)
+                    catalog.add_table(db, name, [column.name for column in table.columns])
+                    print(f"Table '{name}' created.")
+                self._tables[cache_key] = table
+        return table
+
+    def aggregate(self, df):
+        """Return the batch's sums per key as insert records, sorted by key."""
+        keys = {}
+        for key in self.keys:
+            if key not in df.columns:
+                keys[key] = MISSING_DATE if key == 'Date' else ''
+            elif key == 'Date':
+                keys[key] = pd.to_datetime(df[key], errors='coerce').dt.date.fillna(MISSING_DATE)
+            else:
+                keys[key] = df[key].astype(object).fillna('').astype(str)
+        frame = pd.DataFrame(keys, index=df.index)
+        for m in self.metrics:
+            frame[m] = pd.to_numeric(df[m], errors='coerce') if m in df.columns else 0
+        # Sorted keys make concurrent writers lock rollup rows in the same order
+        grouped = frame.groupby(self.keys, sort=True)
+        agg = grouped[self.metrics].sum()
+        agg[ROW_COUNT] = grouped.size()
+        agg = agg.reset_index()
+        agg[self.metrics] = agg[self.metrics].fillna(0)
+        return agg.astype(object).to_dict('records')
+
+    def _upsert_add(self, table, dialect):
+        """INSERT that adds to the metrics of rows whose key already exists."""
+        columns = self.metrics + [ROW_COUNT]
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table)
+            return stmt.on_conflict_do_update(index_elements=self.keys,
+                                              set_={c: table.c[c] + stmt.excluded[c] for c in columns})
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        # col = col + VALUES(col)
+        return stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in columns})
+
+    def update(self, engine, base, df, conn=None, schema=None):
+        """Add ``df``'s aggregates to the rollup of ``base``; return the rollup rows touched.
+
+        With ``conn`` the upsert joins that connection's transaction.
+        """
+        if df is None or df.empty:
+            return 0
+        table = self.get_table(engine, base, schema)
+        records = self.aggregate(df)
+        stmt = self._upsert_add(table, engine.dialect.name)
+        if conn is None:
+            with engine.begin() as conn:
+                conn.execute(stmt, records)
+        else:
+            conn.execute(stmt, records)
+        return len(records)
+
+    def rebuild(self, engine, base):
+        """Recompute the whole rollup of ``base`` from the base table in one transaction."""
+        table = self.get_table(engine, base)
+        source = Table(base, MetaData(), autoload_with=engine)
+        keys = [func.coalesce(source.c[k], literal(MISSING_DATE if k == 'Date' else '')).label(k)
+                for k in self.keys]
+        sums = [func.coalesce(func.sum(source.c[m]), 0).label(m) if m in source.c else literal(0).label(m)
+                for m in self.metrics]
+        query = select(*keys, *sums, func.count().label(ROW_COUNT)).group_by(*keys)
+        with engine.begin() as conn:
+            conn.execute(table.delete())
+            conn.execute(table.insert().from_select(self.keys + self.metrics + [ROW_COUNT], query))
+            return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+CLIENT_DAILY = Rollup(['Date', 'Platform', 'Campaign Name', 'Objective'], METRIC_COLUMNS)
+# industry_data has no Follows column
+INDUSTRY_DAILY = Rollup(['Date', 'Platform'], [m for m in METRIC_COLUMNS if m != 'Follows'])
+
+
+def main():
+    import argparse
+    from load import get_engine
+    from mapping import get_db_name
+
+    parser = argparse.ArgumentParser(description="Rebuild daily rollups from the Paid_Data tables")
+    parser.add_argument('clients', nargs='*', help="Clients whose {client}_Paid_Data_Daily to rebuild")
+    parser.add_argument('--industry', action='append', default=[],
+                        help="Industry database (e.g. retail_industry_db) whose industry_data_Daily to rebuild")
+    args = parser.parse_args()
+
+    for client in args.clients:
+        rows = CLIENT_DAILY.rebuild(get_engine(get_db_name(client)), f"{client}_Paid_Data")
+        print(f"{client}: {rows} rollup rows")
+    for db in args.industry:
+        rows = INDUSTRY_DAILY.rebuild(get_engine(db), "industry_data")
+        print(f"{db}: {rows} rollup rows")
+
+
+if __name__ == '__main__':
+    main()
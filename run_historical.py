@@ -1,49 +1,39 @@
 import argparse
 import json
-import os
-import subprocess
+
+from platforms import PLATFORMS
+from util.historical_fetch import add_backfill_arguments, backfill_from_args
+import staging
 
 
 def load_clients(mapping_file: str):
+    """Return ``{client: {platform: accounts}}`` for every client with accounts on a supported platform."""
     with open(mapping_file, 'r') as f:
         data = json.load(f)
-    return list(data.keys())
-
-
-def run_for_client(client: str, start: str, end: str, output: str):
-    cmd = [
-        'python',
-        'util/historical_fetch.py',
-        client,
-        '--start', start,
-        '--end', end,
-        '--output', output
-    ]
-    env = os.environ.copy()
-    env['PYTHONPATH'] = '.'
-    subprocess.run(cmd, check=True, env=env)
+    return {
+        client: {platform: accounts for platform, accounts in platforms.items()
+                 if platform in PLATFORMS and accounts}
+        for client, platforms in data.items()
+    }
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description='Run historical_fetch.py for all clients in map.json'
-    )
-    parser.add_argument('--start', required=True, help='Start date YYYY-MM-DD')
-    parser.add_argument('--end', required=True, help='End date YYYY-MM-DD')
-    parser.add_argument(
-        '--output', choices=['sql', 'csv'], default='csv',
-        help='Output format for historical_fetch.py'
+        description='Backfill historical data for all clients in map.json'
     )
+    add_backfill_arguments(parser)
     parser.add_argument(
         '--map-file', default='map.json',
         help='Path to mapping json file'
     )
     args = parser.parse_args()
 
-    clients = load_clients(args.map_file)
-    for client in clients:
-        print(f'Running historical fetch for {client}')
-        run_for_client(client, args.start, args.end, args.output)
+    if args.from_staging:
+        clients = {client: {platform: [] for platform in platforms}
+                   for client, platforms in staging.staged_clients('raw').items()}
+    else:
+        clients = load_clients(args.map_file)
+    backfill_from_args(clients, args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,137 @@
+"""Split the nightly run's clients across parallel processes.
+
+Cloud Run jobs start ``CLOUD_RUN_TASK_COUNT`` copies of the container, each
+with its own ``CLOUD_RUN_TASK_INDEX``. Every copy discovers the same
+mapping and keeps only the clients assigned to its index, so together they
+cover every client exactly once.
+
+The assignment is longest-processing-time first: clients are weighted by
+their average daily API time in ``etl_logs.api_calls`` over the last
+``SHARD_HISTORY_DAYS`` days, and each goes to the least-loaded shard,
+heaviest first. Only days before the date in the shared run ID count, so
+shards starting at different moments, even either side of midnight, still
+agree; without a date in the run ID every client weighs the same. Clients without history weigh the average
+of those with it, and ties are broken by a stable hash of the name.
+Clients that share a platform account are kept on one shard, so the
+account is still fetched once (see ``fetch_plan.py``).
+
+All shards log under one run ID: ``CLOUD_RUN_EXECUTION`` when set.
+"""
+import os
+import re
+import zlib
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+SHARD_HISTORY_DAYS = int(os.getenv("SHARD_HISTORY_DAYS", "14"))
+
+
+def shard_from_env():
+    """``(index, count)`` of this Cloud Run task, ``(0, 1)`` outside Cloud Run."""
+    return int(os.getenv("CLOUD_RUN_TASK_INDEX", "0")), int(os.getenv("CLOUD_RUN_TASK_COUNT", "1"))
+
+
+def shared_run_id():
+    """Run ID shared by every task of this Cloud Run execution, or None outside one."""
+    execution = os.getenv("CLOUD_RUN_EXECUTION")
+    return f"load-job-{execution}" if execution else None
+
+
+def history_until(run_id):
+    """Start of the date in ``run_id`` (``YYYYMMDD`` or ``YYYY-MM-DD``), or None if it has none."""
+    match = re.search(r'(\d{4})-?(\d{2})-?(\d{2})', run_id or '')
+    if not match:
+        return None
+    try:
+        return datetime(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+def stable_hash(name):
+    return zlib.crc32(name.encode('utf-8'))
+
+
+def client_durations(engine, until=None, days=SHARD_HISTORY_DAYS):
+    """Average seconds of API time per run day for each client, from ``api_calls``.
+
+    Only calls logged in the ``days`` days before ``until`` (default: the
+    start of today) count.
+    """
+    until = until or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT client, SUM(duration_seconds) / COUNT(DISTINCT DATE(created_at))
+            FROM api_calls
+            WHERE created_at >= :since AND created_at < :until AND client IS NOT NULL
+            GROUP BY client
+        """), {'since': until - timedelta(days=days), 'until': until})
+        return {client: float(seconds or 0) for client, seconds in rows}
+
+
+def client_groups(mapping):
+    """Clients of ``mapping`` grouped so that clients sharing an account are together."""
+    parent = {client: client for client in mapping}
+
+    def find(client):
+        while parent[client] != client:
+            parent[client] = parent[parent[client]]
+            client = parent[client]
+        return client
+
+    owners = {}
+    for client, platforms in mapping.items():
+        for platform, accounts in platforms.items():
+            if not isinstance(accounts, list):
+                continue
+            for account in accounts:
+                if not isinstance(account, (list, tuple)):
+                    continue
+                other = owners.setdefault((platform, str(account[0])), client)
+                parent[find(client)] = find(other)
+
+    groups = {}
+    for client in mapping:
+        groups.setdefault(find(client), []).append(client)
+    return list(groups.values())
+
+
+def client_weights(mapping, weights=None):
+    """Weight of every client in ``mapping``: its own history, else the average of those with one."""
+    weights = weights or {}
+    known = [weights[client] for client in mapping if client in weights]
+    default = sum(known) / len(known) if known else 1.0
+    return {client: weights.get(client, default) for client in mapping}
+
+
+def assign_shards(mapping, count, weights=None):
+    """Return ``{client: shard}`` for ``count`` shards, weighted by ``weights`` (seconds per client)."""
+    weights = client_weights(mapping, weights)
+    groups = [(sum(weights[client] for client in group), sorted(group))
+              for group in client_groups(mapping)]
+    # Heaviest first; the hash only orders equal weights, so every shard sorts alike
+    groups.sort(key=lambda group: (-group[0], stable_hash(group[1][0]), group[1][0]))
+    loads = [0.0] * count
+    shards = {}
+    for weight, group in groups:
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += weight
+        for client in group:
+            shards[client] = shard
+    return shards
+
+
+def select_shard(mapping, index, count, weights=None):
+    """The part of ``mapping`` that shard ``index`` of ``count`` handles."""
+    if count <= 1:
+        return mapping
+    shards = assign_shards(mapping, count, weights)
+    mine = {client: platforms for client, platforms in mapping.items() if shards[client] == index}
+    weights = client_weights(mapping, weights)
+    print(f"Shard {index + 1}/{count}: {len(mine)} of {len(mapping)} clients, "
+          f"~{sum(weights[client] for client in mine):.0f}s of ~{sum(weights.values()):.0f}s estimated API time")
+    return mine
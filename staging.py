@@ -0,0 +1,156 @@
+"""Local Parquet staging area between extract and load.
+
+Raw extractor batches and transformed frames are kept as typed,
+dictionary-encoded Parquet under ``STAGING_DIR``, partitioned as
+
+    {stage}/client=<client>/platform=<platform>/date=<YYYY-MM-DD>/part-<run_id>-<n>.parquet
+
+so transform and load can be re-run from disk without calling the APIs again
+(``python load.py --from-staging`` / ``run_historical.py --from-staging``).
+Reads are memory-mapped and, by default, only use the latest run written to
+each partition, so re-extracting a day replaces it rather than doubling it.
+"""
+import os
+import threading
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STAGING_DIR = os.getenv("STAGING_DIR", "staging")
+# Stage every extracted and transformed batch during normal runs
+STAGING_ENABLED = os.getenv("STAGING", "0") == "1"
+STAGES = ('raw', 'transformed')
+
+# String columns whose distinct values make up less than this share of the
+# rows are stored dictionary-encoded (and read back as pandas categoricals)
+DICTIONARY_RATIO = 0.5
+
+_sequence = {}
+_sequence_lock = threading.Lock()
+
+
+def _partition_dir(stage, client, platform, date):
+    return os.path.join(
+        STAGING_DIR, stage,
+        f"client={quote(client, safe='')}",
+        f"platform={platform}",
+        f"date={date}",
+    )
+
+
+def _next_name(run_id):
+    with _sequence_lock:
+        n = _sequence[run_id] = _sequence.get(run_id, 0) + 1
+    return f"part-{run_id}-{n:05d}.parquet"
+
+
+def to_arrow(df):
+    """Typed Arrow table for ``df``; low-cardinality strings are dictionary-encoded."""
+    arrays = {}
+    for col in df.columns:
+        series = df[col]
+        try:
+            array = pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Raw API payloads mix numbers and strings in one field
+            array = pa.array(series.map(lambda v: None if pd.isna(v) else str(v)), type=pa.string())
+        if pa.types.is_string(array.type) and len(array) \
+                and series.nunique(dropna=True) < DICTIONARY_RATIO * len(array):
+            array = array.dictionary_encode()
+        arrays[str(col)] = array
+    return pa.table(arrays)
+
+
+def write_batch(df, client, platform, stage, run_id):
+    """Persist one batch under ``stage`` partitioned by its ``Date`` values.
+
+    Rows without a usable ``Date`` (e.g. LinkedIn lifetime analytics) go to
+    the run's own date. Returns the paths of the files written.
+    """
+    if df is None or df.empty:
+        return []
+    run_date = datetime.now().strftime('%Y-%m-%d')
+    if 'Date' in df.columns:
+        dates = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna(run_date)
+    else:
+        dates = pd.Series(run_date, index=df.index)
+
+    paths = []
+    for date, part in df.groupby(dates, sort=False):
+        path = _partition_dir(stage, client, platform, date)
+        os.makedirs(path, exist_ok=True)
+        name = _next_name(run_id)
+        while os.path.exists(os.path.join(path, name)):
+            # A resumed backfill writes under its earlier run ID
+            name = _next_name(run_id)
+        paths.append(os.path.join(path, name))
+        pq.write_table(to_arrow(part), paths[-1], compression='zstd')
+    return paths
+
+
+def _partitions(path, prefix):
+    if not os.path.isdir(path):
+        return []
+    return sorted(name[len(prefix):] for name in os.listdir(path) if name.startswith(prefix))
+
+
+def staged_clients(stage='raw'):
+    """Return ``{client: [platform, ...]}`` for everything staged under ``stage``."""
+    root = os.path.join(STAGING_DIR, stage)
+    return {
+        unquote(client): _partitions(os.path.join(root, f"client={client}"), 'platform=')
+        for client in _partitions(root, 'client=')
+    }
+
+
+def _files(path, latest_only):
+    files = sorted(name for name in os.listdir(path) if name.endswith('.parquet'))
+    if latest_only and files:
+        # part-<run_id>-<n>.parquet; keep the files of the run written last
+        newest = max(files, key=lambda name: os.path.getmtime(os.path.join(path, name)))
+        run_id = newest[len('part-'):].rsplit('-', 1)[0]
+        files = [name for name in files if name.startswith(f"part-{run_id}-")]
+    return [os.path.join(path, name) for name in files]
+
+
+def to_pandas(table, categorical=False):
+    """DataFrame for an Arrow table written by ``to_arrow``."""
+    if not categorical:
+        # preprocess_* expect plain object columns, not categoricals
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table.to_pandas()
+
+
+def _read(path, categorical):
+    return to_pandas(pq.read_table(path, memory_map=True), categorical)
+
+
+def iter_staged(stage, client, platform, start_date=None, end_date=None, latest_only=True, categorical=False):
+    """Yield staged DataFrames for one client and platform, one file at a time.
+
+    ``start_date``/``end_date`` (inclusive, datetimes or ``YYYY-MM-DD``) prune
+    whole date partitions before anything is read. Dictionary-encoded columns
+    come back as categoricals only when ``categorical`` is set.
+    """
+    start = pd.Timestamp(start_date).strftime('%Y-%m-%d') if start_date else None
+    end = pd.Timestamp(end_date).strftime('%Y-%m-%d') if end_date else None
+    base = os.path.join(STAGING_DIR, stage, f"client={quote(client, safe='')}", f"platform={platform}")
+    for date in _partitions(base, 'date='):
+        if (start and date < start) or (end and date > end):
+            continue
+        for path in _files(os.path.join(base, f"date={date}"), latest_only):
+            yield _read(path, categorical)
+
+
+def read_staged(stage, client, platform, start_date=None, end_date=None):
+    """Concatenate everything ``iter_staged`` yields into one DataFrame."""
+    frames = list(iter_staged(stage, client, platform, start_date, end_date))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
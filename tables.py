@@ -0,0 +1,303 @@
+"""Paid_Data and industry_data table management.
+
+On MySQL both tables are created with a surrogate ``id`` key, typed columns
+and RANGE partitions by month on ``TO_DAYS(Date)``:
+
+    p_old      rows before the first month, and rows without a Date
+    pYYYYMM    one per month, up to PARTITION_MONTHS_AHEAD months from now
+    p_future   anything later
+
+Queries and deletes bounded on Date then only touch the matching months.
+``maintain_partitions`` splits upcoming months out of ``p_future`` before
+they are needed; load calls it the first time it touches a table in a run.
+Tables created before partitioning are converted by ``migrate_table``
+(``python tables.py migrate ...``). Other databases, such as SQLite in the
+benchmarks, get plain tables.
+"""
+import os
+from datetime import date
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, Date, Float, Integer, MetaData, String, Table, text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateColumn
+
+from catalog import get_catalog, schema_of
+
+load_dotenv()
+
+# First monthly partition of a new table; older rows go to p_old
+PARTITION_START = date.fromisoformat(os.getenv("PARTITION_START", "2019-01-01"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+MIGRATE_BATCH_ROWS = int(os.getenv("MIGRATE_BATCH_ROWS", "10000"))
+
+
+def paid_data_columns(exclude=()):
+    """Fresh Column objects for the Paid_Data layout, minus ``exclude``."""
+    columns = [
+        Column('Ad Account Name', String(255)),
+        Column('Campaign Name', String(255)),
+        Column('Ad Set Name', String(255)),
+        Column('Start Date', Date),
+        Column('End Date', Date),
+        Column('Date', Date),
+        Column('Ad Name', String(255)),
+        Column('Spent', Float),
+        Column('Impressions', Integer),
+        Column('Reach', Integer),
+        Column('Clicks', Integer),
+        Column('Post Engagements', Integer),
+        Column('Post Shares', Integer),
+        Column('Post Saves', Integer),
+        Column('Post Reactions', Integer),
+        Column('Post Comments', Integer),
+        Column('3-second Video Plays', Integer),
+        Column('Eng Minus Views', Integer),
+        Column('Platform', String(100)),
+        Column('Round', String(100)),
+        Column('Audience', String(255)),
+        Column('Influencer', String(255)),
+        Column('Objective1', String(255)),
+        Column('Objective', String(255)),
+        Column('Placement', String(255)),
+        Column('Destination', String(255)),
+        Column('Follows', Integer),
+    ]
+    return [column for column in columns if column.name not in exclude]
+
+
+def paid_data_table(table_name, columns, schema=None):
+    """Table for writing to an existing Paid_Data-layout table that has ``columns``.
+
+    Built from the layout instead of reflected, so it costs no round-trip.
+    """
+    return Table(table_name, MetaData(), *[column for column in paid_data_columns() if column.name in columns],
+                 schema=schema)
+
+
+def _month(day):
+    return date(day.year, day.month, 1)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _months(start, end):
+    """First days of every month from ``start``'s through ``end``'s."""
+    month, months = _month(start), []
+    while month <= end:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _horizon():
+    month = _month(date.today())
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        month = _next_month(month)
+    return month
+
+
+def _partition(month):
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{_next_month(month)}'))"
+
+
+def _qualified(name, schema=None):
+    return f"`{schema}`.`{name}`" if schema else f"`{name}`"
+
+
+def partition_clause(start=PARTITION_START):
+    """PARTITION BY clause with monthly partitions from ``start``'s month to the horizon."""
+    months = _months(start, _horizon())
+    parts = ([f"PARTITION p_old VALUES LESS THAN (TO_DAYS('{months[0]}'))"]
+             + [_partition(month) for month in months]
+             + ["PARTITION p_future VALUES LESS THAN MAXVALUE"])
+    return "PARTITION BY RANGE (TO_DAYS(`Date`)) (\n  " + ",\n  ".join(parts) + "\n)"
+
+
+def create_table_ddl(table_name, exclude=(), schema=None, start=PARTITION_START):
+    """MySQL CREATE TABLE for a partitioned Paid_Data-layout table."""
+    dialect = mysql.dialect()
+    # A unique key would have to include Date, which is not always set, so
+    # id is indexed rather than a primary key
+    lines = (["`id` BIGINT NOT NULL AUTO_INCREMENT"]
+             + [str(CreateColumn(column).compile(dialect=dialect)) for column in paid_data_columns(exclude)]
+             + ["KEY `ix_id` (`id`)", "KEY `ix_date` (`Date`)"])
+    return (f"CREATE TABLE IF NOT EXISTS {_qualified(table_name, schema)} (\n  " + ",\n  ".join(lines)
+            + f"\n) {partition_clause(start)}")
+
+
+def create_table_if_not_exists(engine, table_name, exclude=(), schema=None):
+    """Create ``table_name`` in ``schema`` (else ``engine``'s database) unless the catalog has it."""
+    catalog, db = get_catalog(engine), schema_of(engine, schema)
+    if catalog.has_table(db, table_name):
+        return
+    if engine.dialect.name == 'mysql':
+        with engine.begin() as conn:
+            conn.execute(text(create_table_ddl(table_name, exclude, schema)))
+    else:
+        metadata = MetaData()
+        Table(table_name, metadata, *paid_data_columns(exclude), schema=schema)
+        metadata.create_all(engine)
+    catalog.add_table(db, table_name, [column.name for column in paid_data_columns(exclude)])
+    print(f"Table '{table_name}' created.")
+
+
+def get_partitions(conn, table_name, schema=None):
+    """Partition names of ``table_name`` in order; empty if it is not partitioned."""
+    rows = conn.execute(text("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE()) AND TABLE_NAME = :table_name
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """), {'schema': schema, 'table_name': table_name})
+    return [row[0] for row in rows]
+
+
+def _monthly(partitions):
+    return [name for name in partitions if name[1:].isdigit()]
+
+
+def maintain_partitions(engine, table_name, schema=None):
+    """Split the months up to the horizon out of ``p_future``; return the partitions added."""
+    if engine.dialect.name != 'mysql':
+        return []
+    catalog, db = get_catalog(engine), schema_of(engine, schema)
+    partitions = catalog.get_partitions(db, table_name)
+    if 'p_future' not in partitions:
+        print(f"Table '{table_name}' is not partitioned by month; convert it with "
+              f"`python tables.py migrate`.")
+        return []
+    monthly = _monthly(partitions)
+    last = date(int(monthly[-1][1:5]), int(monthly[-1][5:]), 1) if monthly else _month(date.today())
+    months = _months(_next_month(last), _horizon())
+    if not months:
+        return []
+    parts = [_partition(month) for month in months] + ["PARTITION p_future VALUES LESS THAN MAXVALUE"]
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {_qualified(table_name, schema)} REORGANIZE PARTITION p_future INTO ("
+                          + ", ".join(parts) + ")"))
+    added = [f"p{month:%Y%m}" for month in months]
+    catalog.set_partitions(db, table_name, partitions[:-1] + added + ['p_future'])
+    print(f"Table '{table_name}': added partitions {', '.join(added)}")
+    return added
+
+
+def drop_partitions_before(engine, table_name, before, schema=None):
+    """Drop the monthly partitions wholly before ``before`` (retention); return their names."""
+    with engine.connect() as conn:
+        partitions = get_partitions(conn, table_name, schema)
+    cutoff = f"p{_month(before):%Y%m}"
+    old = [name for name in _monthly(partitions) if name < cutoff]
+    if old:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {_qualified(table_name, schema)} DROP PARTITION {', '.join(old)}"))
+        get_catalog(engine).set_partitions(schema_of(engine, schema), table_name,
+                                           [name for name in partitions if name not in old])
+        print(f"Table '{table_name}': dropped partitions {', '.join(old)}")
+    return old
+
+
+def migrate_table(engine, table_name, exclude=(), schema=None):
+    """Convert an unpartitioned table to the partitioned layout without blocking loads.
+
+    Rows are copied into a partitioned shadow table from a consistent
+    snapshot, while a trigger mirrors rows inserted after the snapshot; the
+    two tables are then swapped with one RENAME TABLE. Writes are blocked
+    only for the moment it takes to create the trigger and the snapshot
+    together. The original is kept as ``{table}__unpartitioned``. The tables
+    are append-only, so updates and deletes are not mirrored. Returns the
+    number of rows copied.
+    """
+    with engine.connect() as conn:
+        if 'p_future' in get_partitions(conn, table_name, schema):
+            print(f"Table '{table_name}' is already partitioned.")
+            return 0
+    existing = set(get_catalog(engine).columns(schema_of(engine, schema), table_name) or [])
+    columns = [column.name for column in paid_data_columns(exclude) if column.name in existing]
+    column_list = ", ".join(f"`{name}`" for name in columns)
+    source = _qualified(table_name, schema)
+    shadow = _qualified(f"{table_name}__partitioned", schema)
+    trigger = _qualified(f"{table_name}__mirror", schema)
+
+    lock_conn, snapshot, writer = engine.connect(), engine.connect(), engine.connect()
+    try:
+        first = writer.execute(text(f"SELECT MIN(`Date`) FROM {source}")).scalar()
+        writer.execute(text(create_table_ddl(f"{table_name}__partitioned", exclude, schema,
+                                             min(first or PARTITION_START, PARTITION_START))))
+        writer.commit()
+
+        # With writes blocked, the trigger and the snapshot start at the same
+        # point: rows before it are copied below, rows after it are mirrored
+        lock_conn.exec_driver_sql(f"LOCK TABLES {source} WRITE, {shadow} WRITE")
+        try:
+            lock_conn.exec_driver_sql(
+                f"CREATE TRIGGER {trigger} AFTER INSERT ON {source} FOR EACH ROW "
+                f"INSERT INTO {shadow} ({column_list}) VALUES ({', '.join(f'NEW.`{name}`' for name in columns)})")
+            snapshot.exec_driver_sql("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        finally:
+            lock_conn.exec_driver_sql("UNLOCK TABLES")
+
+        insert = f"INSERT INTO {shadow} ({column_list}) VALUES ({', '.join(['%s'] * len(columns))})"
+        result = snapshot.execution_options(stream_results=True).exec_driver_sql(
+            f"SELECT {column_list} FROM {source}")
+        copied = 0
+        while True:
+            rows = result.fetchmany(MIGRATE_BATCH_ROWS)
+            if not rows:
+                break
+            writer.exec_driver_sql(insert, [tuple(row) for row in rows])
+            writer.commit()
+            copied += len(rows)
+            print(f"Table '{table_name}': {copied} rows copied")
+        snapshot.rollback()
+
+        writer.exec_driver_sql(f"RENAME TABLE {source} TO {_qualified(f'{table_name}__unpartitioned', schema)}, "
+                               f"{shadow} TO {source}")
+        writer.exec_driver_sql(f"DROP TRIGGER {trigger}")
+        writer.commit()
+    except BaseException:
+        writer.rollback()
+        writer.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        writer.exec_driver_sql(f"DROP TABLE IF EXISTS {shadow}")
+        writer.commit()
+        raise
+    finally:
+        for conn in (lock_conn, snapshot, writer):
+            conn.close()
+        get_catalog(engine).invalidate()
+    print(f"Table '{table_name}' partitioned; the original is kept as '{table_name}__unpartitioned' "
+          f"until you drop it.")
+    return copied
+
+
+def main():
+    import argparse
+    from load import get_engine
+    from mapping import get_db_name
+
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of Paid_Data and industry_data")
+    parser.add_argument('action', choices=['maintain', 'migrate', 'retain'])
+    parser.add_argument('clients', nargs='*', help="Clients whose {client}_Paid_Data to manage")
+    parser.add_argument('--industry', action='append', default=[],
+                        help="Industry database (e.g. retail_industry_db) whose industry_data to manage")
+    parser.add_argument('--before', help="retain: drop months before this date, YYYY-MM-DD")
+    args = parser.parse_args()
+    if args.action == 'retain' and not args.before:
+        parser.error("retain needs --before")
+
+    targets = [(get_db_name(client), f"{client}_Paid_Data", ()) for client in args.clients]
+    targets += [(db, "industry_data", ['Follows']) for db in args.industry]
+    engine = get_engine()
+    for db, table_name, exclude in targets:
+        if args.action == 'maintain':
+            maintain_partitions(engine, table_name, db)
+        elif args.action == 'migrate':
+            migrate_table(engine, table_name, exclude, db)
+        else:
+            drop_partitions_before(engine, table_name, date.fromisoformat(args.before), db)
+
+
+if __name__ == '__main__':
+    main()
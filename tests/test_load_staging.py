@@ -0,0 +1,55 @@
+"""load.main(from_staging=True) replays staged raw batches without calling the APIs."""
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import load
+import staging
+from benchmarks.fixtures import synth_facebook_frame
+
+
+def raw_files(root):
+    return sorted(os.path.join(path, name) for path, _, names in os.walk(os.path.join(root, 'raw')) for name in names)
+
+
+class RecordingWriter:
+    """Stands in for PaidDataWriter, keeping the rows it is given."""
+
+    written = {}
+
+    def __init__(self, client):
+        self.client = client
+        self.table_name = f"{client}_Paid_Data"
+        self.rows = 0
+
+    def write(self, df):
+        self.rows += len(df)
+        RecordingWriter.written[self.client] = RecordingWriter.written.get(self.client, 0) + len(df)
+
+
+def test_replays_staged_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(staging, 'STAGING_DIR', str(tmp_path))
+    raw = synth_facebook_frame(200)
+    staging.write_batch(raw, 'Acme', 'facebook', 'raw', 'run1')
+    staging.write_batch(raw.head(50), 'Globex', 'facebook', 'raw', 'run1')
+    staged = raw_files(tmp_path)
+    RecordingWriter.written = {}
+    logger = mock.Mock()
+    with mock.patch.object(load, 'get_logger', return_value=logger), \
+            mock.patch.object(load, 'get_catalog'), \
+            mock.patch.object(load, 'PaidDataWriter', RecordingWriter), \
+            mock.patch.object(load, 'discover_mapping') as discover, \
+            mock.patch.object(load, 'monitor_drive_folder') as drive:
+        load.main(from_staging=True)
+
+    success, error = logger.log_pipeline_run.call_args.args[3:5]
+    assert success, error
+    assert RecordingWriter.written == {'Acme': 200, 'Globex': 50}
+    assert {call.args[1] for call in logger.log_rows_appended.call_args_list} == {'Acme', 'Globex'}
+    discover.assert_not_called()
+    drive.assert_not_called()
+    # The replay stages its transformed batches, not the raw ones again
+    assert staging.staged_clients('transformed') == {'Acme': ['facebook'], 'Globex': ['facebook']}
+    assert raw_files(tmp_path) == staged
@@ -5,6 +5,74 @@ import pandas as pd
 import json
 import os
 
+# Dtype policy applied at the end of every preprocess_*. Text dimensions with
+# few distinct values become categoricals; metrics are downcast to the smallest
+# integer type that holds them, and floats only when that loses nothing.
+CATEGORY_COLUMNS = [
+    'Ad Account Name', 'Campaign Name', 'Ad Set Name', 'Platform', 'Round', 'Audience',
+    'Influencer', 'Objective1', 'Objective', 'Placement', 'Destination', 'Content Name'
+]
+CATEGORY_MAX_RATIO = 0.5
+METRIC_COLUMNS = [
+    'Spent', 'Impressions', 'Reach', 'Clicks', 'Post Engagements', 'Post Shares', 'Post Reactions',
+    'Post Comments', 'Post Saves', '3-second Video Plays', 'Eng Minus Views', 'Follows'
+]
+
+# Bytes before and after compact_dtypes, summed until memory_report() is read
+memory_stats = {'before': 0, 'after': 0}
+
+
+def compact_dtypes(df):
+    """Apply the dtype policy to a preprocessed frame in place and return it."""
+    if df is None or df.empty:
+        return df
+    memory_stats['before'] += df.memory_usage(deep=True).sum()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and df[col].dtype == object \
+                and df[col].nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(df):
+            df[col] = df[col].astype('category')
+    for col in METRIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            narrow = series.astype('float32')
+            if (narrow.astype('float64') == series).all():
+                df[col] = narrow
+    memory_stats['after'] += df.memory_usage(deep=True).sum()
+    return df
+
+
+def memory_report():
+    """Return a before/after line for the frames compacted since the last report, and reset."""
+    before, after = memory_stats['before'], memory_stats['after']
+    memory_stats['before'] = memory_stats['after'] = 0
+    if not before:
+        return "No frames compacted"
+    return f"Transformed frames: {before / 1024 ** 2:.1f} MB -> {after / 1024 ** 2:.1f} MB ({after / before:.0%})"
+
+
+def concat_frames(frames):
+    """Concatenate frames keeping categoricals whose categories differ between frames."""
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    columns = set().union(*(df.columns for df in frames))
+    categorical = [
+        col for col in columns
+        if all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in frames)
+    ]
+    if categorical:
+        frames = [df.copy() for df in frames]
+        for col in categorical:
+            categories = pd.api.types.union_categoricals([df[col] for df in frames]).categories
+            for df in frames:
+                df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
 def date(date_string):
     """Convert date string to 'YYYY-MM-DD' format."""
     try:
@@ -412,7 +480,7 @@ def preprocess_insta(df):
             processed_df['Objective'] = df['Ad Set Name'].apply(extract_objective)
             processed_df['Objective1'] = df['Objective']
             processed_df['Content Name'] = df['Ad Set Name'].apply(extract_content)
-        return processed_df
+        return compact_dtypes(processed_df)
 
     except Exception as e:
         #print(f"Error in preprocessing Instagram data: {e}")
@@ -495,7 +563,7 @@ def preprocess_tiktok(df_tiktok):
 
         # Filter out rows where all of these columns are zero
         processed_df = processed_df[~(processed_df[zero_metric_cols].sum(axis=1) == 0)]
-        return processed_df
+        return compact_dtypes(processed_df)
 
     except Exception as e:
         print(f"Error in preprocessing TikTok data: {e}")
@@ -535,7 +603,7 @@ def preprocess_linkedin(df_linkedin):
             'Follows': pd.to_numeric(df_linkedin['Follows'], errors='coerce').fillna(0).astype(int)
         })
         
-        return processed_df
+        return compact_dtypes(processed_df)
 
     except KeyError as ke:
         print(f"KeyError - Missing column: {ke}")
@@ -622,4 +690,4 @@ def preprocess_youtube(df: pd.DataFrame) -> pd.DataFrame:
         'Destination', 'Follows'
     ]
 
-    return df[[col for col in final_columns if col in df.columns]]
+    return compact_dtypes(df[[col for col in final_columns if col in df.columns]].copy())
@@ -1,19 +1,27 @@
 import argparse
 import json
 import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 from typing import Dict, Any
-import time
 
 import pandas as pd
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy import types
 
-from extract import fetch_tiktok_report
-from transform import preprocess_insta, preprocess_tiktok, preprocess_linkedin, preprocess_youtube
-from load import create_table_if_not_exists, ensure_database_exists
+from platforms import PLATFORMS, get_platform
+from load import create_table_if_not_exists, ensure_database_exists, get_engine, to_records, EXPECTED_COLUMNS
 from mapping import get_db_name
+import staging
+from ledger import WorkUnitLedger, LEDGER_URL, ledger_url, unit_key
+import parallel_transform
+import rollups
+from fetch_plan import AccountFetchPlan
+from catalog import get_catalog, schema_of
+from tables import paid_data_table
+from work_queue import WORK_QUEUE_URL, WorkItem, WorkQueue
+from explain import explain_backfill
 
 # Utilities ---------------------------------------------------------------
 
@@ -22,272 +30,371 @@ def load_mapping() -> Dict[str, Any]:
         return json.load(f)
 
 
-def retry_request(session, url, params, max_retries=3):
-    for attempt in range(max_retries):
+# Work units --------------------------------------------------------------
+
+class BackfillOutput:
+    """Where one client's transformed batches go: a CSV file, its MySQL table or staging only.
+
+    One instance can be shared by threads working on different units of the
+    same client; the SQL engine comes from load's shared pool. Writes go
+    through ``unit()`` so each unit lands completely or not at all.
+    """
+
+    def __init__(self, client: str, output: str, run_id: str, stage: bool = False, fresh: bool = True):
+        self.client = client
+        self.output = output
+        self.run_id = run_id
+        self.stage = stage or output == "parquet"
+        self.rows = 0
+        self.lock = threading.Lock()
+        self.engine = None
+        self.table = None
+        self.table_name = f"{client}_Paid_Data".replace(' ', '_')
+        self.output_file = f"{client.replace(' ', '_')}_paid_data.csv"
+        if output == "csv" and fresh and os.path.exists(self.output_file):
+            os.remove(self.output_file)
+
+    def get_engine(self):
+        with self.lock:
+            if self.engine is None:
+                db = get_db_name(self.client)
+                ensure_database_exists(get_engine(), db)
+                self.engine = get_engine(db)
+                create_table_if_not_exists(self.engine, self.table_name)
+                columns = get_catalog(self.engine).columns(schema_of(self.engine), self.table_name)
+                self.table = paid_data_table(self.table_name, columns)
+                rollups.CLIENT_DAILY.get_table(self.engine, self.table_name)
+        return self.engine
+
+    def unit(self, platform: str) -> "UnitWriter":
+        return UnitWriter(self, platform)
+
+    def summary(self) -> str:
+        if not self.rows:
+            return "No data fetched"
+        if self.output == "csv":
+            return f"{self.rows} rows written to {self.output_file}"
+        if self.output == "parquet":
+            return f"{self.rows} rows staged under {staging.STAGING_DIR}"
+        return f"{self.rows} rows appended to MySQL table {self.table_name}"
+
+
+class UnitWriter:
+    """One unit's writes to a ``BackfillOutput``, made visible together on ``commit()``.
+
+    SQL batches and their rollup updates share one transaction. CSV batches go to a side file that is
+    appended to the client's CSV on commit. Staged Parquet files are deleted
+    on rollback.
+    """
+
+    def __init__(self, out: BackfillOutput, platform: str):
+        self.out = out
+        self.platform = platform
+        self.rows = 0
+        self.staged = []
+        self.conn = None
+        self.transaction = None
+        self.part_file = None
+        if out.output == "sql":
+            self.conn = out.get_engine().connect()
+            self.transaction = self.conn.begin()
+        elif out.output == "csv":
+            fd, self.part_file = tempfile.mkstemp(suffix='.csv', prefix='unit-')
+            os.close(fd)
+
+    def stage_raw(self, batch: pd.DataFrame):
+        self.staged += staging.write_batch(batch, self.out.client, self.platform, 'raw', self.out.run_id)
+
+    def write(self, df: pd.DataFrame):
+        if self.out.stage:
+            self.staged += staging.write_batch(df, self.out.client, self.platform, 'transformed', self.out.run_id)
+        if self.conn is not None:
+            # pandas<2 can't to_sql through an SQLAlchemy 2 Connection, so the
+            # batch is inserted with Core inside the unit's transaction
+            self.conn.execute(self.out.table.insert(), to_records(df))
+            rollups.CLIENT_DAILY.update(self.out.engine, self.out.table_name, df, conn=self.conn)
+        elif self.part_file:
+            # Platforms return their columns in different orders, so every
+            # batch is aligned to the Paid_Data layout before appending
+            df.reindex(columns=EXPECTED_COLUMNS).to_csv(self.part_file, mode='a', header=False, index=False)
+        self.rows += len(df)
+
+    def commit(self):
+        if self.transaction is not None:
+            self.transaction.commit()
+            self.conn.close()
+        elif self.part_file:
+            with self.out.lock:
+                if not os.path.exists(self.out.output_file):
+                    pd.DataFrame(columns=EXPECTED_COLUMNS).to_csv(self.out.output_file, index=False)
+                with open(self.part_file, 'rb') as src, open(self.out.output_file, 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(self.part_file)
+        with self.out.lock:
+            self.out.rows += self.rows
+
+    def rollback(self):
+        if self.transaction is not None:
+            self.transaction.rollback()
+            self.conn.close()
+        elif self.part_file and os.path.exists(self.part_file):
+            os.remove(self.part_file)
+        for path in self.staged:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_unit(client: str, platform: str, platforms: Dict[str, Any], start_date: datetime, end_date: datetime,
+             out: BackfillOutput, chunk_days: int = 7, from_staging: bool = False, stage_raw: bool = False,
+             fetches: AccountFetchPlan = None, before_commit=None) -> int:
+    """Fetch, transform and write one unit; return the rows written.
+
+    ``platforms`` holds the accounts the unit covers. Batches are written as
+    they are transformed, so a unit never holds more than one batch in
+    memory, but nothing is visible until the whole unit has succeeded.
+    Accounts that ``fetches`` has as shared with other units are fetched
+    once for all of them. ``before_commit(conn, rows)`` is called once
+    everything is written, inside the unit's transaction for SQL output
+    (``conn`` is None otherwise); if it raises, the unit is rolled back.
+    """
+    entry = get_platform(platform)
+    if from_staging:
+        batches = staging.iter_staged('raw', client, platform, start_date, end_date)
+    elif fetches is not None:
+        batches = fetches.iter_batches(
+            platform, platforms[platform],
+            lambda accounts: entry.extract_range(accounts, start_date, end_date, chunk_days),
+            window=(start_date, end_date))
+    else:
+        batches = entry.extract_range(platforms, start_date, end_date, chunk_days)
+
+    writer = out.unit(platform)
+
+    def raw_batches():
+        for batch in batches:
+            if stage_raw:
+                writer.stage_raw(batch)
+            yield batch
+
+    print(f"Fetching {entry.label} data for {client} ({start_date:%Y-%m-%d} to {end_date:%Y-%m-%d})...")
+    try:
+        for df in parallel_transform.iter_preprocess(entry.preprocess, raw_batches()):
+            if df is None or df.empty:
+                continue
+            writer.write(df)
+        if before_commit is not None:
+            before_commit(writer.conn, writer.rows)
+    except BaseException:
+        writer.rollback()
+        raise
+    writer.commit()
+    return writer.rows
+
+# Backfill orchestration --------------------------------------------------
+
+def date_chunks(start: datetime, end: datetime, days: int):
+    """Split ``start``..``end`` (inclusive) into consecutive ranges of ``days`` days."""
+    current = start
+    while current <= end:
+        chunk_end = min(current + timedelta(days=days - 1), end)
+        yield current, chunk_end
+        current = chunk_end + timedelta(days=1)
+
+
+def plan_units(clients: Dict[str, Any], start: datetime, end: datetime, unit_days: int, from_staging: bool = False):
+    """Return (client, platform, account, accounts, chunk_start, chunk_end) for every unit.
+
+    API units cover a single account; staged data is not split by account,
+    so a staging replay has one unit ('*') per platform and chunk.
+    """
+    units = []
+    for chunk_start, chunk_end in date_chunks(start, end, unit_days):
+        for client, platforms in clients.items():
+            for platform in PLATFORMS:
+                if platform not in platforms:
+                    continue
+                if from_staging:
+                    units.append((client, platform, '*', {}, chunk_start, chunk_end))
+                    continue
+                for account_id, account_name in dict.fromkeys(map(tuple, platforms[platform])):
+                    units.append((client, platform, f"{account_id} {account_name}",
+                                  {platform: [[account_id, account_name]]}, chunk_start, chunk_end))
+    return units
+
+
+def run_backfill(clients: Dict[str, Any], start: datetime, end: datetime, output: str, workers: int = 4,
+                 unit_days: int = 30, chunk_days: int = 7, stage: bool = False, from_staging: bool = False,
+                 ledger: WorkUnitLedger = None, resume: bool = False):
+    """Run every unit in this process and return the labels of those that failed.
+
+    At most ``workers`` units run at once and at most
+    ``PLATFORMS[platform].concurrency`` of them against any one platform.
+    Every unit is recorded in ``ledger``; with ``resume`` the units it has
+    as done are skipped and the previous run's ID and output are reused.
+    """
+    ledger = ledger or WorkUnitLedger()
+    run_id = resume and ledger.last_run_id() or f"historical-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    done = ledger.done_keys() if resume else set()
+    outputs = {client: BackfillOutput(client, output, run_id, stage=stage, fresh=not resume) for client in clients}
+
+    pending = {platform: [] for platform in PLATFORMS}
+    skipped = 0
+    for unit in plan_units(clients, start, end, unit_days, from_staging):
+        client, platform, account, _, chunk_start, chunk_end = unit
+        if unit_key(client, platform, account, chunk_start, chunk_end, output) in done:
+            skipped += 1
+            continue
+        pending[platform].append(unit)
+    total = sum(len(units) for units in pending.values())
+    print(f"Run {run_id}: {total} units to run, {skipped} already done")
+    # Units of different clients for the same account and window share one fetch
+    fetches = AccountFetchPlan((platform, account_id, (chunk_start, chunk_end))
+                               for units in pending.values()
+                               for _, platform, _, platforms, chunk_start, chunk_end in units
+                               for account_id, _ in platforms.get(platform, []))
+
+    def run(unit):
+        client, platform, account, platforms, chunk_start, chunk_end = unit
+        ledger_unit = (client, platform, account, chunk_start, chunk_end, output)
+        key = unit_key(*ledger_unit)
+        ledger.start(key, run_id, ledger_unit)
         try:
-            response = session.get(url, params=params, timeout=30)
-            if response.status_code >= 500:
-                raise Exception(f"Server error {response.status_code}")
-            response.raise_for_status()
-            return response.json()
+            rows = run_unit(client, platform, platforms, chunk_start, chunk_end, outputs[client], chunk_days,
+                            from_staging=from_staging, stage_raw=stage and not from_staging, fetches=fetches)
         except Exception as e:
-            if attempt == max_retries - 1:
-                raise
-            time.sleep(2 ** attempt)
-
-
-# Facebook historical fetch ----------------------------------------------
-
-def fetch_facebook_report_range(platforms: Dict[str, Any], start_date: datetime, end_date: datetime,
-                                chunk_days: int = 7, max_retries: int = 3) -> pd.DataFrame:
-    from facebook_business.api import FacebookAdsApi
-    import requests
-    load_dotenv()
-    access_token = os.getenv("FB_ACCESS_TOKEN")
-    app_id = os.getenv("FB_APP_ID")
-    app_secret = os.getenv("FB_APP_SECRET")
-    FacebookAdsApi.init(app_id, app_secret, access_token)
-
-    all_rows = []
-    session = requests.Session()
-
-    def process_actions(actions):
-        action_dict = {}
-        for action in actions:
-            t = action.get('action_type')
-            v = action.get('value', '0')
-            if t:
-                action_dict[t] = v
-        return action_dict
-
-    for ad_account_id, account_name in platforms.get('facebook', []):
-        current_start = start_date
-        while current_start <= end_date:
-            chunk_end = min(current_start + timedelta(days=chunk_days - 1), end_date)
-            params = {
-                'fields': 'campaign_id,objective,adset_id,ad_name,adset_name,campaign_name,impressions,spend,reach,ad_id,actions,date_start,date_stop',
-                'time_range': json.dumps({'since': current_start.strftime('%Y-%m-%d'),
-                                         'until': chunk_end.strftime('%Y-%m-%d')}),
-                'time_increment': 1,
-                'limit': 5000,
-                'level': 'ad',
-                'breakdowns': 'publisher_platform',
-                'access_token': access_token
-            }
-            next_page = None
-            while True:
-                if next_page:
-                    params['after'] = next_page
-                url = f"https://graph.facebook.com/v21.0/{ad_account_id}/insights"
-                for attempt in range(max_retries):
-                    try:
-                        resp = session.get(url, params=params, timeout=30)
-                        resp.raise_for_status()
-                        data = resp.json()
-                        break
-                    except requests.HTTPError as http_err:
-                        try:
-                            error_content = resp.json()
-                        except ValueError:
-                            error_content = resp.text
-                        print(f"Facebook API error response: {error_content}")
-                        if attempt == max_retries - 1:
-                            raise
-                        time.sleep(2 ** attempt)
-                    except Exception:
-                        if attempt == max_retries - 1:
-                            raise
-                        time.sleep(2 ** attempt)
-                for ad in data.get('data', []):
-                    actions = process_actions(ad.get('actions', []))
-                    all_rows.append({
-                        'Ad Account Name': account_name,
-                        'Campaign Name': ad.get('campaign_name'),
-                        'Campaign ID': ad.get('campaign_id'),
-                        'Ad Set Name': ad.get('adset_name'),
-                        'Ad Set ID': ad.get('adset_id'),
-                        'Ad Name': ad.get('ad_name'),
-                        'Date Start': ad.get('date_start'),
-                        'Date Stop': ad.get('date_stop'),
-                        'Date': ad.get('date_start'),
-                        'Amount Spent': ad.get('spend'),
-                        'Impressions': ad.get('impressions'),
-                        'Reach': ad.get('reach'),
-                        'Link Clicks': actions.get('link_click', '0'),
-                        'Post Engagements': actions.get('post_engagement', '0'),
-                        'Post Shares': actions.get('post', '0'),
-                        'Post Reactions': actions.get('post_reaction', '0'),
-                        'Post Comments': actions.get('comment', '0'),
-                        'Post Saves': actions.get('onsite_conversion.post_save', '0'),
-                        '3-second Video Plays': actions.get('video_view', '0'),
-                        'Platform': ad.get('publisher_platform'),
-                        'Objective': ad.get('objective')
-                    })
-                next_page = data.get('paging', {}).get('cursors', {}).get('after')
-                if not next_page:
-                    break
-            current_start = chunk_end + timedelta(days=1)
-    return pd.DataFrame(all_rows)
-
-# LinkedIn historical -----------------------------------------------------
-
-def fetch_linkedin_report_range(platforms: Dict[str, Any], start_date: datetime, end_date: datetime) -> pd.DataFrame:
-    import requests
-    load_dotenv()
-    ACCESS_TOKEN = os.getenv("LINKEDIN_ACCESS_TOKEN")
-    BASE_URL = "https://api.linkedin.com/v2"
-    HEADERS = {
-        "Linkedin-Version": "202410",
-        "Authorization": f"Bearer {ACCESS_TOKEN}"
-    }
-
-    rows = []
-    for account_id, account_name in platforms.get("linkedin", []):
-        url_campaign_groups = f"{BASE_URL}/adCampaignGroupsV2?q=search&search.status.values[0]=ACTIVE&search.account.values[0]=urn:li:sponsoredAccount:{account_id}"
-        groups = requests.get(url_campaign_groups, headers=HEADERS).json().get('elements', [])
-        for g in groups:
-            group_id = g['id']
-            url_campaigns = f"{BASE_URL}/adCampaignsV2?q=search&search.campaignGroup.values[0]=urn:li:sponsoredCampaignGroup:{group_id}"
-            campaigns = requests.get(url_campaigns, headers=HEADERS).json().get('elements', [])
-            for c in campaigns:
-                fields = ",".join([
-                    "impressions","clicks","follows","reactions","shares","totalEngagements",
-                    "videoViews","costInUsd","comments","pivotValues","landingPageClicks"
-                ])
-                url_insights = (
-                    f"{BASE_URL}/adAnalyticsV2?q=analytics&pivot=CREATIVE&timeGranularity=DAILY&dateRange.start.year={start_date.year}&dateRange.start.month={start_date.month}&dateRange.start.day={start_date.day}"
-                    f"&dateRange.end.year={end_date.year}&dateRange.end.month={end_date.month}&dateRange.end.day={end_date.day}"
-                    f"&campaigns=urn:li:sponsoredCampaign:{c['id']}&fields={fields}"
-                )
-                data = requests.get(url_insights, headers=HEADERS).json()
-                for ad in data.get('elements', []):
-                    rows.append({
-                        'Ad Account Name': account_name,
-                        'Campaign Name': c.get('name'),
-                        'objectiveType': c.get('objectiveType'),
-                        'Impressions': ad.get('impressions',0),
-                        'Clicks': ad.get('clicks',0),
-                        'Follows': ad.get('follows',0),
-                        'Reactions': ad.get('reactions',0),
-                        'Shares': ad.get('shares',0),
-                        'Total Engagements': ad.get('totalEngagements',0),
-                        'Views': ad.get('videoViews',0),
-                        'Cost in USD': ad.get('costInUsd',0.0),
-                        'Comments': ad.get('comments',0),
-                        'Landing Page Clicks': ad.get('landingPageClicks',0)
-                    })
-    return pd.DataFrame(rows)
-
-# YouTube historical ------------------------------------------------------
-
-def fetch_youtube_ads_report_range(platforms: Dict[str, Any], start_date: datetime, end_date: datetime,
-                                   chunk_days: int = 7) -> pd.DataFrame:
-    from google.ads.googleads.client import GoogleAdsClient
-    from google.ads.googleads.errors import GoogleAdsException
-    load_dotenv()
-
-    config = {
-        "developer_token": os.getenv("GOOGLE_ADS_DEVELOPER_TOKEN"),
-        "client_id": os.getenv("GOOGLE_ADS_CLIENT_ID"),
-        "client_secret": os.getenv("GOOGLE_ADS_CLIENT_SECRET"),
-        "refresh_token": os.getenv("GOOGLE_ADS_REFRESH_TOKEN"),
-        "use_proto_plus": True
-    }
-    client = GoogleAdsClient.load_from_dict(config)
-    all_rows = []
-    for customer_id, account_name in platforms.get("youtube", []):
-        ga_service = client.get_service("GoogleAdsService")
-        current_start = start_date
-        while current_start <= end_date:
-            chunk_end = min(current_start + timedelta(days=chunk_days - 1), end_date)
-            query = f"""
-                SELECT campaign.name, ad_group.name, ad_group_ad.ad.name,
-                       metrics.impressions, metrics.clicks, metrics.video_views,
-                       metrics.cost_micros
-                FROM ad_group_ad
-                WHERE segments.date BETWEEN '{current_start.strftime('%Y-%m-%d')}' AND '{chunk_end.strftime('%Y-%m-%d')}'
-                  AND campaign.advertising_channel_type = 'VIDEO'
-            """
-            try:
-                response = ga_service.search(customer_id=customer_id, query=query)
-                for row in response:
-                    spend = row.metrics.cost_micros or 0
-                    all_rows.append({
-                        'Ad Account Name': account_name,
-                        'Campaign Name': row.campaign.name,
-                        'Ad Set Name': row.ad_group.name,
-                        'Ad Name': row.ad_group_ad.ad.name or 'Unnamed',
-                        'Date': current_start.strftime('%Y-%m-%d'),
-                        'Impressions': row.metrics.impressions,
-                        'Clicks': row.metrics.clicks,
-                        'Video Views': row.metrics.video_views,
-                        'Spend': spend / 1e6
-                    })
-            except GoogleAdsException as ex:
-                print(f"API error for account {account_name}: {ex}")
-            current_start = chunk_end + timedelta(days=1)
-    return pd.DataFrame(all_rows)
+            ledger.fail(key, run_id, ledger_unit, e)
+            raise
+        ledger.finish(key, run_id, ledger_unit, rows)
+        return rows
 
-# ------------------------------------------------------------------------
+    running = {}
+    active = {platform: 0 for platform in PLATFORMS}
+    failed = []
+    completed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while running or any(pending.values()):
+            # Fill free slots round-robin across platforms that are under their limit
+            submitted = True
+            while submitted and len(running) < workers:
+                submitted = False
+                for platform, units in pending.items():
+                    if units and active[platform] < PLATFORMS[platform].concurrency and len(running) < workers:
+                        unit = units.pop(0)
+                        running[pool.submit(run, unit)] = unit
+                        active[platform] += 1
+                        submitted = True
 
-def main():
-    parser = argparse.ArgumentParser(description="Fetch historical paid media data for a single client")
-    parser.add_argument("client", help="Client name as in map.json")
-    parser.add_argument("--start", dest="start", required=True, help="Start date YYYY-MM-DD")
-    parser.add_argument("--end", dest="end", required=True, help="End date YYYY-MM-DD")
-    parser.add_argument("--output", dest="output", choices=["sql", "csv"], default="csv")
-    parser.add_argument("--chunk-days", dest="chunk_days", type=int, default=7, help="Days per API request")
-    args = parser.parse_args()
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                client, platform, account, _, chunk_start, chunk_end = running.pop(future)
+                active[platform] -= 1
+                completed += 1
+                label = f"{client} / {platform} {account} {chunk_start:%Y-%m-%d}..{chunk_end:%Y-%m-%d}"
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    failed.append(label)
+                    print(f"[{completed}/{total}] {label} failed: {e}")
+                    continue
+                print(f"[{completed}/{total}] {label}: {rows} rows")
+
+    for client, out in outputs.items():
+        print(f"{client}: {out.summary()}")
+    if failed:
+        print(f"{len(failed)} units failed; re-run with --resume to retry them")
+    return failed
 
-    start_date = datetime.strptime(args.start, "%Y-%m-%d")
-    end_date = datetime.strptime(args.end, "%Y-%m-%d")
 
-    mapping = load_mapping()
-    if args.client not in mapping:
-        raise ValueError(f"Client {args.client} not found in mapping")
-    platforms = mapping[args.client]
+def enqueue_backfill(clients: Dict[str, Any], start: datetime, end: datetime, output: str, queue: WorkQueue,
+                     run_id: str = None, unit_days: int = 30, chunk_days: int = 7, stage: bool = False,
+                     from_staging: bool = False) -> str:
+    """Queue every unit for queue_worker.py processes instead of running them here; return the run ID.
 
-    print("Fetching Facebook data...")
-    fb_df = fetch_facebook_report_range(platforms, start_date, end_date, args.chunk_days)
-    fb_df = preprocess_insta(fb_df) if not fb_df.empty else fb_df
+    Units already queued under ``run_id`` are left as they are, so queueing
+    an interrupted run again only adds what is missing.
+    """
+    run_id = run_id or f"historical-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    options = {'output': output, 'chunk_days': chunk_days, 'stage': stage, 'from_staging': from_staging}
+    items = [WorkItem('backfill', client, platform, platforms, chunk_start, chunk_end, account, options)
+             for client, platform, account, platforms, chunk_start, chunk_end
+             in plan_units(clients, start, end, unit_days, from_staging)]
+    added = queue.enqueue(run_id, items)
+    print(f"Run {run_id}: {added} units queued, {len(items) - added} already in the queue")
+    print(f"Drain it with: python queue_worker.py --run-id {run_id}")
+    return run_id
 
-    print("Fetching TikTok data...")
-    tk_df = fetch_tiktok_report(platforms, start_date=start_date, end_date=end_date, chunk_days=args.chunk_days)
-    tk_df = preprocess_tiktok(tk_df) if not tk_df.empty else tk_df
 
-    print("Fetching LinkedIn data...")
-    li_df = fetch_linkedin_report_range(platforms, start_date, end_date)
-    li_df = preprocess_linkedin(li_df) if not li_df.empty else li_df
+def add_backfill_arguments(parser: argparse.ArgumentParser):
+    """Options shared by this script and run_historical.py."""
+    parser.add_argument("--start", dest="start", required=True, help="Start date YYYY-MM-DD")
+    parser.add_argument("--end", dest="end", required=True, help="End date YYYY-MM-DD")
+    parser.add_argument("--output", dest="output", choices=["sql", "csv", "parquet"], default="csv",
+                        help="parquet writes typed, partitioned files to the staging area only")
+    parser.add_argument("--chunk-days", dest="chunk_days", type=int, default=7,
+                        help="Days per API request: the first window of an account with no history, "
+                             "or every window with ADAPTIVE_WINDOWS=0")
+    parser.add_argument("--stage", action="store_true",
+                        help="Also keep raw and transformed batches in the Parquet staging area")
+    parser.add_argument("--from-staging", dest="from_staging", action="store_true",
+                        help="Re-run transform/load from staged raw data instead of calling the APIs")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BACKFILL_WORKERS", "4")),
+                        help="Units run concurrently")
+    parser.add_argument("--unit-days", dest="unit_days", type=int, default=30,
+                        help="Days covered by one work unit")
+    parser.add_argument("--ledger", default=LEDGER_URL,
+                        help="'etl_logs' or an SQLAlchemy URL for the work-unit ledger")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip units the ledger has as done and append to the existing output")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="Queue the units for queue_worker.py processes instead of running them here")
+    parser.add_argument("--queue", default=WORK_QUEUE_URL,
+                        help="'etl_logs' or an SQLAlchemy URL for the work queue")
+    parser.add_argument("--run-id", dest="run_id", help="Run ID to queue the units under (default: a new one)")
+    parser.add_argument("--explain", action="store_true",
+                        help="Print the units, requests and expected duration without calling the APIs")
 
-    print("Fetching YouTube data...")
-    yt_df = fetch_youtube_ads_report_range(platforms, start_date, end_date, args.chunk_days)
-    yt_df = preprocess_youtube(yt_df) if not yt_df.empty else yt_df
 
-    dfs = [df for df in [fb_df, tk_df, li_df, yt_df] if df is not None and not df.empty]
-    if not dfs:
-        print("No data fetched")
+def backfill_from_args(clients: Dict[str, Any], args: argparse.Namespace):
+    start, end = datetime.strptime(args.start, "%Y-%m-%d"), datetime.strptime(args.end, "%Y-%m-%d")
+    if args.explain:
+        units = plan_units(clients, start, end, args.unit_days, args.from_staging)
+        if args.resume:
+            done = WorkUnitLedger(ledger_url(args.ledger)).done_keys()
+            units = [(client, platform, account, platforms, chunk_start, chunk_end)
+                     for client, platform, account, platforms, chunk_start, chunk_end in units
+                     if unit_key(client, platform, account, chunk_start, chunk_end, args.output) not in done]
+        # Queue workers run unshared fetches; their number is not known here
+        explain_backfill(clients, units, args.chunk_days, None if args.enqueue else args.workers,
+                         shared=not args.enqueue, from_staging=args.from_staging)
+        return
+    if args.enqueue:
+        if args.output == "csv":
+            # Workers may run on other machines; each would write its own file
+            raise SystemExit("--enqueue needs --output sql or parquet")
+        enqueue_backfill(clients, start, end, args.output, WorkQueue(args.queue), args.run_id, args.unit_days,
+                         args.chunk_days, args.stage, args.from_staging)
         return
-    result = pd.concat(dfs, ignore_index=True)
+    failed = run_backfill(clients, start, end, args.output, args.workers, args.unit_days, args.chunk_days,
+                          args.stage, args.from_staging, WorkUnitLedger(ledger_url(args.ledger)), args.resume)
+    if failed:
+        raise SystemExit(1)
+
+# ------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch historical paid media data for a single client")
+    parser.add_argument("client", help="Client name as in map.json")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
 
-    if args.output == "csv":
-        output_file = f"{args.client.replace(' ', '_')}_paid_data.csv"
-        result.to_csv(output_file, index=False)
-        print(f"Data written to {output_file}")
+    if args.from_staging:
+        platforms = {platform: [] for platform in staging.staged_clients('raw').get(args.client, [])}
     else:
-        load_dotenv()
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
-        host = os.getenv("DB_HOST")
-        db = get_db_name(args.client)
-        engine_base = create_engine(f"mysql+pymysql://{user}:{password}@{host}/")
-        ensure_database_exists(engine_base, db)
-        engine = create_engine(f"mysql+pymysql://{user}:{password}@{host}/{db}")
-        table_name = f"{args.client}_Paid_Data".replace(' ', '_')
-        create_table_if_not_exists(engine, table_name)
-        date_columns = ['Start Date', 'End Date', 'Date']
-        dtype_dict = {col: types.Date for col in date_columns if col in result.columns}
-        result.to_sql(table_name, engine, if_exists='append', index=False, dtype=dtype_dict)
-        print(f"Data appended to MySQL table {table_name}")
+        mapping = load_mapping()
+        if args.client not in mapping:
+            raise ValueError(f"Client {args.client} not found in mapping")
+        platforms = mapping[args.client]
+    backfill_from_args({args.client: platforms}, args)
 
 if __name__ == "__main__":
     main()
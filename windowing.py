@@ -0,0 +1,250 @@
+"""Adaptive date windows for range extraction.
+
+Range extractors used to ask every account for a fixed ``--chunk-days`` at
+a time. Small accounts then spend a request per window on a handful of
+rows, while large ones page through (or time out on) windows holding far
+more than a page. Instead each account is walked in windows sized from its
+rows per day, so that one request returns about ``target_pages`` pages:
+
+    days = target_pages * page_size / rows_per_day, within min_days..max_days
+
+The rate starts from what earlier runs recorded in ``extract_window_stats``
+and is updated after every window; an account never seen before is probed
+with a first window of ``chunk_days``. A window whose first request fails
+as too large (a timeout, a 5xx or a deadline error) is split in half and
+retried. ``ADAPTIVE_WINDOWS=0`` brings back the fixed windows.
+
+    facebook  insights pages of 5000 rows, windows up to 31 days
+    tiktok    report pages of 1000 rows per campaign, up to 30 days
+    youtube   Google Ads pages of 10000 rows, up to 90 days
+
+The target is 5 pages: windows aimed at a single page spill into a second
+one on any busier day, and for large accounts the page count is the same
+whatever the window, so the target only needs to stay below the size at
+which requests time out. Each profile can be tuned with ``<PLATFORM>_WINDOW_TARGET_PAGES`` and
+``<PLATFORM>_WINDOW_MAX_DAYS``. TikTok is requested per campaign, so its
+rate is rows per campaign and day. LinkedIn takes a whole range in one call
+per campaign and has no windows. The same table keeps the campaign count of
+TikTok and LinkedIn accounts, which plans (explain.py) cannot list.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import requests
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, text
+
+from ledger import LEDGER_URL, ledger_url
+
+load_dotenv()
+
+ADAPTIVE_WINDOWS = os.getenv("ADAPTIVE_WINDOWS", "1") != "0"
+WINDOW_STATS_URL = os.getenv("WINDOW_STATS_URL", LEDGER_URL)
+
+
+class WindowProfile:
+    """How requests to one platform are sized: rows per page and the window limits."""
+
+    def __init__(self, key, page_size, max_days, target_pages=5, min_days=1):
+        self.key = key
+        self.page_size = page_size
+        self.target_pages = float(os.getenv(f"{key.upper()}_WINDOW_TARGET_PAGES", target_pages))
+        self.min_days = min_days
+        self.max_days = int(os.getenv(f"{key.upper()}_WINDOW_MAX_DAYS", max_days))
+
+    @property
+    def target_rows(self):
+        return self.page_size * self.target_pages
+
+    def __repr__(self):
+        return f"WindowProfile({self.key!r})"
+
+
+PROFILES = {p.key: p for p in [
+    WindowProfile('facebook', page_size=5000, max_days=31),
+    # Reports broken down by stat_time_day cover at most 30 days
+    WindowProfile('tiktok', page_size=1000, max_days=30),
+    WindowProfile('youtube', page_size=10000, max_days=90),
+]}
+
+
+def too_large(error):
+    """Whether ``error`` looks like the request asked for too much data at once."""
+    if isinstance(error, requests.Timeout):
+        return True
+    response = getattr(error, 'response', None)
+    if response is not None and response.status_code >= 500:
+        return True
+    message = f"{error} {getattr(error, 'error', '')}".lower()
+    return 'reduce the amount of data' in message or 'deadline' in message
+
+
+class WindowStats:
+    """Rows per day and campaigns last seen for each (platform, account), kept between runs."""
+
+    def __init__(self, url=WINDOW_STATS_URL):
+        connect_args = {'check_same_thread': False} if url.startswith('sqlite') else {}
+        self.engine = create_engine(url, connect_args=connect_args)
+        self.lock = threading.Lock()
+        self.rates = None
+        self.campaign_counts = None
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS extract_window_stats (
+                    platform VARCHAR(50),
+                    account VARCHAR(255),
+                    rows_per_day FLOAT,
+                    campaigns INT,
+                    updated_at DATETIME,
+                    PRIMARY KEY (platform, account)
+                )
+            """))
+            if 'campaigns' not in {column['name'] for column in inspect(conn).get_columns('extract_window_stats')}:
+                conn.execute(text("ALTER TABLE extract_window_stats ADD COLUMN campaigns INT"))
+
+    def _load(self):
+        if self.rates is None:
+            with self.engine.connect() as conn:
+                rows = conn.execute(text("SELECT platform, account, rows_per_day, campaigns FROM extract_window_stats")).all()
+            self.rates = {(key, name): rate for key, name, rate, _ in rows if rate is not None}
+            self.campaign_counts = {(key, name): count for key, name, _, count in rows if count is not None}
+
+    def get(self, platform, account):
+        with self.lock:
+            self._load()
+            return self.rates.get((platform, str(account)))
+
+    def campaigns(self, platform, account):
+        with self.lock:
+            self._load()
+            return self.campaign_counts.get((platform, str(account)))
+
+    def set(self, platform, account, rows_per_day=None, campaigns=None):
+        """Save whichever of ``rows_per_day`` and ``campaigns`` is given, keeping the other."""
+        params = {'platform': platform, 'account': str(account), 'rows_per_day': rows_per_day,
+                  'campaigns': campaigns, 'updated_at': datetime.now()}
+        try:
+            with self.lock, self.engine.begin() as conn:
+                updated = conn.execute(text("""
+                    UPDATE extract_window_stats
+                    SET rows_per_day = COALESCE(:rows_per_day, rows_per_day),
+                        campaigns = COALESCE(:campaigns, campaigns), updated_at = :updated_at
+                    WHERE platform = :platform AND account = :account
+                """), params)
+                if not updated.rowcount:
+                    conn.execute(text("""
+                        INSERT INTO extract_window_stats (platform, account, rows_per_day, campaigns, updated_at)
+                        VALUES (:platform, :account, :rows_per_day, :campaigns, :updated_at)
+                    """), params)
+                if self.rates is not None:
+                    key = (platform, str(account))
+                    if rows_per_day is not None:
+                        self.rates[key] = rows_per_day
+                    if campaigns is not None:
+                        self.campaign_counts[key] = campaigns
+        except Exception as e:
+            print(f"Could not save the window stats of {platform} account {account}: {e}")
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """WindowStats for this process, or None if the store cannot be opened (windows then start from chunk_days)."""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            try:
+                _stats = WindowStats(ledger_url(WINDOW_STATS_URL))
+            except Exception as e:
+                print(f"Window stats unavailable ({e}); sizing windows from this run only")
+                _stats = False
+        return _stats or None
+
+
+def record_campaigns(platform, account, count):
+    """Remember how many campaigns ``account`` has, for plans that cannot list them."""
+    stats = get_stats()
+    if stats:
+        stats.set(platform, account, campaigns=count)
+
+
+class AdaptiveWindows:
+    """Consecutive windows covering ``start``..``end`` for one account of ``platform``.
+
+    Iterating yields ``(window_start, window_end)``. After fetching a window
+    call ``record(rows)`` with the rows it returned, or ``split(error)`` if
+    its first request failed: that queues the window's halves instead, and
+    returns False when the error is not about size or the window is a
+    single day. With ``adaptive`` off every window is ``chunk_days`` long.
+
+    The rate is saved once the range has been walked. With ``autosave``
+    off, each iteration walks the range again with the rate so far, and
+    ``save()`` stores it; TikTok walks the range once per campaign.
+    """
+
+    def __init__(self, platform, account, start, end, chunk_days=7, adaptive=None, stats=None, autosave=True):
+        self.platform = platform
+        self.account = str(account)
+        self.profile = PROFILES[platform]
+        self.start = start
+        self.end = end
+        self.chunk_days = chunk_days
+        self.adaptive = ADAPTIVE_WINDOWS if adaptive is None else adaptive
+        if stats is None and self.adaptive:
+            stats = get_stats()
+        self.stats = stats
+        self.rows_per_day = self.stats.get(platform, self.account) if self.stats else None
+        self.autosave = autosave
+        self.retry = []
+        self.window = None
+
+    def days(self):
+        """Length of the next new window."""
+        if not self.adaptive:
+            return self.chunk_days
+        if self.rows_per_day is None:
+            # Nothing known about the account yet: the first window is the probe
+            return max(self.profile.min_days, min(self.chunk_days, self.profile.max_days))
+        if self.rows_per_day <= 0:
+            return self.profile.max_days
+        days = int(self.profile.target_rows / self.rows_per_day)
+        return max(self.profile.min_days, min(days, self.profile.max_days))
+
+    def __iter__(self):
+        current = self.start
+        self.retry = []
+        while self.retry or current <= self.end:
+            if self.retry:
+                self.window = self.retry.pop()
+            else:
+                self.window = (current, min(current + timedelta(days=self.days() - 1), self.end))
+                current = self.window[1] + timedelta(days=1)
+            yield self.window
+        if self.autosave:
+            self.save()
+
+    def save(self):
+        if self.stats and self.rows_per_day is not None:
+            self.stats.set(self.platform, self.account, self.rows_per_day)
+
+    def record(self, rows):
+        if not self.adaptive:
+            return
+        observed = rows / ((self.window[1] - self.window[0]).days + 1)
+        self.rows_per_day = observed if self.rows_per_day is None else (self.rows_per_day + observed) / 2
+
+    def split(self, error):
+        start, end = self.window
+        if not self.adaptive or start == end or not too_large(error):
+            return False
+        half = (end - start).days // 2
+        middle = start + timedelta(days=half)
+        # Halves run next, earliest first; later windows are no longer than a half either
+        self.retry += [(middle + timedelta(days=1), end), (start, middle)]
+        self.rows_per_day = max(self.rows_per_day or 0, self.profile.target_rows / (half + 1))
+        print(f"{self.platform} window {start:%Y-%m-%d}..{end:%Y-%m-%d} of account {self.account} "
+              f"was too large ({error}); splitting it")
+        return True
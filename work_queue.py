@@ -0,0 +1,302 @@
+"""Queue of ETL work items that any number of worker processes drain.
+
+``load.py --enqueue`` and ``run_historical.py --enqueue`` put one row per
+(run, client, platform, account, date window) in ``work_items`` instead of
+running the work themselves; ``queue_worker.py`` processes claim the rows
+one at a time and run them. Workers that finish early simply claim more, so
+the load balances itself however uneven the clients are.
+
+A claim is a lease: the row is locked with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (so concurrent workers never wait on each other), marked
+``leased`` by the worker until ``lease_expires``, and kept alive by a
+heartbeat thread while the item runs. A worker that dies stops
+heartbeating; once its lease expires the item is claimed again by another
+worker, up to ``WORK_MAX_ATTEMPTS`` attempts in all. The item is marked
+done in the same transaction as the rows it wrote whenever both live on
+the same server, so a worker that lost its lease rolls its rows back
+instead of loading them twice.
+
+Items are keyed on their contents, so enqueueing the same run again only
+adds what is missing. The queue lives in ``etl_logs`` by default
+(``WORK_QUEUE_URL`` takes any SQLAlchemy URL; lease times come from the
+workers' clocks, which are assumed to be in sync).
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from catalog import server_key
+from ledger import ledger_url
+
+load_dotenv()
+
+WORK_QUEUE_URL = os.getenv("WORK_QUEUE_URL", "etl_logs")
+WORK_LEASE_SECONDS = int(os.getenv("WORK_LEASE_SECONDS", "600"))
+WORK_HEARTBEAT_SECONDS = int(os.getenv("WORK_HEARTBEAT_SECONDS", "60"))
+WORK_MAX_ATTEMPTS = int(os.getenv("WORK_MAX_ATTEMPTS", "3"))
+
+ITEM_COLUMNS = ("id, run_id, kind, client, platform, account, accounts, window_start, window_end, "
+                "options, status, attempts, worker")
+# Rows a worker may claim: never leased, or leased by a worker that stopped heartbeating
+CLAIMABLE = "(status = 'queued' OR (status = 'leased' AND lease_expires < :now))"
+
+
+class LeaseLost(Exception):
+    """The item's lease expired and was taken over; this worker's results must not be kept."""
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    # SQLite hands DATE columns back as strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class WorkItem:
+    """One unit of work: a client's accounts on one platform over ``window_start``..``window_end``.
+
+    ``kind`` says how it runs ('daily' loads like ``load.main()``,
+    'backfill' like ``run_historical.py``), ``account`` labels the accounts
+    ('*' for all of the client's) and ``options`` holds the kind's settings.
+    """
+
+    def __init__(self, kind, client, platform, accounts, window_start, window_end, account='*', options=None,
+                 run_id=None, id=None, status='queued', attempts=0, worker=None):
+        self.kind = kind
+        self.client = client
+        self.platform = platform
+        self.accounts = accounts
+        self.window_start = _as_date(window_start)
+        self.window_end = _as_date(window_end)
+        self.account = account
+        self.options = options or {}
+        self.run_id = run_id
+        self.id = id
+        self.status = status
+        self.attempts = attempts
+        self.worker = worker
+
+    @classmethod
+    def from_row(cls, row):
+        (id, run_id, kind, client, platform, account, accounts, window_start, window_end,
+         options, status, attempts, worker) = row
+        return cls(kind, client, platform, json.loads(accounts), window_start, window_end, account,
+                   json.loads(options) if options else None, run_id, id, status, attempts, worker)
+
+    def key(self):
+        raw = (f"{self.run_id}|{self.kind}|{self.client}|{self.platform}|{self.account}|"
+               f"{self.window_start:%Y-%m-%d}|{self.window_end:%Y-%m-%d}|{self.options.get('output', '')}")
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def __str__(self):
+        return (f"{self.client} / {self.platform} {self.account} "
+                f"{self.window_start:%Y-%m-%d}..{self.window_end:%Y-%m-%d}")
+
+
+class WorkQueue:
+    def __init__(self, url=None):
+        url = ledger_url(url or WORK_QUEUE_URL)
+        connect_args = {'check_same_thread': False} if url.startswith('sqlite') else {}
+        self.engine = create_engine(url, connect_args=connect_args)
+        self.mysql = self.engine.dialect.name == 'mysql'
+        if self.mysql and self.engine.url.database:
+            with create_engine(self.engine.url.set(database=None)).begin() as conn:
+                conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{self.engine.url.database}`"))
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS work_items (
+                    id {'BIGINT AUTO_INCREMENT' if self.mysql else 'INTEGER'} PRIMARY KEY,
+                    item_key CHAR(40) NOT NULL UNIQUE,
+                    run_id VARCHAR(255),
+                    kind VARCHAR(20),
+                    client VARCHAR(255),
+                    platform VARCHAR(50),
+                    account VARCHAR(255),
+                    accounts TEXT,
+                    window_start DATE,
+                    window_end DATE,
+                    options TEXT,
+                    status VARCHAR(20),
+                    attempts INT,
+                    worker VARCHAR(255),
+                    lease_expires DATETIME,
+                    heartbeat_at DATETIME,
+                    rows_written INT,
+                    error_message TEXT,
+                    created_at DATETIME,
+                    updated_at DATETIME{''',
+                    KEY work_items_claim (run_id, status, lease_expires)''' if self.mysql else ''}
+                )
+            """))
+
+    def _table(self, conn):
+        """Name of the queue table as seen from ``conn``, which may be another database's connection."""
+        if conn.engine is not self.engine and self.mysql:
+            return f"`{self.engine.url.database}`.work_items"
+        return "work_items"
+
+    def enqueue(self, run_id, items):
+        """Add ``items`` under ``run_id``, skipping those already queued; return how many were added."""
+        now = datetime.now()
+        params = []
+        for item in items:
+            item.run_id = run_id
+            params.append({
+                'item_key': item.key(), 'run_id': run_id, 'kind': item.kind, 'client': item.client,
+                'platform': item.platform, 'account': item.account, 'accounts': json.dumps(item.accounts),
+                'window_start': item.window_start, 'window_end': item.window_end,
+                'options': json.dumps(item.options), 'now': now,
+            })
+        if not params:
+            return 0
+        with self.engine.begin() as conn:
+            result = conn.execute(text(f"""
+                {'INSERT IGNORE' if self.mysql else 'INSERT OR IGNORE'} INTO work_items
+                    (item_key, run_id, kind, client, platform, account, accounts, window_start, window_end,
+                     options, status, attempts, created_at, updated_at)
+                VALUES (:item_key, :run_id, :kind, :client, :platform, :account, :accounts, :window_start,
+                        :window_end, :options, 'queued', 0, :now, :now)
+            """), params)
+        return result.rowcount
+
+    def claim(self, worker, run_id=None):
+        """Lease the next item (of ``run_id``, if given) to ``worker``; None when there is nothing to claim."""
+        run_filter = "run_id = :run_id AND " if run_id else ""
+        while True:
+            now = datetime.now()
+            params = {'run_id': run_id, 'now': now}
+            with self.engine.begin() as conn:
+                row = conn.execute(text(f"""
+                    SELECT {ITEM_COLUMNS} FROM work_items
+                    WHERE {run_filter}{CLAIMABLE}
+                    ORDER BY id LIMIT 1{' FOR UPDATE SKIP LOCKED' if self.mysql else ''}
+                """), params).first()
+                if row is None:
+                    return None
+                item = WorkItem.from_row(row)
+                params.update(id=item.id, worker=worker, expires=now + timedelta(seconds=WORK_LEASE_SECONDS))
+                if item.status == 'leased' and item.attempts >= WORK_MAX_ATTEMPTS:
+                    # Its last worker died too; give up on it rather than retry forever
+                    conn.execute(text(f"""
+                        UPDATE work_items SET status = 'failed', error_message = :error, updated_at = :now
+                        WHERE id = :id AND {CLAIMABLE}
+                    """), dict(params, error=f"Lease of worker {item.worker} expired on the last attempt"))
+                    continue
+                # Without SKIP LOCKED (SQLite) another worker may have taken it meanwhile
+                claimed = conn.execute(text(f"""
+                    UPDATE work_items
+                    SET status = 'leased', worker = :worker, attempts = attempts + 1,
+                        lease_expires = :expires, heartbeat_at = :now, updated_at = :now
+                    WHERE id = :id AND {CLAIMABLE}
+                """), params).rowcount
+            if claimed:
+                item.status, item.worker, item.attempts = 'leased', worker, item.attempts + 1
+                return item
+
+    def heartbeat(self, item):
+        """Extend ``item``'s lease; False if it is no longer held by its worker."""
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            return conn.execute(text("""
+                UPDATE work_items SET lease_expires = :expires, heartbeat_at = :now, updated_at = :now
+                WHERE id = :id AND worker = :worker AND status = 'leased'
+            """), {'id': item.id, 'worker': item.worker, 'now': now,
+                   'expires': now + timedelta(seconds=WORK_LEASE_SECONDS)}).rowcount == 1
+
+    def complete(self, item, rows, conn=None):
+        """Mark ``item`` done with ``rows`` written, raising LeaseLost if another worker has taken it.
+
+        With ``conn`` (the transaction holding the item's rows) the item is
+        marked in that transaction when the queue is on the same server, so
+        the rows commit only if the lease was still held.
+        """
+        if conn is not None and server_key(conn.engine) != server_key(self.engine):
+            conn = None
+        params = {'id': item.id, 'worker': item.worker, 'rows': rows, 'now': datetime.now()}
+        sql = """
+            UPDATE {table} SET status = 'done', rows_written = :rows, lease_expires = NULL, updated_at = :now
+            WHERE id = :id AND worker = :worker AND status = 'leased'
+        """
+        if conn is not None:
+            updated = conn.execute(text(sql.format(table=self._table(conn))), params).rowcount
+        else:
+            with self.engine.begin() as own:
+                updated = own.execute(text(sql.format(table='work_items')), params).rowcount
+        if not updated:
+            raise LeaseLost(f"{item} is no longer leased to {item.worker}")
+        item.status = 'done'
+
+    def fail(self, item, error):
+        """Record ``error`` for ``item``: queued again if it has attempts left, else failed."""
+        status = 'queued' if item.attempts < WORK_MAX_ATTEMPTS else 'failed'
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                UPDATE work_items SET status = :status, error_message = :error, lease_expires = NULL,
+                    updated_at = :now
+                WHERE id = :id AND worker = :worker AND status = 'leased'
+            """), {'id': item.id, 'worker': item.worker, 'status': status, 'error': str(error)[:2000],
+                   'now': datetime.now()})
+        item.status = status
+        return status
+
+    def retry_failed(self, run_id):
+        """Queue ``run_id``'s failed items again with fresh attempts; return how many."""
+        with self.engine.begin() as conn:
+            return conn.execute(text("""
+                UPDATE work_items SET status = 'queued', attempts = 0, worker = NULL, updated_at = :now
+                WHERE run_id = :run_id AND status = 'failed'
+            """), {'run_id': run_id, 'now': datetime.now()}).rowcount
+
+    def counts(self, run_id=None):
+        """``{status: items}`` for ``run_id`` (every run when None)."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"""
+                SELECT status, COUNT(*) FROM work_items {'WHERE run_id = :run_id' if run_id else ''}
+                GROUP BY status
+            """), {'run_id': run_id})
+            return {status: count for status, count in rows}
+
+    def failures(self, run_id):
+        """``(item label, error)`` of ``run_id``'s failed items."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"""
+                SELECT {ITEM_COLUMNS}, error_message FROM work_items
+                WHERE run_id = :run_id AND status = 'failed' ORDER BY id
+            """), {'run_id': run_id})
+            return [(str(WorkItem.from_row(row[:-1])), row[-1]) for row in rows]
+
+
+class Lease:
+    """Heartbeat ``item``'s lease from a background thread while the ``with`` block runs."""
+
+    def __init__(self, queue, item, interval=WORK_HEARTBEAT_SECONDS):
+        self.queue = queue
+        self.item = item
+        self.interval = interval
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.item):
+                    self.lost = True
+                    print(f"Lease on {self.item} lost; its results will be discarded")
+                    return
+            except Exception as e:
+                # A missed beat is retried; the lease only lapses after WORK_LEASE_SECONDS
+                print(f"Heartbeat for {self.item} failed: {e}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()